@@ -0,0 +1,68 @@
+"""
+Benchmark: specialist call latency with and without hedged requests.
+
+A stubbed specialist answers in 50 ms, except for 5% of calls that take
+1 s (a long tail, like a slow provider replica). 400 calls run through
+SpecialistDispatcher, 8 at a time, with hedging off and on; the dispatcher's
+p95 is warmed up with the same distribution first. Prints p50/p95/p99 and
+how many calls were hedged.
+
+Usage:
+    python benchmarks/bench_hedging.py
+"""
+
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")  # no network fetch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "starter")))
+
+import specialists
+from specialists import SpecialistDispatcher
+
+CALLS = 400
+IN_FLIGHT = 8
+FAST_S, SLOW_S, SLOW_RATE = 0.05, 1.0, 0.05
+
+
+async def long_tail_specialist(specialist: str, task: str) -> str:
+    await asyncio.sleep(SLOW_S if random.random() < SLOW_RATE else FAST_S)
+    return task
+
+
+async def run(hedge: bool) -> tuple[list[float], int]:
+    dispatcher = SpecialistDispatcher(max_concurrency=IN_FLIGHT * 2, timeout_s=30, hedge=hedge)
+    gate = asyncio.Semaphore(IN_FLIGHT)
+    latencies = []
+
+    async def one(i: int):
+        async with gate:
+            start = time.perf_counter()
+            await dispatcher.call("researcher", str(i))
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(SpecialistDispatcher.MIN_SAMPLES * 2)))  # warm-up
+    latencies.clear()
+    await asyncio.gather(*(one(i) for i in range(CALLS)))
+    return latencies, dispatcher.hedged
+
+
+def main():
+    specialists._ask_specialist = long_tail_specialist
+    logging.getLogger("specialists").setLevel(logging.WARNING)  # no per-hedge lines
+    print(f"{'hedging':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedged':>7}")
+    for hedge in (False, True):
+        random.seed(0)
+        latencies, hedged = asyncio.run(run(hedge))
+        cuts = statistics.quantiles(latencies, n=100)
+        p50, p95, p99 = (cuts[q - 1] * 1000 for q in (50, 95, 99))
+        print(f"{'on' if hedge else 'off':<8} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} {hedged:>7}")
+
+
+if __name__ == "__main__":
+    main()
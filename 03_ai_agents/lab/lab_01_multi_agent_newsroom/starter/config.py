@@ -3,3 +3,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o")
+MAX_PARALLEL_STEPS = int(os.getenv("MAX_PARALLEL_STEPS", "4"))
+SPECIALIST_CONCURRENCY = int(os.getenv("SPECIALIST_CONCURRENCY", "2"))
+SPECIALIST_TIMEOUT_S = float(os.getenv("SPECIALIST_TIMEOUT_S", "60"))
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "256"))
+PLAN_CACHE_TTL_S = float(os.getenv("PLAN_CACHE_TTL_S", "3600"))
+PLAN_CACHE_SIMILARITY = float(os.getenv("PLAN_CACHE_SIMILARITY", "0"))  # e.g. 0.9; 0 = exact matches only
@@ -12,8 +12,16 @@ from typing import List
 from litellm import acompletion
 from pydantic import BaseModel, Field
 
-from config import MODEL_NAME
-from specialists import call_specialist
+from config import (
+    MAX_PARALLEL_STEPS,
+    MODEL_NAME,
+    PLAN_CACHE_SIMILARITY,
+    PLAN_CACHE_SIZE,
+    PLAN_CACHE_TTL_S,
+)
+from plan_cache import PlanCache, prompt_version
+from scheduler import PlanError, run_plan, sequential_plan, topological_levels
+from specialists import call_specialist, client_kwargs
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%H:%M:%S")
 logger = logging.getLogger(__name__)
@@ -46,11 +54,31 @@ class Plan(BaseModel):
 
 # ── Planner ───────────────────────────────────────────────────────────────────
 
+# Shared by every TaskPlanner in the process, so repeated dashboard queries hit it
+plan_cache = PlanCache(PLAN_CACHE_SIZE, PLAN_CACHE_TTL_S, PLAN_CACHE_SIMILARITY)
+
+
 class TaskPlanner:
     """Decomposes a newsroom query into ordered specialist sub-tasks."""
 
+    def __init__(self, cache: PlanCache | None = plan_cache):
+        self.cache = cache
+        self.prompt_version = prompt_version(PLANNER_PROMPT)
+
     async def create_plan(self, query: str) -> List[dict]:
-        # TODO: Call acompletion with response_format=Plan and PLANNER_PROMPT.
+        """Return a cached plan for this (or, if enabled, a similar) query, else plan it."""
+        if self.cache is not None:
+            plan = self.cache.get(query, self.prompt_version)
+            if plan is not None:
+                logger.info(f"  Plan cache hit (hit rate {self.cache.stats()['hit_rate']:.0%})")
+                return plan
+        plan = await self._generate_plan(query)
+        if self.cache is not None and plan:
+            self.cache.put(query, self.prompt_version, plan)
+        return plan
+
+    async def _generate_plan(self, query: str) -> List[dict]:
+        # TODO: Call acompletion with response_format=Plan, PLANNER_PROMPT and **client_kwargs().
         #       Parse the JSON response into a Plan object and return its steps as dicts.
         # --- YOUR CODE HERE ---
         pass
@@ -65,12 +93,15 @@ class NewsroomAgent:
 
     Phase 1 — Plan:    Decompose the query into specialist sub-tasks.
     Phase 2 — Execute: Run each sub-task with the right specialist,
-                       passing dependency results as context.
+                       passing dependency results as context. Steps run
+                       as soon as their dependencies finish, so independent
+                       steps run concurrently (up to max_parallel_steps).
     Phase 3 — Synthesize: Combine all step results into the final report.
     """
 
-    def __init__(self):
+    def __init__(self, max_parallel_steps: int = MAX_PARALLEL_STEPS):
         self.planner = TaskPlanner()
+        self.max_parallel_steps = max_parallel_steps
 
     def _get_context(self, step: dict, results: dict) -> str:
         """Build a context string from the results of dependency steps."""
@@ -87,21 +118,21 @@ class NewsroomAgent:
 
         for step in plan:
             logger.info(f"  Step {step['step']} [{step['specialist']}]: {step['task']}")
-
-        # Phase 2: Execute
+        plan_error = None
+        try:
+            levels = topological_levels(plan)
+        except PlanError as e:
+            # An LLM-written plan with a cycle or a dangling dependency is
+            # still a usable list of tasks: run them one after another
+            plan_error = str(e)
+            logger.warning(f"  Invalid plan ({e}); running its steps sequentially")
+            plan = sequential_plan(plan)
+            levels = [[step["step"]] for step in plan]
+        logger.info(f"  Schedule: {' → '.join(str(level) for level in levels)}")
+
+        # Phase 2: Execute, in dependency order
         logger.info("Phase 2: Executing")
-        results = {}
-
-        for step in plan:
-            step_num = step["step"]
-            specialist = step["specialist"]
-            task = step["task"]
-
-            # TODO: Get dependency context, build sub_task, call call_specialist,
-            #       and store the result in results[step_num].
-            # --- YOUR CODE HERE ---
-            pass
-            # --- END YOUR CODE ---
+        results = await run_plan(plan, self._execute_step, self.max_parallel_steps, levels=levels)
 
         # Phase 3: Synthesize
         logger.info("Phase 3: Synthesizing")
@@ -111,14 +142,29 @@ class NewsroomAgent:
             "answer": final_answer,
             "metadata": {
                 "plan": plan,
+                "schedule": levels,
+                "plan_error": plan_error,
+                "plan_cache": self.planner.cache.stats() if self.planner.cache else None,
                 "step_results": results,
             },
         }
 
+    async def _execute_step(self, step: dict, results: dict) -> str:
+        """Run one plan step; `results` already holds all of its dependencies."""
+        step_num = step["step"]
+        specialist = step["specialist"]
+        task = step["task"]
+
+        # TODO: Get dependency context, build sub_task, `await call_specialist(...)`,
+        #       and return its result (the scheduler stores it in results[step_num]).
+        # --- YOUR CODE HERE ---
+        pass
+        # --- END YOUR CODE ---
+
     async def _synthesize(self, query: str, plan: list, results: dict) -> str:
         """Combine all step results into a final coherent answer."""
         # TODO: Format results_text as "Step N (task): answer" and call acompletion
-        #       with a system prompt asking for a synthesized, cited final answer.
+        #       (with **client_kwargs()) and a system prompt asking for a synthesized, cited final answer.
         # --- YOUR CODE HERE ---
         pass
         # --- END YOUR CODE ---
@@ -0,0 +1,135 @@
+"""
+Lab 1 - Plan Cache
+====================
+Planning is one structured-output LLM call that every execution step waits
+on, and dashboards send the same few queries again and again. PlanCache keeps
+recent plans keyed by (planner prompt version, normalized query):
+
+- normalization: Unicode NFKC, lower case, collapsed whitespace, trailing
+  punctuation dropped — "Compare EU and US policy?" == "compare eu and  us policy"
+- prompt version: a hash of PLANNER_PROMPT, so editing the prompt never
+  serves plans made by the old one
+- LRU eviction past `max_entries`, and entries expire after `ttl_s`
+- optional semantic lookup: with `similarity_threshold` > 0, a miss falls
+  back to the most similar cached query and reuses its plan if the score
+  clears the threshold. The default `embed` compares content words only
+  (stop words dropped, plurals folded), so "compare the EU and US policies"
+  matches "compare eu and us policy" exactly while "compare eu and china
+  policy" scores 0.75. Swapping one entity in a long query still costs
+  less, so keep the threshold high (0.9) or pass your own `embed`.
+
+stats() reports hits, semantic hits, misses and the hit rate.
+"""
+
+import copy
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Callable, Optional
+
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an the and or of in on for to with by at from about vs versus is are was were be "
+    "what how why which who whom do does did can could should would will this that these "
+    "those it its me my i please give show tell".split()
+)
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(text.split()).rstrip(" ?!.")
+
+
+def prompt_version(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode(), digest_size=8).hexdigest()
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def word_vector(text: str) -> dict:
+    """Unit-length bag-of-content-words vector (word -> weight)."""
+    counts = Counter(_stem(w) for w in _WORD.findall(text) if len(w) > 1 and w not in _STOPWORDS)
+    norm = math.sqrt(sum(c * c for c in counts.values())) or 1.0
+    return {w: c / norm for w, c in counts.items()}
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(word, 0.0) for word, weight in a.items())
+
+
+class PlanCache:
+    def __init__(self, max_entries: int = 256, ttl_s: float = 3600.0,
+                 similarity_threshold: float = 0.0,
+                 embed: Callable[[str], dict] = word_vector):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        # (version, normalized query) -> (plan, expires_at, vector or None)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _semantic_match(self, version: str, vector: dict, now: float):
+        best_key, best_score = None, self.similarity_threshold
+        for key, (_plan, expires_at, other) in self._entries.items():
+            if key[0] != version or expires_at <= now or other is None:
+                continue
+            score = _cosine(vector, other)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(self, query: str, version: str) -> Optional[list]:
+        key = (version, normalize_query(query))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self.similarity_threshold > 0:
+                match = self._semantic_match(version, self.embed(key[1]), now)
+                if match is not None:
+                    key, entry = match, self._entries[match]
+                    self.semantic_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[0])
+
+    def put(self, query: str, version: str, plan: list) -> None:
+        key = (version, normalize_query(query))
+        vector = self.embed(key[1]) if self.similarity_threshold > 0 else None
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(plan), time.monotonic() + self.ttl_s, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,125 @@
+"""
+Lab 1 - Plan Scheduler
+========================
+Runs a plan as a dependency graph instead of a list. A step starts as soon
+as every step in its `depends_on` has finished, so independent research
+steps run at the same time, up to `max_concurrency` at once. The plan is
+validated first: duplicate step numbers, dependencies on steps that do not
+exist, and cycles raise PlanError before anything runs. A plan that fails
+validation can still be run in its listed order via sequential_plan().
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PlanError(ValueError):
+    """The plan is not a valid dependency graph."""
+
+
+def topological_levels(plan: list[dict]) -> list[list[int]]:
+    """
+    Group step numbers into levels: each level depends only on earlier ones.
+
+    Raises PlanError for duplicate steps, dangling dependencies and cycles.
+    """
+    steps = {}
+    for step in plan:
+        if step["step"] in steps:
+            raise PlanError(f"Duplicate step number {step['step']}")
+        steps[step["step"]] = step
+
+    waiting_on = {}
+    dependents: dict[int, list[int]] = {n: [] for n in steps}
+    for n, step in steps.items():
+        deps = set(step.get("depends_on") or [])
+        missing = deps - steps.keys()
+        if missing:
+            raise PlanError(f"Step {n} depends on missing step(s) {sorted(missing)}")
+        if n in deps:
+            raise PlanError(f"Step {n} depends on itself")
+        waiting_on[n] = len(deps)
+        for dep in deps:
+            dependents[dep].append(n)
+
+    levels = []
+    ready = sorted(n for n, count in waiting_on.items() if count == 0)
+    while ready:
+        levels.append(ready)
+        next_ready = []
+        for n in ready:
+            for child in dependents[n]:
+                waiting_on[child] -= 1
+                if waiting_on[child] == 0:
+                    next_ready.append(child)
+        ready = sorted(next_ready)
+
+    if sum(map(len, levels)) != len(steps):
+        stuck = sorted(n for n, count in waiting_on.items() if count > 0)
+        raise PlanError(f"Dependency cycle among steps {stuck}")
+    return levels
+
+
+def sequential_plan(plan: list[dict]) -> list[dict]:
+    """
+    The plan's steps in listed order, renumbered 1..n, each depending only on
+    the one before it. Always valid: the fallback for a plan that is not.
+    """
+    return [
+        {**step, "step": n, "depends_on": [n - 1] if n > 1 else []}
+        for n, step in enumerate(plan, start=1)
+    ]
+
+
+async def run_plan(
+    plan: list[dict],
+    execute: Callable[[dict, dict], Awaitable[str]],
+    max_concurrency: int = 4,
+    levels: list[list[int]] | None = None,
+) -> dict:
+    """
+    Run every step with `await execute(step, results)` in dependency order.
+
+    Pass `levels` from topological_levels(plan) if you already have them;
+    the plan is then not validated a second time.
+
+    `results` maps step number -> result and already holds every dependency
+    of `step` when it starts. A step is started the moment its last
+    dependency finishes, not when its whole level does. If a step raises,
+    the steps still running are cancelled and the error propagates.
+    """
+    if levels is None:
+        topological_levels(plan)  # validate before starting anything
+    steps = {step["step"]: step for step in plan}
+    remaining = {n: set(step.get("depends_on") or []) for n, step in steps.items()}
+    results: dict[int, str] = {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_step(n: int) -> int:
+        async with semaphore:
+            logger.info(f"  ▶ Step {n} [{steps[n]['specialist']}]")
+            results[n] = await execute(steps[n], results)
+        return n
+
+    def start_ready() -> set:
+        ready = [n for n, deps in remaining.items() if not deps]
+        for n in ready:
+            del remaining[n]
+        return {asyncio.create_task(run_step(n)) for n in sorted(ready)}
+
+    running = start_ready()
+    try:
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finished = task.result()
+                for deps in remaining.values():
+                    deps.discard(finished)
+            running |= start_ready()
+    finally:
+        for task in running:
+            task.cancel()
+    return results
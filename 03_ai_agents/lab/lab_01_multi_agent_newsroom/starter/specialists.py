@@ -3,10 +3,34 @@ Lab 1 - Step 1: Specialist Agents for the Newsroom
 ====================================================
 Define focused system prompts and a single dispatch function.
 Each specialist should REFUSE to do work outside its niche.
+
+call_specialist() is async and never blocks the event loop. Every call goes
+through one SpecialistDispatcher, which:
+- caps concurrent calls per specialist (SPECIALIST_CONCURRENCY)
+- gives up after SPECIALIST_TIMEOUT_S and returns an error string
+- shares one pooled httpx client across all LiteLLM calls on an event loop;
+  pass `**client_kwargs()` to acompletion to use it (the client is passed per
+  call, never set on the litellm module, so two loops never share one)
+- with HEDGE_REQUESTS=true, sends a duplicate request when a call is slower
+  than that specialist's recent p95 latency, and keeps whichever returns first;
+  the duplicate waits for its own concurrency slot like any other call
 """
 
-from litellm import completion
-from config import MODEL_NAME
+import asyncio
+import logging
+import math
+import os
+import time
+import weakref
+from collections import deque
+
+import httpx
+import litellm
+import openai
+from litellm import acompletion
+from config import HEDGE_REQUESTS, MODEL_NAME, SPECIALIST_CONCURRENCY, SPECIALIST_TIMEOUT_S
+
+logger = logging.getLogger(__name__)
 
 
 # TODO: Fill in each specialist's system prompt.
@@ -35,10 +59,147 @@ SPECIALIST_PROMPTS = {
 }
 
 
-def call_specialist(specialist: str, task: str) -> str:
+async def _ask_specialist(specialist: str, task: str) -> str:
     """Invoke a named specialist with a task and return its response."""
     # TODO: Look up the system prompt for `specialist` from SPECIALIST_PROMPTS,
-    #       call the LLM, and return the response content.
+    #       `await acompletion(..., **client_kwargs())` the LLM, and return the response content.
     # --- YOUR CODE HERE ---
     pass
     # --- END YOUR CODE ---
+
+
+class SpecialistDispatcher:
+    """Concurrency limits, timeouts and optional hedging around _ask_specialist."""
+
+    MIN_SAMPLES = 20  # latencies needed before a p95 is trusted for hedging
+
+    def __init__(self, max_concurrency: int = SPECIALIST_CONCURRENCY,
+                 timeout_s: float = SPECIALIST_TIMEOUT_S, hedge: bool = HEDGE_REQUESTS):
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.hedge = hedge
+        # Semaphores bind to the loop they are used on: one set per event loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._latencies: dict[str, deque] = {}
+        self.hedged = 0
+        self.timeouts = 0
+
+    def _semaphore(self, specialist: str) -> asyncio.Semaphore:
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = per_loop.get(specialist)
+        if semaphore is None:
+            semaphore = per_loop[specialist] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _p95(self, specialist: str):
+        samples = self._latencies.get(specialist)
+        if not samples or len(samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    async def _timed(self, specialist: str, task: str, started: asyncio.Event | None = None) -> str:
+        # Every attempt, hedges included, holds its own concurrency slot
+        async with self._semaphore(specialist):
+            if started is not None:
+                started.set()
+            start = time.perf_counter()
+            try:
+                return await _ask_specialist(specialist, task)
+            finally:
+                # Cancelled (lost the hedge race, timed out) calls count too: they
+                # took at least this long, and dropping them would bias p95 low
+                self._latencies.setdefault(specialist, deque(maxlen=200)).append(time.perf_counter() - start)
+
+    async def _hedged(self, specialist: str, task: str) -> str:
+        p95 = self._p95(specialist) if self.hedge else None
+        started = asyncio.Event()
+        primary = asyncio.create_task(self._timed(specialist, task, started))
+        pending = {primary}
+        try:
+            if p95 is None:
+                return await primary
+            # The hedge delay runs from when the call starts, not while it queues
+            waiting = asyncio.create_task(started.wait())
+            await asyncio.wait({primary, waiting}, return_when=asyncio.FIRST_COMPLETED)
+            waiting.cancel()
+            done, _ = await asyncio.wait({primary}, timeout=p95)
+            if done:
+                return primary.result()
+            # Slower than 95% of recent calls: race a duplicate against it
+            self.hedged += 1
+            logger.info(f"  ↻ Hedging {specialist} call after {p95:.1f}s")
+            pending.add(asyncio.create_task(self._timed(specialist, task)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None:
+                        return finished.result()
+            return primary.result()  # both failed: raise the primary's error
+        finally:
+            for task_ in pending:
+                task_.cancel()
+
+    async def call(self, specialist: str, task: str) -> str:
+        try:
+            return await asyncio.wait_for(self._hedged(specialist, task), self.timeout_s)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"  ✗ {specialist} timed out after {self.timeout_s:.0f}s")
+            return f"Error: the {specialist} did not respond within {self.timeout_s:.0f}s."
+
+
+# An httpx client binds to the loop it first runs on: one per event loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, openai.AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _shared_client() -> httpx.AsyncClient:
+    """The running loop's pooled httpx client."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=SPECIALIST_TIMEOUT_S,
+        )
+        _openai_clients.pop(loop, None)
+    return client
+
+
+def client_kwargs(model: str = MODEL_NAME) -> dict:
+    """
+    acompletion() kwargs that send this call through the running loop's pool.
+
+    LiteLLM takes a per-call client for OpenAI models; other providers use
+    LiteLLM's own clients, so this returns {} for them.
+    """
+    try:
+        provider = litellm.get_llm_provider(model)[1]
+    except Exception:  # unknown to LiteLLM: acompletion will report it
+        return {}
+    if provider != "openai":
+        return {}
+    http_client = _shared_client()
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    if client is None:
+        # Without a key the call fails with the provider's 401, as LiteLLM's would
+        client = _openai_clients[loop] = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY") or "unset", http_client=http_client,
+        )
+    return {"client": client}
+
+
+dispatcher = SpecialistDispatcher()
+
+
+async def call_specialist(specialist: str, task: str) -> str:
+    """Invoke a named specialist with a task and return its response."""
+    return await dispatcher.call(specialist, task)
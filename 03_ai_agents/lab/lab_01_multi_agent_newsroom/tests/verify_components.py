@@ -0,0 +1,207 @@
+import sys
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+# Add the starter folder to path so "from specialists import ..." works
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "starter")))
+
+import litellm
+import scheduler
+import specialists
+from scheduler import PlanError, run_plan, sequential_plan, topological_levels
+from specialists import SpecialistDispatcher
+from plan_cache import PlanCache, normalize_query, prompt_version
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _FakeSpecialist:
+    """Stands in for _ask_specialist: sleeps for the next delay, tracks concurrency."""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.active = self.peak = self.calls = 0
+
+    async def __call__(self, specialist: str, task: str) -> str:
+        delay = self.delays.pop(0) if self.delays else 0.01
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(delay)
+            return f"{specialist}:{task}:{delay}"
+        finally:
+            self.active -= 1
+
+def _primed(dispatcher: SpecialistDispatcher, latency: float = 0.02) -> SpecialistDispatcher:
+    for _ in range(SpecialistDispatcher.MIN_SAMPLES):
+        dispatcher._latencies.setdefault("researcher", deque(maxlen=200)).append(latency)
+    return dispatcher
+
+def test_specialist_dispatcher():
+    logger.info("Testing SpecialistDispatcher...")
+    fake = _FakeSpecialist([])
+    specialists._ask_specialist = fake
+    dispatcher = SpecialistDispatcher(max_concurrency=1, timeout_s=5, hedge=False)
+
+    async def contended():
+        client = specialists._shared_client()
+        await asyncio.gather(*(dispatcher.call("researcher", str(i)) for i in range(3)))
+        return client
+
+    # Semaphores and the pooled client are per event loop, so a second asyncio.run works
+    first_client = asyncio.run(contended())
+    second_client = asyncio.run(contended())
+    assert first_client is not second_client and fake.peak == 1
+
+    # Loops in two threads each pass their own client per call; litellm's global is untouched
+    async def kwargs_for(model):
+        kwargs = specialists.client_kwargs(model)
+        return kwargs, specialists._shared_client()
+
+    clients = {}
+    threads = [threading.Thread(target=lambda i=i: clients.__setitem__(i, asyncio.run(kwargs_for("gpt-4o"))))
+               for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    (kwargs_a, http_a), (kwargs_b, http_b) = clients[0], clients[1]
+    assert http_a is not http_b and kwargs_a["client"] is not kwargs_b["client"]
+    assert kwargs_a["client"]._client is http_a and kwargs_b["client"]._client is http_b
+    assert litellm.aclient_session is None
+    assert asyncio.run(kwargs_for("anthropic/claude-3-5-sonnet"))[0] == {}
+
+    # A hedge waits for its own slot: with one slot it never runs beside the primary
+    fake = specialists._ask_specialist = _FakeSpecialist([0.3])
+    dispatcher = _primed(SpecialistDispatcher(max_concurrency=1, timeout_s=5, hedge=True))
+    assert asyncio.run(dispatcher.call("researcher", "slow")).endswith(":0.3")
+    assert dispatcher.hedged == 1 and fake.peak == 1
+
+    # With room for it, the hedge wins; the cancelled primary's latency is still recorded
+    fake = specialists._ask_specialist = _FakeSpecialist([0.5, 0.01])
+    dispatcher = _primed(SpecialistDispatcher(max_concurrency=2, timeout_s=5, hedge=True))
+    start = time.perf_counter()
+    assert asyncio.run(dispatcher.call("researcher", "tail")).endswith(":0.01")
+    assert time.perf_counter() - start < 0.3 and fake.peak == 2
+    assert len(dispatcher._latencies["researcher"]) == SpecialistDispatcher.MIN_SAMPLES + 2
+
+    # Timeouts return an error string and still record how long the call ran
+    specialists._ask_specialist = _FakeSpecialist([1.0])
+    dispatcher = SpecialistDispatcher(max_concurrency=1, timeout_s=0.05, hedge=False)
+    assert asyncio.run(dispatcher.call("writer", "late")).startswith("Error: the writer did not respond")
+    assert dispatcher.timeouts == 1 and dispatcher._latencies["writer"][0] >= 0.04
+    logger.info("SpecialistDispatcher Test Passed!")
+
+def _step(n, *deps):
+    return {"step": n, "task": f"task {n}", "specialist": "researcher", "depends_on": list(deps)}
+
+def test_scheduler():
+    logger.info("Testing plan scheduler...")
+    plan = [_step(1), _step(2), _step(3, 1, 2), _step(4, 3)]
+    assert topological_levels(plan) == [[1, 2], [3], [4]]
+    for bad, message in (([_step(1), _step(1)], "Duplicate"),
+                         ([_step(1, 7)], "missing"),
+                         ([_step(1, 2), _step(2, 1)], "cycle")):
+        try:
+            topological_levels(bad)
+            assert False, "expected PlanError"
+        except PlanError as e:
+            assert message in str(e), e
+
+    async def execute(step, results):
+        assert all(dep in results for dep in step["depends_on"])
+        await asyncio.sleep(0.05)
+        return f"r{step['step']}"
+
+    # Independent steps overlap; precomputed levels skip a second validation
+    validations = []
+    original = scheduler.topological_levels
+    scheduler.topological_levels = lambda p: validations.append(p) or original(p)
+    start = time.perf_counter()
+    results = asyncio.run(run_plan(plan, execute, max_concurrency=4, levels=original(plan)))
+    assert time.perf_counter() - start < 0.18 and validations == []
+    asyncio.run(run_plan(plan, execute))
+    assert len(validations) == 1
+    scheduler.topological_levels = original
+    assert results == {1: "r1", 2: "r2", 3: "r3", 4: "r4"}
+
+    # An invalid plan falls back to its listed order, one step after another
+    cyclic = [_step(5, 6), _step(6, 5), _step(6)]
+    fallback = sequential_plan(cyclic)
+    assert [s["step"] for s in fallback] == [1, 2, 3]
+    assert [s["depends_on"] for s in fallback] == [[], [1], [2]]
+    assert topological_levels(fallback) == [[1], [2], [3]]
+    logger.info("Plan Scheduler Test Passed!")
+
+def test_newsroom_plan_fallback():
+    logger.info("Testing NewsroomAgent plan fallback...")
+    from orchestrator import NewsroomAgent
+
+    agent = NewsroomAgent()
+    executed = []
+
+    async def cyclic_plan(query):
+        return [_step(1, 2), _step(2, 1)]
+
+    async def execute(step, results):
+        executed.append((step["step"], sorted(results)))
+        return f"r{step['step']}"
+
+    async def synthesize(query, plan, results):
+        return " + ".join(results[n] for n in sorted(results))
+
+    agent.planner.create_plan = cyclic_plan
+    agent._execute_step = execute
+    agent._synthesize = synthesize
+    result = asyncio.run(agent.run("cycle"))
+    assert result["answer"] == "r1 + r2"
+    assert executed == [(1, []), (2, [1])]
+    assert "cycle" in result["metadata"]["plan_error"] and result["metadata"]["schedule"] == [[1], [2]]
+    logger.info("NewsroomAgent Plan Fallback Test Passed!")
+
+def test_plan_cache():
+    logger.info("Testing PlanCache...")
+    plan = [_step(1), _step(2, 1)]
+    v1, v2 = prompt_version("planner prompt"), prompt_version("planner prompt, edited")
+    assert normalize_query("  Compare EU and\tUS policy?") == "compare eu and us policy"
+
+    cache = PlanCache(max_entries=2, ttl_s=60)
+    cache.put("Compare EU and US policy?", v1, plan)
+    hit = cache.get("compare eu and  us policy", v1)
+    assert hit == plan and hit is not plan
+    # A new planner prompt never reuses the old prompt's plans
+    assert cache.get("compare eu and us policy", v2) is None
+
+    # LRU: the least recently used of three entries is evicted
+    cache.put("q2", v1, plan)
+    cache.get("compare eu and us policy", v1)
+    cache.put("q3", v1, plan)
+    assert cache.get("q2", v1) is None and cache.get("q3", v1) == plan
+    assert cache.stats() == {"entries": 2, "hits": 3, "semantic_hits": 0, "misses": 2, "hit_rate": 0.6}
+
+    expiring = PlanCache(ttl_s=0.05)
+    expiring.put("q", v1, plan)
+    time.sleep(0.06)
+    assert expiring.get("q", v1) is None and expiring.stats()["entries"] == 0
+
+    # Semantic lookup: a paraphrase clears the threshold, a different entity does not
+    semantic = PlanCache(similarity_threshold=0.9)
+    semantic.put("compare eu and us policy", v1, plan)
+    assert semantic.get("Compare the EU and US policies", v1) == plan
+    assert semantic.get("compare eu and china policy", v1) is None
+    assert semantic.get("compare the eu and us policies", v2) is None
+    stats = semantic.stats()
+    assert stats["hits"] == 1 and stats["semantic_hits"] == 1 and stats["misses"] == 2
+    logger.info("PlanCache Test Passed!")
+
+if __name__ == "__main__":
+    test_specialist_dispatcher()
+    test_scheduler()
+    test_newsroom_plan_fallback()
+    test_plan_cache()
@@ -12,6 +12,7 @@ from config import MODEL_NAME
 from tools.mock_tools import TOOLS_DICT, TOOLS_SCHEMA
 from agent.tracer import AgentTracer, AgentStep, ToolCallRecord
 from agent.loop_detector import AdvancedLoopDetector
+from agent.compactor import HistoryCompactor
 from routing.semantic_router import SemanticToolSelector
 
 # Configure Logging
@@ -34,8 +35,13 @@ def run_agent(query: str, max_steps: int = 10) -> dict:
     
     # --- END YOUR CODE ---
 
+    # Old tool outputs are compacted once the history grows past the threshold;
+    # full outputs stay in compactor.archive for the trace
+    compactor = HistoryCompactor()
+
     for step in range(max_steps):
         step_start = time.time()
+        compactor.compact(messages)
         
         response = completion(
             model=MODEL_NAME,
@@ -0,0 +1,83 @@
+"""
+Lab 2 - History Compaction
+============================
+Every tool result appended to `messages` is re-sent on every later step, so
+prompt tokens grow each step. HistoryCompactor replaces old tool outputs
+(all but the last `keep_recent_steps` steps) with their highest-scoring
+sentences once the history passes `threshold_tokens`. The originals are kept
+in `compactor.archive` (tool_call_id -> full text), so log them to your trace.
+
+This is a minimal version for the lab (one strategy, ~4 characters per
+token). The full implementation, with pluggable strategies and tiktoken
+counts, is project_starter/src/agent/compaction.py.
+"""
+
+import re
+from collections import Counter
+
+COMPACTED_PREFIX = "[Compacted "
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9]{3,}")
+
+
+def estimate_tokens(messages: list) -> int:
+    """~4 characters per token; good enough to decide when to compact."""
+    total = 0
+    for m in messages:
+        content = m.get("content") if isinstance(m, dict) else getattr(m, "content", None)
+        total += 3 + len(content or "") // 4
+    return total
+
+
+def extractive_summary(text: str, query: str, max_chars: int) -> str:
+    """Keep the distinct sentences sharing the most words with the output and the query."""
+    sentences = list(dict.fromkeys(s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()))
+    words = [set(_WORD.findall(s.lower())) for s in sentences]
+    frequency = Counter(w for ws in words for w in ws)
+    query_words = set(_WORD.findall(query.lower()))
+
+    def score(i: int) -> float:
+        if not words[i]:
+            return 0.0
+        return sum(frequency[w] * (3 if w in query_words else 1) for w in words[i]) / len(words[i]) ** 0.5
+
+    chosen, used = [], 0
+    for i in sorted(range(len(sentences)), key=score, reverse=True):
+        if used + len(sentences[i]) + 1 <= max_chars:
+            chosen.append(i)
+            used += len(sentences[i]) + 1
+    if not chosen:
+        return text[:max_chars] + ("…" if len(text) > max_chars else "")
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class HistoryCompactor:
+    def __init__(self, threshold_tokens: int = 12000, keep_recent_steps: int = 2, max_chars: int = 600):
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent_steps = keep_recent_steps
+        self.max_chars = max_chars
+        self.archive: dict[str, str] = {}
+
+    def compact(self, messages: list) -> int:
+        """Compact `messages` in place; returns how many tool outputs were replaced."""
+        if estimate_tokens(messages) <= self.threshold_tokens:
+            return 0
+        query = next((m["content"] for m in messages if isinstance(m, dict) and m.get("role") == "user"), "")
+        turns = [i for i, m in enumerate(messages)
+                 if (m.get("role") if isinstance(m, dict) else getattr(m, "role", None)) == "assistant"]
+        if len(turns) <= self.keep_recent_steps:
+            return 0
+        cutoff = turns[-self.keep_recent_steps] if self.keep_recent_steps else len(messages)
+
+        replaced = 0
+        for i in range(cutoff):
+            m = messages[i]
+            if not isinstance(m, dict) or m.get("role") != "tool" or m["content"].startswith(COMPACTED_PREFIX):
+                continue
+            self.archive[m["tool_call_id"]] = m["content"]
+            header = f"{COMPACTED_PREFIX}{m.get('name', 'tool')} output, {len(m['content']):,} chars; id {m['tool_call_id']}]\n"
+            messages[i] = {**m, "content": header + extractive_summary(m["content"], query, self.max_chars)}
+            replaced += 1
+            if estimate_tokens(messages) <= self.threshold_tokens * 0.75:
+                break
+        return replaced
@@ -4,19 +4,26 @@ Lab 2 - Step 2: Agent Tracer
 """
 
 import json
+import sys
 import time
 import uuid
 from dataclasses import dataclass, field, asdict
 from typing import Optional
 
-@dataclass
+# Slotted dataclasses have no per-instance __dict__; tool and agent names are
+# interned because the same few strings repeat in every record.
+
+@dataclass(slots=True)
 class ToolCallRecord:
     tool_name: str
     tool_input: dict
     tool_output: str
     duration_ms: float
 
-@dataclass
+    def __post_init__(self):
+        self.tool_name = sys.intern(self.tool_name)
+
+@dataclass(slots=True)
 class AgentStep:
     step_number: int
     reasoning: Optional[str]
@@ -24,7 +31,7 @@ class AgentStep:
     duration_ms: float = 0.0
     timestamp: float = field(default_factory=time.time)
 
-@dataclass
+@dataclass(slots=True)
 class Trace:
     trace_id: str
     agent_name: str
@@ -32,6 +39,9 @@ class Trace:
     steps: list[AgentStep] = field(default_factory=list)
     status: str = "running"
 
+    def __post_init__(self):
+        self.agent_name = sys.intern(self.agent_name)
+
 class AgentTracer:
     def __init__(self, verbose: bool = True):
         self._traces: dict[str, Trace] = {}
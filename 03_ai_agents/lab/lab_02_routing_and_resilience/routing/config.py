@@ -4,3 +4,7 @@ from dotenv import load_dotenv
 load_dotenv()
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o")
 EMBEDDING_MODEL = "text-embedding-3-small"
+TOOL_EMBEDDING_CACHE = os.getenv("TOOL_EMBEDDING_CACHE", ".cache/tool_embeddings.npz")
+QUERY_EMBEDDING_CACHE_DIR = os.getenv("QUERY_EMBEDDING_CACHE_DIR", ".cache/query_embeddings")
+QUERY_EMBEDDING_LRU_SIZE = int(os.getenv("QUERY_EMBEDDING_LRU_SIZE", "4096"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
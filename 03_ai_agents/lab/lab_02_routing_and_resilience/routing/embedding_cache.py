@@ -0,0 +1,249 @@
+"""
+Lab 2 - Query Embedding Cache
+===============================
+Query embeddings are the first network round-trip of every routed request,
+and the same queries come back again and again. QueryEmbeddingCache is
+content-addressed (key = hash of model + text) and has three layers:
+
+1. an in-memory LRU of recent vectors
+2. a memory-mapped on-disk store: one float32 file of rows plus an
+   append-only key index, so vectors survive restarts and are paged in by
+   the OS instead of loaded up front
+3. the embedding API, called in batches: a miss is sent at once when no
+   request is in flight; while one is, misses arriving from concurrent
+   threads within a short window (EMBEDDING_BATCH_WINDOW_MS) are sent as one
+   embedding(input=[...]) request. A text already being embedded is never
+   requested twice — later callers wait for the in-flight result.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Stands in for the window timer while a caller flushes a batch itself
+_FLUSH_NOW = object()
+
+
+def content_key(model: str, text: str) -> str:
+    return hashlib.blake2b(f"{model}\0{text}".encode(), digest_size=16).hexdigest()
+
+
+class MmapEmbeddingStore:
+    """
+    Append-only float32 rows in `vectors.f32`, indexed by `keys.txt` (one key
+    per row). The row width is recorded in `meta.json` before the first row is
+    written. On open, both files are cut back to the rows that have a complete
+    vector and key, so an interrupted write never shifts later rows.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._keys_path = os.path.join(directory, "keys.txt")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._rows: dict[str, int] = {}
+        self._count = 0  # rows on disk
+        self.dim: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        self._recover()
+
+    def _recover(self) -> None:
+        keys = []
+        if self.dim is not None and os.path.exists(self._keys_path):
+            with open(self._keys_path, encoding="utf-8") as f:
+                # A last line without "\n" is a torn key write: drop it
+                keys = f.read().split("\n")[:-1]
+        vector_rows = (
+            os.path.getsize(self._vectors_path) // (self.dim * 4)
+            if self.dim is not None and os.path.exists(self._vectors_path) else 0
+        )
+        keys = keys[:vector_rows]
+        if self.dim is not None:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(len(keys) * self.dim * 4)
+            with open(self._keys_path, "w", encoding="utf-8") as f:
+                f.write("".join(key + "\n" for key in keys))
+        self._count = len(keys)
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        with self._lock:
+            if self._mmap is None or row >= self._mmap.shape[0]:
+                # (Re)map after appends; only touched pages are read from disk
+                self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+            return np.array(self._mmap[row])
+
+    def put_many(self, items: list[tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            items = [(key, vector) for key, vector in items if key not in self._rows]
+            if not items:
+                return
+            vectors = np.stack([v for _, v in items]).astype(np.float32)
+            if self.dim is None:
+                # New store (or files with no recorded width): start from empty files
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": int(vectors.shape[1])}, f)
+                open(self._keys_path, "w").close()
+                self.dim = int(vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dim embeddings, got {vectors.shape[1]}")
+            # Vectors first, then keys: a key line always has its row on disk.
+            # Truncating first drops anything a failed earlier append left behind.
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(self._count * self.dim * 4)
+                f.write(vectors.tobytes())
+            with open(self._keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(key + "\n" for key, _ in items))
+            for key, _ in items:
+                self._rows[key] = self._count
+                self._count += 1
+
+
+class QueryEmbeddingCache:
+    def __init__(self, embed_many: Callable[[list[str]], np.ndarray], model: str,
+                 directory: Optional[str] = None, max_entries: int = 4096,
+                 batch_window_s: float = 0.005, max_batch: int = 256):
+        self.embed_many = embed_many
+        self.model = model
+        self.max_entries = max_entries
+        self.batch_window_s = batch_window_s
+        self.max_batch = max_batch
+        self.store = (
+            MmapEmbeddingStore(os.path.join(directory, re.sub(r"[^\w.-]", "_", model)))
+            if directory else None
+        )
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._pending: list[tuple[str, str]] = []
+        self._timer: Optional[threading.Timer] = None  # or _FLUSH_NOW
+        self._flushing = 0  # batches being embedded
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "requests": 0}
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch, self._pending, self._timer = self._pending, [], None
+            self._flushing += 1
+        try:
+            for start in range(0, len(batch), self.max_batch):
+                self._embed_chunk(batch[start:start + self.max_batch])
+        finally:
+            with self._lock:
+                self._flushing -= 1
+
+    def _embed_chunk(self, chunk: list[tuple[str, str]]) -> None:
+        error: Optional[BaseException] = RuntimeError("Embedding batch did not complete")
+        rows: list[np.ndarray] = []
+        try:
+            vectors = np.asarray(self.embed_many([text for _, text in chunk]), dtype=np.float32)
+            if vectors.ndim != 2 or len(vectors) != len(chunk):
+                raise ValueError(f"embed_many returned {len(vectors)} rows for {len(chunk)} texts")
+            # Own copies: a cached row must not keep the whole batch array alive
+            rows = [row.copy() for row in vectors]
+            if self.store is not None:
+                try:
+                    self.store.put_many([(key, row) for (key, _), row in zip(chunk, rows)])
+                except Exception as e:
+                    # The disk layer is an optimization; callers still get their vectors
+                    logger.warning(f"Could not persist query embeddings: {e}")
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            # Every waiter is released, whatever happened above
+            with self._lock:
+                futures = [self._inflight.pop(key) for key, _ in chunk]
+                if error is None:
+                    self.stats["requests"] += 1
+                    for (key, _), row in zip(chunk, rows):
+                        self._remember(key, row)
+            for i, future in enumerate(futures):
+                if error is None:
+                    future.set_result(rows[i])
+                else:
+                    future.set_exception(error)
+
+    def get_many(self, texts: list[str]) -> np.ndarray:
+        """One float32 row per text; cached rows are returned without an API call."""
+        keys = [content_key(self.model, text) for text in texts]
+        results: dict[str, object] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None and key not in results:
+                    self._lru.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    results[key] = vector
+        # Disk reads happen outside the lock, so they never serialize other callers
+        on_disk = {}
+        if self.store is not None:
+            for key in keys:
+                if key not in results and key not in on_disk:
+                    on_disk[key] = self.store.get(key)
+        flush_now = False
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in results:
+                    continue
+                vector = on_disk.get(key)
+                if vector is not None:
+                    self.stats["disk_hits"] += 1
+                    self._remember(key, vector)
+                    results[key] = vector
+                    continue
+                future = self._inflight.get(key)
+                if future is not None:
+                    self.stats["coalesced"] += 1  # someone is already embedding this text
+                else:
+                    self.stats["misses"] += 1
+                    future = self._inflight[key] = Future()
+                    self._pending.append((key, text))
+                    if self._timer is None:
+                        if self._flushing == 0:
+                            # Nothing in flight: send now; misses arriving meanwhile
+                            # join this batch until it is taken
+                            flush_now, self._timer = True, _FLUSH_NOW
+                        else:
+                            # A request is in flight: collect misses for a window
+                            self._timer = threading.Timer(self.batch_window_s, self._flush)
+                            self._timer.daemon = True
+                            self._timer.start()
+                results[key] = future
+        if flush_now:
+            self._flush()
+        rows = [
+            value.result() if isinstance(value, Future) else value
+            for value in (results[key] for key in keys)
+        ]
+        return np.stack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+
+    def get(self, text: str) -> np.ndarray:
+        return self.get_many([text])[0]
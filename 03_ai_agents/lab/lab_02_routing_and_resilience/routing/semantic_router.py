@@ -1,12 +1,25 @@
 """
 Lab 2 - Step 1: Semantic Tool Selector
 ======================================
+Tool descriptions are embedded once into a ToolEmbeddingIndex: a unit-length
+float32 matrix, persisted to TOOL_EMBEDDING_CACHE, so selection is one
+matrix-vector product plus argpartition. cosine_similarity is the same
+score for a single pair of vectors.
+
+Query embeddings go through a QueryEmbeddingCache (routing/embedding_cache.py):
+repeated queries are served from memory or QUERY_EMBEDDING_CACHE_DIR, and
+concurrent misses share one embedding request.
 """
 
 import numpy as np
 from litellm import embedding
 from tools.registry import registry, Tool
-from config import EMBEDDING_MODEL
+from config import (
+    EMBEDDING_MODEL, TOOL_EMBEDDING_CACHE, QUERY_EMBEDDING_CACHE_DIR,
+    QUERY_EMBEDDING_LRU_SIZE, EMBEDDING_BATCH_WINDOW_MS,
+)
+from routing.tool_index import ToolEmbeddingIndex
+from routing.embedding_cache import QueryEmbeddingCache
 
 def cosine_similarity(a: list[float], b: list[float]) -> float:
     """TODO: Implement similarity = (A · B) / (||A|| * ||B||)"""
@@ -14,27 +27,43 @@ def cosine_similarity(a: list[float], b: list[float]) -> float:
     return 0.0
     # --- END YOUR CODE ---
 
+def get_embedding_matrix(texts: list[str]) -> np.ndarray:
+    """Embed many texts in one LiteLLM request; one float32 row per text."""
+    response = embedding(model=EMBEDDING_MODEL, input=texts)
+    return np.array([item["embedding"] for item in response.data], dtype=np.float32)
+
+query_embeddings = QueryEmbeddingCache(
+    get_embedding_matrix, EMBEDDING_MODEL, QUERY_EMBEDDING_CACHE_DIR,
+    max_entries=QUERY_EMBEDDING_LRU_SIZE, batch_window_s=EMBEDDING_BATCH_WINDOW_MS / 1000,
+)
+
 def get_embedding_vector(text: str) -> list[float]:
-    """Get embedding vector using LiteLLM."""
-    response = embedding(model=EMBEDDING_MODEL, input=[text])
-    return response.data[0]["embedding"]
+    """Get embedding vector using LiteLLM (cached; concurrent misses are batched)."""
+    return query_embeddings.get(text).tolist()
 
 class SemanticToolSelector:
-    def __init__(self):
-        self._tool_embeddings: dict[str, list[float]] = {}
+    def __init__(self, cache_path: str | None = TOOL_EMBEDDING_CACHE,
+                 query_cache: QueryEmbeddingCache = query_embeddings):
+        self._index = ToolEmbeddingIndex(get_embedding_matrix, EMBEDDING_MODEL, cache_path)
+        self._queries = query_cache
         self._indexed = False
 
     def build_index(self):
-        """TODO: Embed all registered tool descriptions."""
-        # --- YOUR CODE HERE ---
-        pass
-        # --- END YOUR CODE ---
+        """Embed all registered tool descriptions (only new or changed ones hit the API)."""
+        self._index.build(registry.get_all_tools())
+        self._indexed = True
 
     def select_tools(self, query: str, top_k: int = 5) -> list[tuple[Tool, float]]:
-        """TODO: Select the top-K most relevant tools for a query."""
-        # --- YOUR CODE HERE ---
-        return []
-        # --- END YOUR CODE ---
+        """Select the top-K most relevant tools for a query, best first."""
+        return self.select_tools_many([query], top_k)[0]
+
+    def select_tools_many(self, queries: list[str], top_k: int = 5) -> list[list[tuple[Tool, float]]]:
+        """select_tools for many queries: at most one embedding request, one matrix product."""
+        if not self._indexed:
+            self.build_index()
+        if not queries:
+            return []
+        return self._index.search_many(self._queries.get_many(queries), top_k)
 
     def get_tool_schemas(self, query: str, top_k: int = 5) -> list[dict]:
         selected = self.select_tools(query, top_k)
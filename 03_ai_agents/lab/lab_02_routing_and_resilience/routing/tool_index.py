@@ -0,0 +1,86 @@
+"""
+Lab 2 - Tool Embedding Index
+==============================
+Tool embeddings held as one pre-normalized float32 matrix (one row per
+tool). Because every row has unit length, the cosine similarity of a query
+against all tools is a single matrix-vector product, and the top-k comes from
+np.argpartition (O(n)) instead of sorting every score.
+
+Embeddings are persisted to an .npz file keyed by a hash of the embedding
+model, tool name and description, so rebuilding the index only embeds tools
+that are new or whose description changed.
+"""
+
+import hashlib
+import os
+from typing import Callable, Sequence
+
+import numpy as np
+
+
+def description_key(model: str, name: str, description: str) -> str:
+    return hashlib.blake2b(f"{model}\0{name}\0{description}".encode(), digest_size=16).hexdigest()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class ToolEmbeddingIndex:
+    def __init__(self, embed_many: Callable[[list[str]], np.ndarray], model: str, cache_path: str | None = None):
+        self.embed_many = embed_many
+        self.model = model
+        self.cache_path = cache_path
+        self.tools: list = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.embedded = 0  # tools embedded by the last build() (cache misses)
+
+    def _load_cache(self) -> dict[str, np.ndarray]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        with np.load(self.cache_path) as data:
+            return dict(zip(data["keys"].tolist(), data["vectors"]))
+
+    def _save_cache(self, cache: dict[str, np.ndarray]) -> None:
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp = self.cache_path + ".tmp.npz"
+        np.savez(tmp, keys=np.array(list(cache)), vectors=np.stack(list(cache.values())))
+        os.replace(tmp, self.cache_path)
+
+    def build(self, tools: Sequence) -> None:
+        """Index `tools`, embedding (in one batch) only those missing from the cache."""
+        cache = self._load_cache()
+        keys = [description_key(self.model, t.name, t.description) for t in tools]
+        missing = [i for i, key in enumerate(keys) if key not in cache]
+        if missing:
+            vectors = normalize_rows(self.embed_many([tools[i].description for i in missing]))
+            for i, vector in zip(missing, vectors):
+                cache[keys[i]] = vector
+            # Keep only current tools, so the file does not grow with stale descriptions
+            self._save_cache({key: cache[key] for key in keys})
+        self.embedded = len(missing)
+        self.tools = list(tools)
+        self.matrix = (
+            np.stack([cache[key] for key in keys]).astype(np.float32) if keys
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+
+    def search_many(self, query_vectors: np.ndarray, top_k: int) -> list[list[tuple]]:
+        """Top-k (tool, score) per query row, best first."""
+        if not self.tools:
+            return [[] for _ in range(len(query_vectors))]
+        scores = normalize_rows(query_vectors) @ self.matrix.T  # (queries, tools)
+        k = min(top_k, len(self.tools))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results.append([(self.tools[i], float(row[i])) for i in ordered])
+        return results
+
+    def search(self, query_vector: np.ndarray, top_k: int) -> list[tuple]:
+        return self.search_many(np.asarray(query_vector, dtype=np.float32)[None, :], top_k)[0]
@@ -0,0 +1,245 @@
+import sys
+import os
+import time
+import logging
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")  # no network fetch
+
+# Add the lab root to path so "from routing.X import Y" works
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from routing.embedding_cache import MmapEmbeddingStore, QueryEmbeddingCache
+from routing.tool_index import ToolEmbeddingIndex
+from agent.compactor import COMPACTED_PREFIX, HistoryCompactor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _fake_embed(calls: list, delay: float = 0.0):
+    def embed_many(texts):
+        calls.append(list(texts))
+        time.sleep(delay)
+        return np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+    return embed_many
+
+def _in_thread(fn, timeout: float = 2.0):
+    """Run fn in a thread; fail instead of hanging if it never returns."""
+    outcome = {}
+    def target():
+        try:
+            outcome["value"] = fn()
+        except Exception as e:
+            outcome["error"] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "call blocked"
+    return outcome
+
+def test_embedding_store_recovery():
+    logger.info("Testing MmapEmbeddingStore recovery...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MmapEmbeddingStore(tmp)
+        rows = {f"k{i}": np.full(8, i, dtype=np.float32) for i in range(3)}
+        store.put_many(list(rows.items()))
+
+        # Interrupted writes: two vectors whose keys were never written, then a torn key line
+        with open(os.path.join(tmp, "vectors.f32"), "ab") as f:
+            f.write(np.ones((2, 8), dtype=np.float32).tobytes())
+        with open(os.path.join(tmp, "keys.txt"), "a") as f:
+            f.write("k3")
+
+        store = MmapEmbeddingStore(tmp)
+        assert store.dim == 8 and len(store) == 3
+        for key, vector in rows.items():
+            assert np.array_equal(store.get(key), vector), key
+        assert store.get("k3") is None
+        assert os.path.getsize(os.path.join(tmp, "vectors.f32")) == 3 * 8 * 4
+
+        # New rows land after the recovered ones and survive another reopen
+        store.put_many([("k4", np.full(8, 4, dtype=np.float32))])
+        store = MmapEmbeddingStore(tmp)
+        assert np.array_equal(store.get("k4"), np.full(8, 4)) and np.array_equal(store.get("k2"), rows["k2"])
+        try:
+            store.put_many([("bad", np.zeros(5, dtype=np.float32))])
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    logger.info("MmapEmbeddingStore Recovery Test Passed!")
+
+def test_embedding_cache_batching():
+    logger.info("Testing QueryEmbeddingCache batching...")
+    with tempfile.TemporaryDirectory() as tmp:
+        calls = []
+        cache = QueryEmbeddingCache(_fake_embed(calls, delay=0.05), "test/model", directory=tmp,
+                                    max_entries=3, batch_window_s=0.01)
+        results = {}
+        threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, cache.get(f"q{i % 5}")))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 concurrent lookups of 5 texts: the first miss goes out at once, the
+        # rest share one windowed request, and each text is embedded once
+        assert len(calls) <= 2 and sorted(sum(calls, [])) == [f"q{i}" for i in range(5)]
+        assert cache.stats["misses"] == 5 and cache.stats["coalesced"] == 15
+        requests = len(calls)
+
+        # Cached rows are copies, not views that pin the whole batch array
+        assert all(row.base is None for row in cache._lru.values())
+
+        # A new process reads the vectors back from disk without an API call
+        reopened = QueryEmbeddingCache(_fake_embed(calls), "test/model", directory=tmp)
+        assert np.array_equal(reopened.get("q3"), results[3])
+        assert len(calls) == requests and reopened.stats["disk_hits"] == 1
+
+        # A lone miss does not wait out the batch window
+        lone = QueryEmbeddingCache(_fake_embed(calls), "test/model", batch_window_s=5)
+        start = time.perf_counter()
+        lone.get("alone")
+        assert time.perf_counter() - start < 1
+
+        # Disk reads run outside the cache lock: a slow one does not block memory hits
+        slow_disk = threading.Event()
+        original_get = reopened.store.get
+        reopened.store.get = lambda key: slow_disk.wait(5) and original_get(key)
+        reader = threading.Thread(target=reopened.get, args=("q1",))
+        reader.start()
+        assert _in_thread(lambda: reopened.get("q3"), timeout=1)["value"] is not None
+        slow_disk.set()
+        reader.join()
+    logger.info("QueryEmbeddingCache Batching Test Passed!")
+
+def test_embedding_cache_failures():
+    logger.info("Testing QueryEmbeddingCache failure handling...")
+    # Fewer rows than texts: every waiter gets the error instead of blocking
+    short = QueryEmbeddingCache(lambda texts: np.zeros((1, 3)), "m", batch_window_s=0.001)
+    outcome = _in_thread(lambda: short.get_many(["a", "b"]))
+    assert isinstance(outcome.get("error"), ValueError)
+    assert short._inflight == {}
+
+    def boom(texts):
+        raise RuntimeError("provider down")
+
+    failing = QueryEmbeddingCache(boom, "m", batch_window_s=0.001)
+    assert isinstance(_in_thread(lambda: failing.get("a")).get("error"), RuntimeError)
+
+    # A disk failure is logged; the vectors are still returned and kept in memory
+    calls = []
+    cache = QueryEmbeddingCache(_fake_embed(calls), "m", batch_window_s=0.001)
+    cache.store = MmapEmbeddingStore(tempfile.mkdtemp())
+    cache.store.put_many = boom
+    assert _in_thread(lambda: cache.get("a"))["value"].shape == (3,)
+    cache.get("a")
+    assert len(calls) == 1 and cache.stats["memory_hits"] == 1
+    logger.info("QueryEmbeddingCache Failure Test Passed!")
+
+def _word_embed(calls: list):
+    """Hashed bag of words: texts sharing words get similar vectors."""
+    def embed_many(texts):
+        calls.append(list(texts))
+        rows = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in zip(rows, texts):
+            for word in text.lower().split():
+                row[sum(map(ord, word)) % 64] += 1.0
+        return rows
+    return embed_many
+
+def test_tool_index():
+    logger.info("Testing ToolEmbeddingIndex...")
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 16)).astype(np.float32)
+    tools = [SimpleNamespace(name=f"t{i}", description=f"d{i}") for i in range(50)]
+    index = ToolEmbeddingIndex(lambda texts: vectors[[int(t[1:]) for t in texts]], "m")
+    index.build(tools)
+    queries = rng.standard_normal((8, 16)).astype(np.float32)
+    # argpartition + sorting the k survivors gives the head of a full sort
+    for query, found in zip(queries, index.search_many(queries, 5)):
+        scores = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+        assert [t.name for t, _ in found] == [f"t{i}" for i in np.argsort(-scores)[:5]]
+        assert np.allclose([score for _, score in found], np.sort(scores)[::-1][:5], atol=1e-5)
+    assert len(index.search(queries[0], 100)) == 50
+    logger.info("ToolEmbeddingIndex Test Passed!")
+
+def test_semantic_selector():
+    logger.info("Testing SemanticToolSelector...")
+    from tools.registry import ToolRegistry
+    from routing import semantic_router
+
+    catalog = ToolRegistry()
+    for name, description in (("get_weather", "weather forecast for a city"),
+                              ("get_stock", "stock price for a ticker symbol"),
+                              ("search_papers", "search academic papers by topic"),
+                              ("convert_currency", "convert an amount between currencies")):
+        catalog.register(name, description)(lambda query: query)
+    original = semantic_router.registry
+    semantic_router.registry = catalog
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tool_calls, query_calls = [], []
+            cache_path = os.path.join(tmp, "tools.npz")
+
+            def selector():
+                s = semantic_router.SemanticToolSelector(
+                    cache_path, QueryEmbeddingCache(_word_embed(query_calls), "m", batch_window_s=0.001))
+                s._index.embed_many = _word_embed(tool_calls)
+                return s
+
+            first = selector()
+            queries = ["weather in paris", "stock price of acme", "papers on topic models"]
+            batch = first.select_tools_many(queries, top_k=2)
+            assert len(query_calls) == 1 and len(query_calls[0]) == 3  # one embedding request
+            for query, selected in zip(queries, batch):
+                single = first.select_tools(query, top_k=2)
+                assert [(t.name, round(score, 5)) for t, score in single] == \
+                       [(t.name, round(score, 5)) for t, score in selected]
+            assert batch[0][0][0].name == "get_weather" and batch[1][0][0].name == "get_stock"
+
+            # An unchanged catalog is read back from the cache file
+            assert len(tool_calls) == 1
+            second = selector()
+            second.build_index()
+            assert second._index.embedded == 0 and len(tool_calls) == 1
+
+            # Editing one description re-embeds that tool only
+            catalog.get_tool("get_stock").description = "share price quote for a ticker"
+            second.build_index()
+            assert second._index.embedded == 1 and tool_calls[-1] == ["share price quote for a ticker"]
+    finally:
+        semantic_router.registry = original
+    logger.info("SemanticToolSelector Test Passed!")
+
+def test_history_compaction():
+    logger.info("Testing HistoryCompactor...")
+    output = " ".join(f"Entry{i} misc{i} other{i} notes{i}." for i in range(200))
+    output += " Tokyo population is 14 million."
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "Tokyo population?"}]
+    for i in range(4):
+        messages.append({"role": "assistant", "content": "", "tool_calls": []})
+        messages.append({"role": "tool", "tool_call_id": f"c{i}", "name": "search", "content": output})
+
+    compactor = HistoryCompactor(threshold_tokens=3000, keep_recent_steps=2, max_chars=200)
+    assert compactor.compact(messages) >= 1
+    first = messages[3]["content"]
+    assert first.startswith(f"{COMPACTED_PREFIX}search output, ") and "Tokyo population" in first
+    assert compactor.archive["c0"] == output
+    # The last two steps are kept verbatim
+    assert messages[7]["content"] == output and messages[9]["content"] == output
+    # Below the threshold nothing is touched
+    assert HistoryCompactor().compact(messages) == 0
+    logger.info("HistoryCompactor Test Passed!")
+
+if __name__ == "__main__":
+    test_embedding_store_recovery()
+    test_embedding_cache_batching()
+    test_embedding_cache_failures()
+    test_tool_index()
+    test_semantic_selector()
+    test_history_compaction()
@@ -0,0 +1,61 @@
+"""
+Benchmark: BaseAgent construction cost with 50 registered tools.
+
+Compares building every tool schema per agent (the old behaviour, calling
+model_json_schema() each time) with sharing the registry's cached
+SchemaBundle.
+
+Usage:
+    uv run python benchmarks/bench_agent_construction.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.agent.base import BaseAgent
+from src.tools.registry import registry
+
+N_TOOLS = 50
+N_AGENTS = 500
+
+
+def _make_tool(i: int):
+    def tool(query: str, limit: int = 10, include_snippets: bool = True) -> str:
+        return f"{i}:{query}"
+    return tool
+
+
+def register_tools():
+    for i in range(N_TOOLS):
+        registry.register(f"bench_tool_{i}", f"Benchmark tool number {i}.")(_make_tool(i))
+
+
+def uncached_schemas() -> list[dict]:
+    return [tool._build_openai_schema() for tool in registry.get_all_tools()]
+
+
+def bench(label: str, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(N_AGENTS):
+        fn()
+    per_call_us = (time.perf_counter() - start) / N_AGENTS * 1e6
+    print(f"{label:<32} {per_call_us:>10.1f} µs")
+    return per_call_us
+
+
+def main():
+    register_tools()
+    print(f"{len(registry.get_all_tools())} tools, {N_AGENTS} agents\n")
+    schema_only = bench("schemas: rebuilt per agent", uncached_schemas)
+    bundle_only = bench("schemas: shared bundle", lambda: list(registry.schema_bundle().schemas))
+    agent_uncached = bench("BaseAgent + rebuilt schemas", lambda: (BaseAgent(verbose=False), uncached_schemas()))
+    agent_cached = bench("BaseAgent (shared bundle)", lambda: BaseAgent(verbose=False))
+    print(f"\nschema speedup: {schema_only / bundle_only:.0f}x, "
+          f"agent construction speedup: {agent_uncached / agent_cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: prompt tokens per step over a 20-step ReAct run, by compaction strategy.
+
+A stubbed LLM asks for one read_webpage-style call per step; the tool
+returns up to 10,000 chars of real page text extracted from the docs/ slide
+decks. Each strategy runs the same 20 steps through BaseAgent, and the
+prompt sent at every step is measured with the same estimator the budget
+checks use. Also prints the total prompt tokens for the run and the time
+spent compacting.
+
+Usage:
+    uv run python benchmarks/bench_compaction.py
+"""
+
+import asyncio
+import glob
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")  # no network fetch
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import src.agent.base as base_module
+from src.agent.base import BaseAgent
+from src.agent.compaction import build_compactor
+from src.observability.budget import estimate_prompt_tokens
+from src.observability.profiler import process_profile
+from src.tools.html_extract import get_extractor
+from src.tools.registry import registry
+from src.tools.search_tool import MAX_PAGE_CHARS
+
+CORPUS_GLOB = os.path.join(ROOT, "..", "docs", "*", "slides", "*.html")
+STEPS = 20
+MODEL = "gpt-4o"
+QUERY = "How do production agent systems keep cost and latency under control?"
+STRATEGIES = ("none", "truncate", "extractive")
+
+
+def load_pages() -> list[str]:
+    extractor = get_extractor()
+    pages = []
+    for path in sorted(glob.glob(CORPUS_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            pages.append(extractor.extract(f.read(), MAX_PAGE_CHARS))
+    if not pages:
+        sys.exit(f"No HTML pages at {CORPUS_GLOB}")
+    return pages
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def run(strategy: str, tool) -> list[int]:
+    prompt_tokens: list[int] = []
+
+    async def fake_acompletion(model, messages, tools=None, **kwargs):
+        prompt_tokens.append(estimate_prompt_tokens(messages, model, tools))
+        step = len(prompt_tokens)
+        if step > STEPS:
+            return _response(content="Final answer.")
+        call = SimpleNamespace(
+            id=f"call_{step}",
+            function=SimpleNamespace(name=tool.name, arguments=json.dumps({"n": step})),
+        )
+        return _response(content=f"Step {step}: reading source {step}.", tool_calls=[call])
+
+    base_module.acompletion = fake_acompletion
+    agent = BaseAgent(
+        model=MODEL,
+        max_steps=STEPS + 1,
+        verbose=False,
+        tools=[tool],
+        compactor=build_compactor(strategy),
+        profile=True,
+    )
+    asyncio.run(agent.run(QUERY))
+    return prompt_tokens[:STEPS]
+
+
+def main():
+    pages = load_pages()
+
+    @registry.register("bench_read_page", "Read one source page")
+    def bench_read_page(n: int) -> str:
+        return pages[n % len(pages)]
+
+    tool = registry.get_tool("bench_read_page")
+    results, compaction_ms = {}, {}
+    for strategy in STRATEGIES:
+        process_profile.clear()
+        results[strategy] = run(strategy, tool)
+        compaction_ms[strategy] = process_profile.summary().get("step;compaction", {}).get("total_ms", 0.0)
+
+    print(f"{STEPS} steps, one ~{sum(map(len, pages)) // len(pages):,}-char page per step, {MODEL}\n")
+    print(f"{'step':>4} " + " ".join(f"{s:>11}" for s in STRATEGIES))
+    for step in range(STEPS):
+        print(f"{step + 1:>4} " + " ".join(f"{results[s][step]:>11,}" for s in STRATEGIES))
+    print(f"\n{'total':>4} " + " ".join(f"{sum(results[s]):>11,}" for s in STRATEGIES))
+    print(f"{'ms':>4} " + " ".join(f"{compaction_ms[s]:>11.1f}" for s in STRATEGIES)
+          + "   (time spent compacting)")
+
+
+if __name__ == "__main__":
+    main()
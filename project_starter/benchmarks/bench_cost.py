@@ -0,0 +1,72 @@
+"""
+Benchmark: per-step cost calculation, litellm.completion_cost vs CostTracker.
+
+Prices 20,000 LiteLLM ModelResponse objects (gpt-4o, realistic usage)
+both ways and prints the mean µs per step. CostTracker resolves the model's
+prices once and then does plain arithmetic on `usage`, while also updating
+its per-query, per-model and per-agent totals.
+
+Usage:
+    uv run python benchmarks/bench_cost.py
+"""
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")  # no network fetch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from litellm import ModelResponse, completion_cost
+
+from src.observability.cost_tracker import CostTracker
+
+N_STEPS = 20_000
+MODEL = "gpt-4o"
+
+
+def make_responses() -> list[ModelResponse]:
+    rng = random.Random(0)
+    return [
+        ModelResponse(
+            model=MODEL,
+            choices=[{"message": {"role": "assistant", "content": "ok"}}],
+            usage={
+                "prompt_tokens": rng.randint(500, 8000),
+                "completion_tokens": rng.randint(20, 800),
+                "total_tokens": 0,
+            },
+        )
+        for _ in range(N_STEPS)
+    ]
+
+
+def per_step_us(fn, responses) -> tuple[float, float]:
+    start = time.perf_counter()
+    total = sum(fn(i, r) for i, r in enumerate(responses))
+    return (time.perf_counter() - start) / len(responses) * 1e6, total
+
+
+def main():
+    responses = make_responses()
+    tracker = CostTracker()
+    tracker.start_query("benchmark")
+
+    litellm_us, litellm_total = per_step_us(
+        lambda i, r: completion_cost(completion_response=r), responses
+    )
+    tracker_us, tracker_total = per_step_us(
+        lambda i, r: tracker.log_completion(i, r, agent_name="Researcher", model=MODEL).cost_usd,
+        responses,
+    )
+
+    print(f"{N_STEPS:,} {MODEL} steps\n")
+    print(f"{'method':<26} {'µs/step':>9} {'total $':>10}")
+    print(f"{'litellm.completion_cost':<26} {litellm_us:>9.1f} {litellm_total:>10.4f}")
+    print(f"{'CostTracker.log_completion':<26} {tracker_us:>9.1f} {tracker_total:>10.4f}")
+    print(f"\nspeedup: {litellm_us / tracker_us:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
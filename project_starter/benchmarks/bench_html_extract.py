@@ -0,0 +1,62 @@
+"""
+Benchmark: read_webpage text extraction time and output parity.
+
+The corpus is the saved HTML slide decks under docs/ (real Quarto/reveal.js
+pages, 55–115 KB each, script-heavy). Each page is extracted with the
+BeautifulSoup path and the lxml streaming path at the read_webpage limit
+(10,000 chars) and without a limit, and the outputs are compared.
+
+Usage:
+    uv run python benchmarks/bench_html_extract.py    # needs lxml (pip install -e ".[fast]")
+"""
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.tools.html_extract import LxmlStreamExtractor, SoupExtractor
+from src.tools.search_tool import MAX_PAGE_CHARS
+
+CORPUS_GLOB = os.path.join(ROOT, "..", "docs", "*", "slides", "*.html")
+REPEAT = 5
+
+
+def time_ms(extractor, html: str, limit: int) -> tuple[float, str]:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        text = extractor.extract(html, limit)
+    return (time.perf_counter() - start) / REPEAT * 1000, text
+
+
+def main():
+    pages = sorted(glob.glob(CORPUS_GLOB))
+    if not pages:
+        sys.exit(f"No HTML corpus found at {CORPUS_GLOB}")
+    soup, lxml = SoupExtractor(), LxmlStreamExtractor()
+
+    print(f"{'page':<44} {'KB':>5} {'soup ms':>8} {'lxml ms':>8} {'full lxml':>9} {'parity':>7}")
+    totals = [0.0, 0.0]
+    mismatches = 0
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        soup_ms, soup_text = time_ms(soup, html, MAX_PAGE_CHARS)
+        lxml_ms, lxml_text = time_ms(lxml, html, MAX_PAGE_CHARS)
+        full_ms, full_text = time_ms(lxml, html, len(html))
+        parity = soup_text == lxml_text and soup.extract(html, len(html)) == full_text
+        mismatches += not parity
+        totals[0] += soup_ms
+        totals[1] += lxml_ms
+        print(f"{os.path.basename(path)[:44]:<44} {len(html) / 1024:>5.0f} "
+              f"{soup_ms:>8.1f} {lxml_ms:>8.1f} {full_ms:>9.1f} {'ok' if parity else 'DIFF':>7}")
+
+    print(f"\n{len(pages)} pages: soup {totals[0]:.0f} ms, lxml {totals[1]:.0f} ms "
+          f"({totals[0] / totals[1]:.1f}x faster), {mismatches} parity mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: requests per second with and without HTTP connection pooling.
+
+Starts a local keep-alive HTTP/1.1 server as a stand-in for real sites and
+fetches from it with:
+  - requests.get()           → new session + TCP connection per request
+  - get_session().get()      → shared pooled session (what the tools use)
+from 1 and several worker threads. Loopback has no TLS and ~0 RTT, so this
+understates the gain against real HTTPS hosts.
+
+Usage:
+    uv run python benchmarks/bench_http_pooling.py
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.tools.http_client import get_session
+
+N_REQUESTS = 2000
+BODY = b"<html><body><p>" + b"lorem ipsum " * 200 + b"</p></body></html>"
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # avoid delayed-ACK stalls on keep-alive
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server() -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def requests_per_second(fetch, url: str, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for response in pool.map(lambda _: fetch(url, timeout=10), range(N_REQUESTS)):
+            response.raise_for_status()
+    return N_REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    server, url = start_server()
+    session = get_session()
+    print(f"{N_REQUESTS} GETs against {url}\n")
+    print(f"{'workers':>8} {'unpooled':>12} {'pooled':>12} {'speedup':>8}")
+    try:
+        for workers in (1, 4, 8):
+            unpooled = requests_per_second(requests.get, url, workers)
+            pooled = requests_per_second(session.get, url, workers)
+            print(f"{workers:>8} {unpooled:>10,.0f}/s {pooled:>10,.0f}/s {pooled / unpooled:>7.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
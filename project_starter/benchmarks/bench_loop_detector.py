@@ -0,0 +1,73 @@
+"""
+Benchmark: AdvancedLoopDetector.check_tool_call latency over a 10,000-step history.
+
+Prints the mean per-check latency for each block of 1,000 checks. The
+indexed detector should stay flat as history grows; a list-scanning
+detector (the previous implementation, reproduced below as LinearScan)
+grows linearly per check, i.e. quadratically over a run.
+
+Usage:
+    uv run python benchmarks/bench_loop_detector.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.observability.loop_detector import AdvancedLoopDetector
+
+N_STEPS = 10_000
+BLOCK = 1_000
+WORDS = "agent loop search retrieval vector cost trace tool latency model query page".split()
+
+
+class LinearScan:
+    """Exact-match count as the previous detector did it: scan the whole history."""
+
+    def __init__(self):
+        self.tool_history: list[tuple[str, str]] = []
+
+    def check_tool_call(self, tool_name: str, tool_input: str):
+        current = (tool_name, tool_input.strip())
+        sum(1 for t, i in self.tool_history if (t, i.strip()) == current)
+        self.tool_history.append(current)
+
+
+def make_calls() -> list[tuple[str, str]]:
+    rng = random.Random(0)
+    return [
+        (rng.choice(["search_web", "read_webpage"]),
+         '{"query": "%s"}' % " ".join(rng.choices(WORDS, k=6)))
+        for _ in range(N_STEPS)
+    ]
+
+
+def block_latencies_us(detector, calls) -> list[float]:
+    latencies = []
+    for start in range(0, len(calls), BLOCK):
+        t0 = time.perf_counter()
+        for tool, args in calls[start:start + BLOCK]:
+            detector.check_tool_call(tool, args)
+        latencies.append((time.perf_counter() - t0) / BLOCK * 1e6)
+    return latencies
+
+
+def main():
+    calls = make_calls()
+    columns = {
+        "linear scan": block_latencies_us(LinearScan(), calls),
+        "indexed": block_latencies_us(AdvancedLoopDetector(), calls),
+        "indexed+minhash": block_latencies_us(AdvancedLoopDetector(fuzzy_mode="minhash"), calls),
+    }
+    print("mean µs per check_tool_call, by position in the history\n")
+    print(f"{'steps':>13} " + " ".join(f"{name:>16}" for name in columns))
+    for i in range(N_STEPS // BLOCK):
+        row = " ".join(f"{lat[i]:>16.1f}" for lat in columns.values())
+        print(f"{i * BLOCK:>6}-{(i + 1) * BLOCK:<6} {row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: wall-clock scaling of parallel tool fan-out in BaseAgent.run().
+
+acompletion is stubbed so the first LLM turn requests N slow tool calls and
+the second turn answers. With sequential execution a step costs N x latency;
+in parallel it should cost roughly one latency. Sync tools are capped by the
+default thread pool size; async tools are awaited on the loop and are not.
+
+Usage:
+    uv run python benchmarks/bench_parallel_tools.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.agent.base as base_module
+from src.agent.base import BaseAgent
+from src.tools.registry import registry
+
+TOOL_LATENCY_S = 0.2
+FAN_OUT = [1, 2, 5, 10, 50]
+
+
+@registry.register("slow_lookup", "Fake I/O-bound tool for benchmarking.", max_concurrency=16)
+def slow_lookup(key: str) -> str:
+    time.sleep(TOOL_LATENCY_S)
+    return f"value-for-{key}"
+
+
+@registry.register("async_lookup", "Fake async I/O-bound tool for benchmarking.", max_concurrency=64)
+async def async_lookup(key: str) -> str:
+    await asyncio.sleep(TOOL_LATENCY_S)
+    return f"value-for-{key}"
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def make_stub(n_calls: int, tool_name: str):
+    async def fake_acompletion(model, messages, **kwargs):
+        if messages[-1]["role"] == "tool":
+            return _response(content="done")
+        calls = [
+            SimpleNamespace(
+                id=f"call_{i}",
+                function=SimpleNamespace(name=tool_name, arguments=json.dumps({"key": str(i)})),
+            )
+            for i in range(n_calls)
+        ]
+        return _response(tool_calls=calls)
+    return fake_acompletion
+
+
+async def time_run(n_calls: int, max_parallel_tools: int, tool_name: str = "slow_lookup") -> float:
+    base_module.acompletion = make_stub(n_calls, tool_name)
+    agent = BaseAgent(
+        model="stub",
+        verbose=False,
+        tools=[registry.get_tool(tool_name)],
+        max_parallel_tools=max_parallel_tools,
+    )
+    start = time.perf_counter()
+    await agent.run("benchmark")
+    return time.perf_counter() - start
+
+
+async def main():
+    print(f"tool latency: {TOOL_LATENCY_S * 1000:.0f} ms")
+    print(f"{'calls':>6} {'sequential (s)':>15} {'parallel (s)':>13} {'speedup':>8} {'async tool (s)':>15}")
+    for n in FAN_OUT:
+        sequential = await time_run(n, max_parallel_tools=1)
+        parallel = await time_run(n, max_parallel_tools=n)
+        native = await time_run(n, max_parallel_tools=n, tool_name="async_lookup")
+        print(f"{n:>6} {sequential:>15.3f} {parallel:>13.3f} {sequential / parallel:>7.1f}x {native:>15.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark: check_output_stagnation latency and retained memory over 10,000 outputs.
+
+Feeds 300-word agent outputs through each stagnation backend and prints
+the mean µs per check, then (in a second, traced pass) the memory still
+held by the detector at the end. The previous implementation (reproduced
+below as Unbounded) kept every output and re-tokenized the whole window on
+every check.
+
+Usage:
+    uv run python benchmarks/bench_stagnation.py
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.observability.loop_detector import AdvancedLoopDetector, np
+
+N_OUTPUTS = 10_000
+WORDS_PER_OUTPUT = 300
+WINDOW = 3
+
+
+class Unbounded:
+    """Stagnation check as the previous detector did it."""
+
+    def __init__(self):
+        self.output_history: list[str] = []
+
+    def check_output_stagnation(self, output: str):
+        self.output_history.append(output)
+        recent = self.output_history[-WINDOW:]
+        for i in range(len(recent)):
+            for j in range(i + 1, len(recent)):
+                AdvancedLoopDetector._set_similarity(
+                    AdvancedLoopDetector._tokens(recent[i]),
+                    AdvancedLoopDetector._tokens(recent[j]),
+                )
+
+
+def make_outputs() -> list[str]:
+    rng = random.Random(0)
+    vocab = [f"word{i}" for i in range(2_000)]
+    return [" ".join(rng.choices(vocab, k=WORDS_PER_OUTPUT)) for _ in range(N_OUTPUTS)]
+
+
+def per_check_us(detector, outputs) -> float:
+    start = time.perf_counter()
+    for output in outputs:
+        detector.check_output_stagnation(output)
+    return (time.perf_counter() - start) / len(outputs) * 1e6
+
+
+def retained_kib(detector, outputs) -> float:
+    """Memory allocated during the run and still held by the detector."""
+    tracemalloc.start()
+    for output in outputs:
+        # Fresh copy, so only strings the detector keeps are counted
+        detector.check_output_stagnation(output.encode().decode())
+    retained, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / 1024
+
+
+def main():
+    outputs = make_outputs()
+    factories = {"unbounded list": Unbounded}
+    backends = ["jaccard"] + (["cosine", "shingle"] if np is not None else [])
+    for backend in backends:
+        factories[backend] = lambda backend=backend: AdvancedLoopDetector(
+            stagnation_window=WINDOW, stagnation_backend=backend
+        )
+
+    print(f"{N_OUTPUTS:,} outputs of {WORDS_PER_OUTPUT} words, window {WINDOW}\n")
+    print(f"{'detector':<16} {'µs/check':>10} {'retained KiB':>14}")
+    for name, factory in factories.items():
+        latency = per_check_us(factory(), outputs)
+        retained = retained_kib(factory(), outputs)
+        print(f"{name:<16} {latency:>10.1f} {retained:>14,.0f}")
+    if np is None:
+        print("\n(numpy not installed: cosine and shingle backends skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: Tool.execute calls per second, fast-path validation vs pydantic.
+
+The "pydantic" column forces the original path (model instance +
+model_dump() on every call); "fast path" is the compiled validator that
+skips validation for already-typed primitive arguments.
+
+Usage:
+    uv run python benchmarks/bench_tool_validation.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.tools.registry import Tool
+
+N_CALLS = 100_000
+
+
+def add(a: float, b: float) -> float:
+    return a + b
+
+
+def lookup(key: str, default: str = "", case_sensitive: bool = False) -> str:
+    return key if case_sensitive else key.lower()
+
+
+CASES = [
+    ("add(float, float)", Tool("add", add, "Add two numbers."), {"a": 1.5, "b": 2.5}),
+    ("lookup(str) + defaults", Tool("lookup", lookup, "Look up a key."), {"key": "Paris"}),
+    ("add(int, int) -> fallback", Tool("add", add, "Add two numbers."), {"a": 1, "b": 2}),
+]
+
+
+def calls_per_second(tool: Tool, kwargs: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(N_CALLS):
+        tool.execute(**kwargs)
+    return N_CALLS / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'case':<28} {'pydantic':>12} {'fast path':>12} {'speedup':>8}")
+    for label, tool, kwargs in CASES:
+        fast = calls_per_second(tool, kwargs)
+        validator, tool._fast_validator = tool._fast_validator, None
+        slow = calls_per_second(tool, kwargs)
+        tool._fast_validator = validator
+        print(f"{label:<28} {slow:>10,.0f}/s {fast:>10,.0f}/s {fast / slow:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
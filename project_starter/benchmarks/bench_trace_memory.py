@@ -0,0 +1,154 @@
+"""
+Benchmark: bytes held per finished trace for a typical 10-step research run.
+
+Each simulated run has 10 steps; every step reasons briefly, calls
+search_web (~1.5 KB of results) and read_webpage (up to 10,000 chars of
+real page text extracted from the docs/ slide decks). Runs are pushed
+through a TraceStore and the memory it retains is measured with
+tracemalloc, for:
+
+- plain dataclasses: the previous ToolCallRecord / AgentStep / Trace
+  (per-instance __dict__, names not interned), reproduced below
+- slotted: the current slotted, name-interning dataclasses
+- slotted + compressed: TRACE_STORE_COMPRESS=true
+- slotted + compressed + truncated: also TRACE_MAX_OUTPUT_CHARS=2000
+
+Usage:
+    uv run python benchmarks/bench_trace_memory.py
+"""
+
+import glob
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.observability.trace_store import TraceStore
+from src.observability.tracer import AgentStep, ToolCallRecord, Trace, truncate_output
+from src.tools.html_extract import get_extractor
+from src.tools.search_tool import MAX_PAGE_CHARS
+
+CORPUS_GLOB = os.path.join(ROOT, "..", "docs", "*", "slides", "*.html")
+N_TRACES = 200
+STEPS = 10
+
+
+@dataclass
+class PlainToolCallRecord:
+    tool_name: str
+    tool_input: dict
+    tool_output: str
+    duration_ms: float
+    args_fingerprint: str = ""
+
+
+@dataclass
+class PlainAgentStep:
+    step_number: int
+    reasoning: Optional[str]
+    tool_calls: list = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    duration_ms: float = 0.0
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class PlainTrace:
+    trace_id: str
+    agent_name: str
+    input_query: str
+    model: str = ""
+    steps: list = field(default_factory=list)
+    final_output: Optional[str] = None
+    status: str = "completed"
+
+
+def load_pages() -> list[str]:
+    extractor = get_extractor()
+    pages = []
+    for path in sorted(glob.glob(CORPUS_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            pages.append(extractor.extract(f.read(), MAX_PAGE_CHARS))
+    if len(pages) <= STEPS:
+        sys.exit(f"Need more than {STEPS} HTML pages at {CORPUS_GLOB}")
+    return pages
+
+
+def fresh(text: str) -> str:
+    """A new string object, as parsing an LLM response or HTTP body would produce."""
+    return text.encode().decode()
+
+
+def build_run(i: int, pages: list[str], rng: random.Random, classes, max_output_chars: int):
+    record_cls, step_cls, trace_cls = classes
+    trace = trace_cls(trace_id=f"{i:08x}", agent_name=fresh("Researcher"),
+                      input_query=f"research question number {i}", model=fresh("gpt-4o"))
+    # No page is read twice in a run, and search snippets come from pages the
+    # run never reads, so compression cannot profit from repeated outputs
+    order = rng.sample(pages, len(pages))
+    read, searched = order[:STEPS], order[STEPS:]
+    for n, page in enumerate(read, start=1):
+        source = rng.choice(searched)
+        start = rng.randrange(0, max(len(source) - 1500, 1))
+        outputs = [
+            ("search_web", {"query": f"topic {i} angle {n}"}, source[start:start + 1500]),
+            ("read_webpage", {"url": f"https://example.com/{i}/{n}"}, page),
+        ]
+        trace.steps.append(step_cls(
+            step_number=n,
+            reasoning=fresh(f"Step {n}: the sources so far cover part of the question; "
+                            f"next I will look for corroborating evidence on angle {n}."),
+            tool_calls=[
+                record_cls(fresh(name), args, fresh(truncate_output(out, max_output_chars)), 120.0)
+                for name, args, out in outputs
+            ],
+        ))
+    trace.final_output = fresh("A final synthesized answer. " * 20)
+    return trace
+
+
+def retained_per_trace(pages, classes, compress: bool, max_output_chars: int = 0) -> float:
+    rng = random.Random(0)
+    store = TraceStore(
+        lambda t: t.to_dict(), Trace.from_dict,
+        max_traces=N_TRACES, max_bytes=1 << 40, compress=compress,
+    )
+    tracemalloc.start()
+    for i in range(N_TRACES):
+        trace = build_run(i, pages, rng, classes, max_output_chars)
+        store.add(trace.trace_id, trace)
+        store.finish(trace.trace_id, 0)
+    del trace
+    retained, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / N_TRACES
+
+
+def main():
+    pages = load_pages()
+    plain = (PlainToolCallRecord, PlainAgentStep, PlainTrace)
+    slotted = (ToolCallRecord, AgentStep, Trace)
+    rows = [
+        ("plain dataclasses", retained_per_trace(pages, plain, compress=False)),
+        ("slotted", retained_per_trace(pages, slotted, compress=False)),
+        ("slotted + compressed", retained_per_trace(pages, slotted, compress=True)),
+        ("slotted + compressed + truncated",
+         retained_per_trace(pages, slotted, compress=True, max_output_chars=2000)),
+    ]
+    baseline = rows[0][1]
+    print(f"{N_TRACES} runs x {STEPS} steps, {len(pages)} source pages\n")
+    print(f"{'representation':<34} {'KB/trace':>9} {'vs plain':>9}")
+    for name, per_trace in rows:
+        print(f"{name:<34} {per_trace / 1024:>9.1f} {baseline / per_trace:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
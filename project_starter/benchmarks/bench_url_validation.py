@@ -0,0 +1,75 @@
+"""
+Benchmark: validate_url throughput for 1,000 URLs against a stub resolver.
+
+The stub resolver sleeps to simulate a DNS round trip and answers with a
+public address (a few hosts fail, to exercise negative caching). Compares:
+  - no cache:   one blocking lookup per URL (the old behaviour)
+  - cached:     validate_url() with the memoizing DNSCache
+  - async:      validate_urls() — distinct hosts resolved concurrently
+
+Usage:
+    uv run python benchmarks/bench_url_validation.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.tools.dns_cache as dns_module
+import src.tools.search_tool as search_module
+from src.tools.dns_cache import DNSCache
+
+N_URLS = 1000
+N_HOSTS = 100
+DNS_LATENCY_S = 0.005
+
+
+def stub_resolver(hostname: str) -> list[str]:
+    time.sleep(DNS_LATENCY_S)
+    if hostname.startswith("dead"):
+        raise OSError("NXDOMAIN")
+    return ["93.184.216.34"]
+
+
+def make_urls() -> list[str]:
+    rng = random.Random(0)
+    hosts = [f"site{i}.example.net" for i in range(N_HOSTS - 5)] + [f"dead{i}.example.net" for i in range(5)]
+    return [f"https://{rng.choice(hosts)}/page/{i}" for i in range(N_URLS)]
+
+
+def use_cache(cache: DNSCache):
+    dns_module._dns_cache = cache
+
+
+def main():
+    urls = make_urls()
+    print(f"{N_URLS} URLs over {N_HOSTS} hosts, stub DNS latency {DNS_LATENCY_S * 1000:.0f} ms\n")
+
+    use_cache(DNSCache(stub_resolver, ttl_s=0, negative_ttl_s=0))
+    start = time.perf_counter()
+    uncached = [search_module.validate_url(u) for u in urls]
+    t_uncached = time.perf_counter() - start
+
+    cache = DNSCache(stub_resolver, ttl_s=300, negative_ttl_s=60)
+    use_cache(cache)
+    start = time.perf_counter()
+    cached = [search_module.validate_url(u) for u in urls]
+    t_cached = time.perf_counter() - start
+
+    use_cache(DNSCache(stub_resolver, ttl_s=300, negative_ttl_s=60))
+    start = time.perf_counter()
+    concurrent = asyncio.run(search_module.validate_urls(urls))
+    t_async = time.perf_counter() - start
+
+    assert uncached == cached == concurrent
+    for label, elapsed in (("no cache", t_uncached), ("cached", t_cached), ("async + cached", t_async)):
+        print(f"{label:<16} {elapsed:>8.3f} s  {N_URLS / elapsed:>10,.0f} URLs/s")
+    print(f"\ncache hits/misses: {cache.hits}/{cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
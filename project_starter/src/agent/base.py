@@ -1,24 +1,39 @@
 """
 BaseAgent: a ReAct agent with built-in observability.
 
-Complete sections are marked COMPLETE.
-The core run() method is marked TODO — that is your main implementation challenge.
+All sections are marked COMPLETE. Tool calls issued in a single LLM turn are
+executed concurrently, bounded by a per-agent and a per-tool semaphore.
 """
 
 import asyncio
 import json
 import time
-from typing import Optional
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
 
 import structlog
-from litellm import acompletion, completion_cost
+from litellm import acompletion, stream_chunk_builder
 from pydantic import ValidationError
 
+from src.agent.compaction import HistoryCompactor, build_compactor
+from src.agent.events import (
+    AgentEvent,
+    AnswerDelta,
+    StepStart,
+    ToolCallEvent,
+    ToolResultEvent,
+    TraceEnd,
+)
 from src.agent.prompts import DEFAULT_SYSTEM_PROMPT
 from src.config import settings
+from src.exceptions import TokenBudgetExceeded
+from src.observability.budget import Budget, BudgetManager
+from src.observability.cost_tracker import CostTracker
 from src.observability.loop_detector import AdvancedLoopDetector
+from src.observability.profiler import NullProfile, Profile, process_profile
 from src.observability.tracer import AgentStep, AgentTracer, ToolCallRecord
 from src.tools.registry import registry
+from src.utils import ArgsFingerprint
 
 logger = structlog.get_logger()
 
@@ -30,6 +45,7 @@ class BaseAgent:
     - Loop detection (exact, fuzzy, stagnation)
     - Per-step cost tracking
     - Async execution with parallel tool calling
+    - Optional per-phase latency profiling (profile=True)
     """
 
     # ── COMPLETE: __init__ ────────────────────────────────────────────────
@@ -42,34 +58,72 @@ class BaseAgent:
         verbose: bool = True,
         system_prompt: str | None = None,
         tools: list | None = None,
+        max_parallel_tools: int | None = None,
+        profile: bool | None = None,
+        cost_tracker: CostTracker | None = None,
+        budget: Budget | None = None,
+        compactor: HistoryCompactor | None = None,
     ):
         self.model = model or settings.model_name
         self.max_steps = max_steps
+        self.max_parallel_tools = max_parallel_tools or settings.max_parallel_tools
         self.agent_name = agent_name
         self.system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
 
         if tools is None:
-            self.tools = registry.get_all_tools()
+            bundle = registry.schema_bundle()
+            self.tools = list(bundle.tools)
+            self.tools_schema = list(bundle.schemas)
         else:
             self.tools = tools
-
-        self.tools_schema = [tool.to_openai_schema() for tool in self.tools]
+            self.tools_schema = [tool.to_openai_schema() for tool in self.tools]
 
         # Observability stack
         self.tracer = AgentTracer(verbose=verbose)
-        self.loop_detector = AdvancedLoopDetector()
+        self.loop_detector = AdvancedLoopDetector(
+            stagnation_backend=settings.stagnation_backend
+        )
+        # Pass a shared tracker to aggregate several agents; whoever starts a
+        # query on it ends it, so an orchestrator's query spans all its agents
+        self.cost_tracker = cost_tracker or CostTracker()
+        self._owns_cost_query = False
+        # Budget every LLM call is checked against; None = a fresh
+        # BUDGET_QUERY_* budget per run()
+        self.budget = budget
+        self.budget_manager: Optional[BudgetManager] = None
+        # Shrinks old tool outputs once the prompt passes a token threshold
+        self.compactor = compactor or build_compactor()
+
+        # Per-phase timings of the current run; a fresh Profile per run()
+        self.profile_enabled = settings.profile if profile is None else profile
+        self.profile: Profile = NullProfile()
 
         # Shared state across hooks within a single run()
         self._current_trace_id: Optional[str] = None
+        self._run_open = False  # trace started and not yet ended
+
+        # Concurrency limits, created per run() so they bind to its event loop
+        self._agent_semaphore: Optional[asyncio.Semaphore] = None
+        self._tool_semaphores: dict[str, asyncio.Semaphore] = {}
 
     # ── COMPLETE: Tool execution ───────────────────────────────────────────
 
-    async def _execute_tool(self, tool_name: str, arguments: dict) -> str:
-        """Registry lookup + loop detection + asyncio.to_thread + error handling."""
+    async def _execute_tool(
+        self,
+        tool_name: str,
+        arguments: dict,
+        fingerprint: Optional[ArgsFingerprint] = None,
+    ) -> str:
+        """Registry lookup + loop detection + dispatch + error handling.
+
+        async def tools are awaited directly; sync tools run via asyncio.to_thread.
+        fingerprint is the call's canonical arguments, computed here if not given.
+        """
+        if fingerprint is None:
+            fingerprint = ArgsFingerprint.of(arguments)
         # Check for loops BEFORE executing
-        loop_check = self.loop_detector.check_tool_call(
-            tool_name, json.dumps(arguments)
-        )
+        with self.profile.span("step", "tools", f"tool:{tool_name}", "loop_detection"):
+            loop_check = self.loop_detector.check_tool_call(tool_name, fingerprint)
         if loop_check.is_looping:
             logger.warning(
                 "loop_detected",
@@ -87,7 +141,10 @@ class BaseAgent:
             logger.error("tool_not_found", tool=tool_name)
             return f"Error: Tool '{tool_name}' not found."
         try:
-            result = await asyncio.to_thread(tool.execute, **arguments)
+            if tool.is_async:
+                result = await tool.execute(**arguments)
+            else:
+                result = await asyncio.to_thread(tool.execute, **arguments)
             return str(result)
         except ValidationError as e:
             logger.warning("tool_validation_failed", tool=tool_name, error=str(e))
@@ -96,6 +153,64 @@ class BaseAgent:
             logger.error("tool_execution_failed", tool=tool_name, error=str(e))
             return f"Error: {type(e).__name__}: {e}"
 
+    def _tool_semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """Return the per-tool semaphore, creating it on first use in this run."""
+        semaphore = self._tool_semaphores.get(tool_name)
+        if semaphore is None:
+            tool = registry.get_tool(tool_name)
+            limit = (tool.max_concurrency if tool else None) or settings.tool_concurrency_limit
+            semaphore = asyncio.Semaphore(limit)
+            self._tool_semaphores[tool_name] = semaphore
+        return semaphore
+
+    async def _run_tool_call(
+        self, step: int, tool_call
+    ) -> tuple[str, dict, str, float, Optional[ArgsFingerprint]]:
+        """Parse, execute and time a single tool call under both concurrency limits."""
+        name = tool_call.function.name
+        try:
+            args = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError as e:
+            logger.warning("tool_arguments_invalid", tool=name, error=str(e))
+            return name, {}, f"Error: Tool arguments are not valid JSON. {e}", 0.0, None
+        if not isinstance(args, dict):
+            return name, {}, "Error: Tool arguments must be a JSON object.", 0.0, None
+
+        fingerprint = ArgsFingerprint.of(args)
+        # Tool slot first, so a saturated tool never holds an agent-wide slot
+        async with self._tool_semaphore(name), self._agent_semaphore:
+            start = time.perf_counter()
+            result = await self._execute_tool(name, args, fingerprint)
+            duration_ms = (time.perf_counter() - start) * 1000
+        self.profile.record(("step", "tools", f"tool:{name}"), int(duration_ms * 1e6))
+
+        with self.profile.span("step", "tools", "on_tool_result"):
+            self._on_tool_result(step, name, args, result, duration_ms)
+        return name, args, result, duration_ms, fingerprint
+
+    async def _execute_tool_calls(
+        self, step: int, tool_calls: list
+    ) -> AsyncIterator[tuple[int, tuple]]:
+        """
+        Fan out every tool call of one LLM turn concurrently.
+
+        Yields (index, (name, args, result, duration_ms, fingerprint)) as each
+        call finishes. index is the call's position in tool_calls, so results can
+        be reinserted in tool_call_id order regardless of completion order.
+        """
+        async def indexed(index: int, tool_call) -> tuple[int, tuple]:
+            return index, await self._run_tool_call(step, tool_call)
+
+        tasks = [
+            asyncio.create_task(indexed(i, tc)) for i, tc in enumerate(tool_calls)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
     # ── COMPLETE: Hooks ────────────────────────────────────────────────────
 
     def _on_step_start(self, step: int, messages: list) -> None:
@@ -114,19 +229,23 @@ class BaseAgent:
         """
         Log a completed step to the tracer and record per-step cost.
 
-        tool_calls is a list of (name, args, result, duration_ms) tuples
-        accumulated during this step.
+        tool_calls is a list of (name, args, result, duration_ms, fingerprint)
+        tuples accumulated during this step.
         """
         message = response.choices[0].message
 
-        usage = response.usage
-        input_tokens = usage.prompt_tokens if usage else 0
-        output_tokens = usage.completion_tokens if usage else 0
-
-        try:
-            step_cost = completion_cost(completion_response=response)
-        except Exception:
-            step_cost = 0.0
+        with self.profile.span("step", "on_step_end", "cost_calculation"):
+            step_cost = self.cost_tracker.log_completion(
+                step,
+                response,
+                is_tool_call=bool(tool_calls),
+                agent_name=self.agent_name,
+                model=self.model,
+            )
+        if self.budget_manager is not None:
+            self.budget_manager.settle(
+                step_cost.input_tokens, step_cost.output_tokens, step_cost.cost_usd
+            )
 
         tool_records = [
             ToolCallRecord(
@@ -134,20 +253,22 @@ class BaseAgent:
                 tool_input=args,
                 tool_output=result,
                 duration_ms=dur_ms,
+                args_fingerprint=fingerprint.hexdigest if fingerprint else "",
             )
-            for name, args, result, dur_ms in tool_calls
+            for name, args, result, dur_ms, fingerprint in tool_calls
         ]
 
         agent_step = AgentStep(
             step_number=step,
             reasoning=message.content,
             tool_calls=tool_records,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            cost_usd=step_cost,
+            input_tokens=step_cost.input_tokens,
+            output_tokens=step_cost.output_tokens,
+            cost_usd=step_cost.cost_usd,
             duration_ms=step_duration_ms,
         )
-        self.tracer.log_step(self._current_trace_id, agent_step)
+        with self.profile.span("step", "on_step_end", "tracing"):
+            self.tracer.log_step(self._current_trace_id, agent_step)
 
     def _on_loop_end(
         self,
@@ -163,8 +284,12 @@ class BaseAgent:
         if error:
             end_kwargs["error"] = error
         self.tracer.end_trace(self._current_trace_id, answer, **end_kwargs)
+        self._run_open = False
+        if self._owns_cost_query:
+            self.cost_tracker.end_query()
+            self._owns_cost_query = False
 
-    # ── TODO: run() ───────────────────────────────────────────────────────
+    # ── COMPLETE: run() / run_stream() ────────────────────────────────────
 
     async def run(self, user_query: str) -> dict:
         """
@@ -178,14 +303,207 @@ class BaseAgent:
         Returns:
             dict: {
                 "answer": str,
+                "status": "completed" | "error" | "max_steps" | "budget_exceeded",
+                "error": str,  # only when the run failed
                 "metadata": {
                     "trace_id": str,
                     "total_steps": int
                 }
             }
         """
-        # TODO: Remove this line and implement the steps above.
-        raise NotImplementedError(
-            "Implement the ReAct loop in BaseAgent.run(). "
-            "Follow the step-by-step docstring above."
+        async with aclosing(self._react_loop(user_query, stream=False)) as events:
+            async for event in events:
+                if isinstance(event, TraceEnd):
+                    return event.to_result()
+
+    async def run_stream(self, user_query: str) -> AsyncIterator[AgentEvent]:
+        """
+        Same loop as run(), but streams the LLM output.
+
+        Yields StepStart, ToolCallEvent, ToolResultEvent and AnswerDelta events
+        as they happen, and a final TraceEnd carrying the run() result. A
+        consumer that stops early ends the trace with status "cancelled".
+        """
+        async with aclosing(self._react_loop(user_query, stream=True)) as events:
+            async for event in events:
+                yield event
+
+    async def _react_loop(self, user_query: str, stream: bool) -> AsyncIterator[AgentEvent]:
+        self.loop_detector.reset()
+        self._agent_semaphore = asyncio.Semaphore(self.max_parallel_tools)
+        self._tool_semaphores = {}
+        self.profile = Profile(parent=process_profile) if self.profile_enabled else NullProfile()
+        profile = self.profile
+        self._current_trace_id = self.tracer.start_trace(
+            self.agent_name, user_query, model=self.model
+        )
+        self._owns_cost_query = self.cost_tracker.current_query is None
+        if self._owns_cost_query:
+            self.cost_tracker.start_query(user_query)
+        self.budget_manager = BudgetManager(
+            self.model, self.budget or Budget.for_query(), tools_schema=self.tools_schema
+        )
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_query},
+        ]
+
+        self._run_open = True
+        step = 0
+        try:
+            for step in range(1, self.max_steps + 1):
+                profile_step_start = time.perf_counter_ns()
+                with profile.span("step", "on_step_start"):
+                    self._on_step_start(step, messages)
+                yield StepStart(self.agent_name, step)
+                step_start = time.perf_counter()
+
+                with profile.span("step", "compaction"):
+                    self.compactor.compact(messages, self.model, self._current_trace_id)
+
+                try:
+                    with profile.span("step", "budget_check"):
+                        # Trimming applies to this request only; the history keeps every output
+                        request = self.budget_manager.preflight(messages)
+                except TokenBudgetExceeded as e:
+                    logger.warning("token_budget_exceeded", agent=self.agent_name, step=step, reason=str(e))
+                    answer = f"Error: {e}"
+                    with profile.span("step", "on_loop_end"):
+                        self._on_loop_end(answer, step - 1, status="budget_exceeded", error=str(e))
+                    profile.record(("step",), time.perf_counter_ns() - profile_step_start)
+                    yield self._trace_end(answer, step - 1, status="budget_exceeded", error=str(e))
+                    return
+
+                llm_start = time.perf_counter_ns()
+                try:
+                    if stream:
+                        response = None
+                        async with aclosing(self._stream_completion(step, request)) as items:
+                            async for item in items:
+                                if isinstance(item, AnswerDelta):
+                                    yield item
+                                else:
+                                    response = item
+                    else:
+                        response = await acompletion(
+                            model=self.model,
+                            messages=request,
+                            tools=self.tools_schema or None,
+                        )
+                except Exception as e:
+                    profile.record(("step", "llm_wait"), time.perf_counter_ns() - llm_start)
+                    self.budget_manager.cancel()
+                    logger.error("llm_call_failed", agent=self.agent_name, step=step, error=str(e))
+                    answer = f"Error: LLM call failed: {e}"
+                    with profile.span("step", "on_loop_end"):
+                        self._on_loop_end(answer, step, status="error", error=str(e))
+                    profile.record(("step",), time.perf_counter_ns() - profile_step_start)
+                    yield self._trace_end(answer, step, status="error", error=str(e))
+                    return
+                profile.record(("step", "llm_wait"), time.perf_counter_ns() - llm_start)
+
+                message = response.choices[0].message
+                tool_calls = message.tool_calls or []
+                messages.append(message)
+
+                if not tool_calls:
+                    step_duration_ms = (time.perf_counter() - step_start) * 1000
+                    with profile.span("step", "on_step_end"):
+                        self._on_step_end(step, response, [], step_duration_ms)
+                    answer = message.content or ""
+                    with profile.span("step", "on_loop_end"):
+                        self._on_loop_end(answer, step)
+                    profile.record(("step",), time.perf_counter_ns() - profile_step_start)
+                    yield self._trace_end(answer, step)
+                    return
+
+                for tool_call in tool_calls:
+                    yield ToolCallEvent(
+                        self.agent_name, step, tool_call.id,
+                        tool_call.function.name, tool_call.function.arguments,
+                    )
+
+                results: list[tuple] = [None] * len(tool_calls)
+                tools_start = time.perf_counter_ns()
+                # aclosing: pending tool tasks are cancelled if we are closed mid-step
+                async with aclosing(self._execute_tool_calls(step, tool_calls)) as finished:
+                    async for index, record in finished:
+                        results[index] = record
+                        name, _args, result, duration_ms, _fingerprint = record
+                        yield ToolResultEvent(
+                            self.agent_name, step, tool_calls[index].id, name, result, duration_ms
+                        )
+                profile.record(("step", "tools"), time.perf_counter_ns() - tools_start)
+
+                for tool_call, (name, _args, result, _dur, _fp) in zip(tool_calls, results):
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "name": name,
+                        "content": result,
+                    })
+
+                step_duration_ms = (time.perf_counter() - step_start) * 1000
+                with profile.span("step", "on_step_end"):
+                    self._on_step_end(step, response, results, step_duration_ms)
+
+                if message.content:
+                    with profile.span("step", "loop_detection"):
+                        stagnation = self.loop_detector.check_output_stagnation(message.content)
+                    if stagnation.is_looping:
+                        logger.warning("output_stagnation", agent=self.agent_name, message=stagnation.message)
+                        messages.append({"role": "user", "content": f"SYSTEM: {stagnation.message}"})
+                profile.record(("step",), time.perf_counter_ns() - profile_step_start)
+
+            answer = "[Max steps reached]"
+            with profile.span("step", "on_loop_end"):
+                self._on_loop_end(answer, self.max_steps, status="max_steps")
+            yield self._trace_end(answer, self.max_steps, status="max_steps")
+        finally:
+            if self._run_open:
+                # The consumer stopped iterating (break, aclose, cancellation)
+                # before a TraceEnd: close the trace and any query we opened
+                self.budget_manager.cancel()
+                logger.warning("agent_run_abandoned", agent=self.agent_name, step=step)
+                self._on_loop_end("", step, status="cancelled", error="Run stopped before completion")
+
+    async def _stream_completion(self, step: int, messages: list) -> AsyncIterator:
+        """
+        Stream one LLM turn: yield an AnswerDelta per content chunk, then the
+        reassembled response (with tool calls and usage) as the last item.
+        """
+        chunks = []
+        response_stream = await acompletion(
+            model=self.model,
+            messages=messages,
+            tools=self.tools_schema or None,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in response_stream:
+            chunks.append(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield AnswerDelta(self.agent_name, step, chunk.choices[0].delta.content)
+        yield stream_chunk_builder(chunks, messages=messages)
+
+    def _trace_end(
+        self,
+        answer: str,
+        total_steps: int,
+        status: str = "completed",
+        error: Optional[str] = None,
+    ) -> TraceEnd:
+        metadata = {
+            "trace_id": self._current_trace_id,
+            "total_steps": total_steps,
+        }
+        if self.profile_enabled:
+            metadata["profile"] = self.profile.summary()
+        return TraceEnd(
+            agent_name=self.agent_name,
+            answer=answer,
+            status=status,
+            error=error,
+            metadata=metadata,
         )
@@ -0,0 +1,180 @@
+"""
+Context-window compaction for the ReAct message history.
+
+Every tool result stays in `messages` for the rest of a run, so prompt
+tokens (and with them per-step latency and cost) grow with every step.
+Before each LLM call BaseAgent asks its compactor to check the history; once
+the estimated prompt passes COMPACTION_THRESHOLD_TOKENS, tool outputs older
+than the last COMPACTION_KEEP_RECENT_STEPS steps are replaced, oldest first,
+until the prompt is back under 3/4 of the threshold. Each replacement starts
+with a reference to the step and trace that hold the full output (the trace
+keeps it unless TRACE_MAX_OUTPUT_CHARS truncates it).
+
+Strategies (COMPACTION_STRATEGY):
+- "none": never compact (default)
+- "extractive": the output's highest-scoring distinct sentences, by word
+  frequency and overlap with the user query, in their original order
+- "truncate": the first COMPACTION_MAX_CHARS characters
+
+Both condensing strategies are lossy for the model (the trace keeps the
+full text), so compaction is opt-in.
+
+Subclass HistoryCompactor and implement condense() to add another.
+"""
+
+import re
+from collections import Counter
+
+from src.config import settings
+from src.observability.budget import count_tokens, estimate_prompt_tokens
+
+COMPACTED_PREFIX = "[Compacted "
+# Compact down to this fraction of the threshold, so it does not run every step
+_TARGET_RATIO = 0.75
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9]{3,}")
+_STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has his how its "
+    "may new now see two who did get let put say she too use that with have this will "
+    "your from they been were what when which their there about would these other into "
+    "than then them also some such only over more most very just".split()
+)
+
+
+def _field(message, name: str):
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+class HistoryCompactor:
+    """Replaces old tool outputs once the history passes a token threshold."""
+
+    name = "base"
+
+    def __init__(
+        self,
+        threshold_tokens: int | None = None,
+        keep_recent_steps: int | None = None,
+        max_chars: int | None = None,
+    ):
+        self.threshold_tokens = threshold_tokens or settings.compaction_threshold_tokens
+        self.keep_recent_steps = (
+            settings.compaction_keep_recent_steps if keep_recent_steps is None else keep_recent_steps
+        )
+        self.max_chars = max_chars or settings.compaction_max_chars
+        self.compacted = 0
+        self.tokens_saved = 0
+
+    def condense(self, text: str, query: str) -> str:
+        """Return the short stand-in for one tool output."""
+        raise NotImplementedError
+
+    def compact(self, messages: list, model: str, trace_id: str = "") -> int:
+        """
+        Compact `messages` in place if needed; returns how many outputs were replaced.
+
+        Tool messages are plain dicts (BaseAgent builds them), so a replaced one
+        is swapped for a copy with new content.
+        """
+        tokens = estimate_prompt_tokens(messages, model)
+        if tokens <= self.threshold_tokens:
+            return 0
+        target = self.threshold_tokens * _TARGET_RATIO
+
+        query = next((m["content"] for m in messages
+                      if isinstance(m, dict) and m.get("role") == "user"), "")
+        assistant_turns = [i for i, m in enumerate(messages) if _field(m, "role") == "assistant"]
+        if len(assistant_turns) <= self.keep_recent_steps:
+            return 0
+        # Tool messages after this index belong to the steps kept verbatim
+        cutoff = assistant_turns[-self.keep_recent_steps] if self.keep_recent_steps else len(messages)
+
+        replaced = 0
+        step = 0
+        for i, message in enumerate(messages[:cutoff]):
+            if tokens <= target:
+                break
+            role = _field(message, "role")
+            if role == "assistant":
+                step += 1
+            if role != "tool" or message["content"].startswith(COMPACTED_PREFIX):
+                continue
+            original = message["content"]
+            header = (f"{COMPACTED_PREFIX}{message.get('name', 'tool')} output from step {step}, "
+                      f"{len(original):,} chars; full text in trace {trace_id or '?'}]\n")
+            condensed = header + self.condense(original, query)
+            saved = count_tokens(original, model) - count_tokens(condensed, model)
+            if saved <= 0:
+                continue
+            messages[i] = {**message, "content": condensed}
+            tokens -= saved
+            replaced += 1
+            self.tokens_saved += saved
+        self.compacted += replaced
+        return replaced
+
+
+class TruncateCompactor(HistoryCompactor):
+    name = "truncate"
+
+    def condense(self, text: str, query: str) -> str:
+        return text[: self.max_chars] + ("…" if len(text) > self.max_chars else "")
+
+
+class ExtractiveCompactor(HistoryCompactor):
+    name = "extractive"
+
+    def condense(self, text: str, query: str) -> str:
+        # Repeated sentences (navigation, boilerplate) are kept at most once
+        sentences = list(dict.fromkeys(s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()))
+        if not sentences:
+            return ""
+        words = [
+            [w for w in _WORD.findall(s.lower()) if w not in _STOPWORDS] for s in sentences
+        ]
+        frequency = Counter(w for sentence in words for w in set(sentence))
+        query_words = set(_WORD.findall(query.lower())) - _STOPWORDS
+
+        def score(index: int) -> float:
+            sentence = words[index]
+            if not sentence:
+                return 0.0
+            # Words shared across the output carry its topic; query words count triple
+            total = sum(frequency[w] * (3 if w in query_words else 1) for w in sentence)
+            return total / len(sentence) ** 0.5
+
+        chosen, used = [], 0
+        for index in sorted(range(len(sentences)), key=score, reverse=True):
+            length = len(sentences[index]) + 1
+            if used + length > self.max_chars:
+                continue
+            chosen.append(index)
+            used += length
+        if not chosen:  # every sentence is longer than the budget
+            return sentences[max(range(len(sentences)), key=score)][: self.max_chars] + "…"
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class NullCompactor(HistoryCompactor):
+    """Compaction disabled: the history is never touched."""
+
+    name = "none"
+
+    def compact(self, messages: list, model: str, trace_id: str = "") -> int:
+        return 0
+
+
+COMPACTORS: dict[str, type[HistoryCompactor]] = {
+    "extractive": ExtractiveCompactor,
+    "truncate": TruncateCompactor,
+    "none": NullCompactor,
+}
+
+
+def build_compactor(strategy: str | None = None) -> HistoryCompactor:
+    strategy = strategy or settings.compaction_strategy
+    if strategy not in COMPACTORS:
+        raise ValueError(f"Unknown compaction strategy: {strategy!r}")
+    return COMPACTORS[strategy]()
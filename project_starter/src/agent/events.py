@@ -0,0 +1,60 @@
+"""
+Typed events yielded by BaseAgent.run_stream() and OrchestratorAgent.run_stream().
+
+Every event carries the name of the agent that produced it, so a consumer of
+a multi-agent stream can tell which sub-agent is speaking.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class StepStart:
+    agent_name: str
+    step: int
+
+
+@dataclass
+class ToolCallEvent:
+    agent_name: str
+    step: int
+    tool_call_id: str
+    tool_name: str
+    arguments: str
+
+
+@dataclass
+class ToolResultEvent:
+    agent_name: str
+    step: int
+    tool_call_id: str
+    tool_name: str
+    result: str
+    duration_ms: float
+
+
+@dataclass
+class AnswerDelta:
+    agent_name: str
+    step: int
+    text: str
+
+
+@dataclass
+class TraceEnd:
+    agent_name: str
+    answer: str
+    status: str = "completed"
+    error: Optional[str] = None
+    metadata: dict = field(default_factory=dict)
+
+    def to_result(self) -> dict:
+        """The {"answer", "status", "metadata"} dict returned by run(), plus "error" on failure."""
+        result = {"answer": self.answer, "status": self.status, "metadata": self.metadata}
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+AgentEvent = StepStart | ToolCallEvent | ToolResultEvent | AnswerDelta | TraceEnd
@@ -1,73 +1,165 @@
 """
 Multi-agent orchestration layer.
 
-Design and implement your own orchestration strategy here.
-This file is entirely yours — there is no single correct answer.
+Ships a sequential Researcher → Analyst → Writer chain. Replace or extend it
+with your own strategy — there is no single correct answer.
 """
 
+from contextlib import aclosing
+from typing import AsyncIterator
+
+import structlog
+
 from src.agent.base import BaseAgent
+from src.agent.events import AgentEvent, TraceEnd
 from src.agent.prompts import (
     ANALYST_PROMPT,
-    FACT_CHECKER_PROMPT,
-    PLANNER_PROMPT,
     RESEARCHER_PROMPT,
     WRITER_PROMPT,
 )
 from src.config import settings
+from src.observability.budget import Budget
+from src.observability.cost_tracker import CostTracker
 
+logger = structlog.get_logger()
 
 class OrchestratorAgent:
     """
-    Your multi-agent orchestrator. Design your own pipeline.
-
-    You have access to:
-    - BaseAgent: a single ReAct agent you can instantiate with any system prompt
-    - prompts.py: ready-made prompts (RESEARCHER_PROMPT, ANALYST_PROMPT,
-      WRITER_PROMPT, FACT_CHECKER_PROMPT, PLANNER_PROMPT)
-    - The tool registry: search_web and read_webpage are available once
-      you've completed the tools/registry.py TODO.
-
-    Ideas to get you started:
-    - Chain researcher → analyst → writer in sequence
-    - Run researcher and fact-checker in PARALLEL with asyncio.gather(),
-      then synthesize their outputs
-    - Build a retry loop: if confidence is low, re-run the researcher
-    - Add a planner agent that breaks the query into sub-tasks first
-    - Invent your own pattern!
-
-    The only requirement: return {"answer": "...", "metadata": {...}}
+    Sequential multi-agent pipeline: Researcher → Analyst → Writer.
+
+    Each stage is a BaseAgent with its own system prompt; the output of one
+    stage is passed to the next as context. Agents hold per-run state, so
+    create one OrchestratorAgent per concurrent query.
+
+    Returns {"answer": "...", "metadata": {...}} with every stage's trace id
+    and the query's cost. All stages log to one CostTracker, so
+    cost_tracker.by_agent breaks spend down by stage across queries, and
+    share one query Budget (whose parent is `budget`, if given).
+
+    If a stage does not complete (LLM error, max steps, budget), the later
+    stages are skipped: the result carries that stage's answer, its status,
+    and "failed_stage" in metadata.
     """
 
-    def __init__(self, model: str = None, max_steps: int = 10):
-        # TODO: Initialize the sub-agents you want to use.
-        #
-        # Example — a simple researcher:
-        #
-        #   resolved_model = model or settings.model_name
-        #
-        #   self.researcher = BaseAgent(
-        #       model=resolved_model,
-        #       max_steps=max_steps,
-        #       agent_name="Researcher",
-        #       system_prompt=RESEARCHER_PROMPT,
-        #   )
-        # You can add as many agents as you like.
-        pass
+    agent_name = "Orchestrator"
+
+    def __init__(
+        self,
+        model: str = None,
+        max_steps: int = 10,
+        profile: bool | None = None,
+        budget: Budget | None = None,
+    ):
+        resolved_model = model or settings.model_name
+        self.model = resolved_model
+        self.cost_tracker = CostTracker()
+        # Parent of each query's budget, e.g. a batch-wide Budget
+        self.budget = budget
+
+        self.researcher = BaseAgent(
+            model=resolved_model,
+            max_steps=max_steps,
+            profile=profile,
+            cost_tracker=self.cost_tracker,
+            agent_name="Researcher",
+            system_prompt=RESEARCHER_PROMPT,
+        )
+        self.analyst = BaseAgent(
+            model=resolved_model,
+            max_steps=max_steps,
+            profile=profile,
+            cost_tracker=self.cost_tracker,
+            agent_name="Analyst",
+            system_prompt=ANALYST_PROMPT,
+        )
+        self.writer = BaseAgent(
+            model=resolved_model,
+            max_steps=max_steps,
+            profile=profile,
+            cost_tracker=self.cost_tracker,
+            agent_name="Writer",
+            system_prompt=WRITER_PROMPT,
+            tools=[],
+        )
 
     async def run(self, query: str) -> dict:
-        # TODO: Implement your orchestration strategy.
-        #
-        # Example — sequential chain:
-        #
-        #   research_result = await self.researcher.run(query)
-        #   research_output = research_result["answer"]
-        #
-        #   return {
-        #       "answer": research_output["answer"],
-        #       "metadata": {
-        #           "researcher_trace": research_result["metadata"].get("trace_id"),
-        #       },
-        #   }
-        #
-        # Return {"answer": "...", "metadata": {...}} when done.
-        pass
+        async with aclosing(self._pipeline(query, stream=False)) as events:
+            async for event in events:
+                if isinstance(event, TraceEnd) and event.agent_name == self.agent_name:
+                    return event.to_result()
+
+    async def run_stream(self, query: str) -> AsyncIterator[AgentEvent]:
+        """
+        Stream every sub-agent's events in pipeline order.
+
+        The final answer is the Writer's AnswerDelta text; the stream ends with
+        an Orchestrator TraceEnd carrying the same result as run().
+        """
+        async with aclosing(self._pipeline(query, stream=True)) as events:
+            async for event in events:
+                yield event
+
+    async def _pipeline(self, query: str, stream: bool) -> AsyncIterator[AgentEvent]:
+        stage_results: list[TraceEnd] = []
+        stages = [
+            (self.researcher, lambda: query),
+            (self.analyst, lambda: f"User query: {query}\n\nResearch findings:\n{stage_results[-1].answer}"),
+            (self.writer, lambda: f"User query: {query}\n\nAnalysis:\n{stage_results[-1].answer}"),
+        ]
+        self.cost_tracker.start_query(query)
+        # One BUDGET_QUERY_* budget shared by every stage of this query
+        query_budget = Budget.for_query(parent=self.budget)
+        for agent, _ in stages:
+            agent.budget = query_budget
+        try:
+            for agent, build_prompt in stages:
+                async with aclosing(self._run_stage(agent, build_prompt(), stream)) as events:
+                    async for event in events:
+                        if isinstance(event, TraceEnd):
+                            stage_results.append(event)
+                        yield event
+                if stage_results[-1].status != "completed":
+                    # Later stages would only work on the failed stage's "Error: ..." text
+                    logger.warning(
+                        "pipeline_stage_failed",
+                        stage=agent.agent_name,
+                        status=stage_results[-1].status,
+                        error=stage_results[-1].error,
+                    )
+                    break
+            query_cost = self.cost_tracker.current_query
+        finally:
+            self.cost_tracker.end_query()
+
+        last = stage_results[-1]
+        metadata = {f"{r.agent_name.lower()}_trace": r.metadata["trace_id"] for r in stage_results}
+        metadata["total_steps"] = sum(r.metadata["total_steps"] for r in stage_results)
+        metadata["cost_usd"] = query_cost.total_cost_usd
+        error = last.error
+        if last.status != "completed":
+            metadata["failed_stage"] = last.agent_name
+            error = f"{last.agent_name}: {last.error or last.status}"
+        yield TraceEnd(
+            agent_name=self.agent_name,
+            answer=last.answer,
+            status=last.status,
+            error=error,
+            metadata=metadata,
+        )
+
+    async def _run_stage(
+        self, agent: BaseAgent, prompt: str, stream: bool
+    ) -> AsyncIterator[AgentEvent]:
+        if stream:
+            async with aclosing(agent.run_stream(prompt)) as events:
+                async for event in events:
+                    yield event
+        else:
+            result = await agent.run(prompt)
+            yield TraceEnd(
+                agent.agent_name,
+                result["answer"],
+                status=result["status"],
+                error=result.get("error"),
+                metadata=result["metadata"],
+            )
@@ -0,0 +1,91 @@
+"""
+Batch execution of many research queries on a single event loop.
+
+Queries are read as JSONL — one {"id": ..., "query": ...} object per line
+(a bare JSON string is also accepted, with its line number as the id).
+Each query gets its own OrchestratorAgent, since agents hold per-run state;
+at most `concurrency` queries are in flight at once. Results are yielded in
+completion order, and completed ids can be checkpointed so an interrupted
+batch resumes where it left off. All queries draw on one BUDGET_BATCH_*
+budget; once it is spent, remaining LLM calls are refused.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import AsyncIterator, Iterable, TextIO
+
+import structlog
+
+from src.agent.orchestration import OrchestratorAgent
+from src.observability.budget import Budget
+
+logger = structlog.get_logger()
+
+
+def read_queries(stream: TextIO) -> list[dict]:
+    """Parse a JSONL stream into [{"id": str, "query": str}, ...]."""
+    queries = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {"query": record}
+        if not isinstance(record, dict) or not record.get("query"):
+            raise ValueError(f"Line {line_number}: expected an object with a 'query' field.")
+        queries.append({"id": str(record.get("id", line_number)), "query": record["query"]})
+    return queries
+
+
+def load_checkpoint(path: Path) -> set[str]:
+    """Return the ids already recorded in a checkpoint file (empty if missing)."""
+    if not path.exists():
+        return set()
+    with path.open(encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+async def run_batch(
+    queries: Iterable[dict],
+    model: str | None = None,
+    max_steps: int = 10,
+    concurrency: int = 4,
+) -> AsyncIterator[dict]:
+    """
+    Run every query through OrchestratorAgent and yield results as they finish.
+
+    Each yielded dict has "id", "query", "answer", "status", "metadata",
+    "duration_ms" and, when status is not "completed", "error". A failing
+    query never stops the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    budget = Budget.for_batch()
+
+    async def run_one(item: dict) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                agent = OrchestratorAgent(model=model, max_steps=max_steps, budget=budget)
+                result = await agent.run(item["query"])
+                record = {**item, "answer": result["answer"], "status": result["status"],
+                          "metadata": result["metadata"]}
+                if result["status"] != "completed":
+                    # e.g. every LLM call failed: the agent answers "Error: ..." without raising
+                    record["error"] = result.get("error") or result["status"]
+            except Exception as e:
+                logger.error("batch_query_failed", id=item["id"], error=str(e))
+                record = {**item, "answer": None, "status": "error", "metadata": {},
+                          "error": f"{type(e).__name__}: {e}"}
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return record
+
+    tasks = [asyncio.create_task(run_one(item)) for item in queries]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
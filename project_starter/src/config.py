@@ -5,6 +5,46 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     model_name: str = Field(default="gpt-4o", description="The LLM model to use")
     max_steps: int = Field(default=10, description="Max steps for agent execution")
+    max_parallel_tools: int = Field(default=8, description="Max concurrent tool calls per agent")
+    tool_concurrency_limit: int = Field(default=4, description="Default max concurrent calls per tool")
+    http_timeout: float = Field(default=10.0, description="Timeout in seconds for tool HTTP requests")
+    http_retries: int = Field(default=2, description="Retries for failed tool HTTP requests")
+    http_pool_per_host: int = Field(default=10, description="Max pooled connections per host")
+    dns_cache_ttl_s: float = Field(default=300.0, description="Seconds a resolved hostname is cached")
+    dns_negative_ttl_s: float = Field(default=60.0, description="Seconds a failed DNS lookup is cached")
+    dns_cache_max_entries: int = Field(default=4096, description="Hostnames kept in the DNS cache (least recently used evicted)")
+    html_extractor: str = Field(default="auto", description="read_webpage text extractor: auto, lxml or soup")
+    page_cache_backend: str = Field(default="memory", description="read_webpage cache: memory, sqlite or none")
+    page_cache_path: str = Field(default=".cache/pages.sqlite", description="File for the sqlite page cache")
+    page_cache_ttl_s: float = Field(default=3600.0, description="Seconds a cached page stays fresh")
+    stagnation_backend: str = Field(default="jaccard", description="Output-stagnation similarity: jaccard, cosine or shingle")
+    page_cache_max_mb: float = Field(default=64.0, description="Memory/disk budget for cached pages")
+    trace_store_max_traces: int = Field(default=1000, description="Finished traces kept in memory per process")
+    trace_store_max_mb: float = Field(default=64.0, description="Memory budget for finished traces per process")
+    trace_store_compress: bool = Field(default=False, description="Hold finished traces zlib-compressed in memory")
+    trace_max_output_chars: int = Field(default=0, description="Truncate traced tool outputs to this many chars (0 = keep all)")
+    trace_spill_backend: str = Field(default="sqlite", description="Where evicted traces go: sqlite, jsonl or none")
+    trace_spill_path: str = Field(default=".cache/traces.sqlite", description="File for spilled traces")
+    trace_export_sinks: str = Field(default="log", description="Comma-separated span sinks: log, jsonl, sqlite, otlp (or none)")
+    trace_export_jsonl_path: str = Field(default=".cache/spans.jsonl", description="File for the jsonl span sink")
+    trace_export_sqlite_path: str = Field(default=".cache/spans.sqlite", description="File for the sqlite span sink")
+    trace_export_otlp_endpoint: str = Field(default="http://localhost:4318/v1/traces", description="OTLP/HTTP traces endpoint")
+    trace_export_batch_size: int = Field(default=256, description="Max spans per exporter batch")
+    trace_export_flush_interval_s: float = Field(default=1.0, description="Max seconds a span waits for its batch to fill")
+    trace_export_queue_size: int = Field(default=10000, description="Queued spans before new ones are dropped")
+    price_file: str = Field(default="", description="JSON price overrides (USD per 1M tokens); bundled prices otherwise")
+    cost_tracker_max_queries: int = Field(default=1000, description="Finished queries a CostTracker keeps for its breakdown")
+    budget_query_tokens: int = Field(default=0, description="Max prompt+completion tokens per query (0 = unlimited)")
+    budget_query_cost_usd: float = Field(default=0.0, description="Max USD per query (0 = unlimited)")
+    budget_batch_tokens: int = Field(default=0, description="Max tokens across a research-batch run (0 = unlimited)")
+    budget_batch_cost_usd: float = Field(default=0.0, description="Max USD across a research-batch run (0 = unlimited)")
+    budget_output_reserve_tokens: int = Field(default=1024, description="Completion tokens assumed per call when checking budgets")
+    budget_trim_tool_outputs: bool = Field(default=True, description="Drop the oldest tool outputs from a prompt that would exceed a budget")
+    compaction_strategy: str = Field(default="none", description="Old tool output compaction: none, extractive or truncate (both lossy; opt in)")
+    compaction_threshold_tokens: int = Field(default=12000, description="Estimated prompt tokens above which old tool outputs are compacted")
+    compaction_keep_recent_steps: int = Field(default=2, description="Most recent steps whose tool outputs are never compacted")
+    compaction_max_chars: int = Field(default=600, description="Max chars of a compacted tool output")
+    profile: bool = Field(default=False, description="Record per-phase step latencies in BaseAgent")
     log_level: str = Field(default="INFO", description="Logging level")
     log_format: str = Field(default="console", description="Logging format (json or console)")
 
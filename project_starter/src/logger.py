@@ -6,9 +6,12 @@ import structlog
 from src.config import settings
 
 
-def configure_logging():
+def configure_logging(stream=None):
     """
     Configure structured logging with structlog.
+
+    Logs go to stdout unless another stream is given (the batch command
+    passes stderr so stdout stays clean JSONL).
     """
     shared_processors = [
         structlog.contextvars.merge_contextvars,
@@ -46,7 +49,7 @@ def configure_logging():
         ],
     )
 
-    handler = logging.StreamHandler(sys.stdout)
+    handler = logging.StreamHandler(stream or sys.stdout)
     handler.setFormatter(formatter)
 
     root_logger = logging.getLogger()
@@ -1,11 +1,19 @@
 import asyncio
+import json
+import sys
+from pathlib import Path
 
 import structlog
 import typer
 
+from src.agent.events import AnswerDelta, StepStart, ToolCallEvent, ToolResultEvent
 from src.agent.orchestration import OrchestratorAgent
+from src.batch import load_checkpoint, read_queries, run_batch
 from src.config import settings
 from src.logger import configure_logging
+from src.observability.exporter import get_exporter
+from src.observability.profiler import process_profile
+from src.tools.http_client import aclose_async_client
 
 configure_logging()
 logger = structlog.get_logger()
@@ -13,19 +21,121 @@ logger = structlog.get_logger()
 app = typer.Typer(help="AI Research Agent CLI")
 
 
+def _run_async(coro):
+    """
+    asyncio.run() that also closes the loop's pooled HTTP client on exit and
+    waits for queued trace spans to be exported.
+    """
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await aclose_async_client()
+    try:
+        return asyncio.run(_main())
+    finally:
+        # Let queued step/trace log lines print before the result does
+        get_exporter().flush()
+
+
 @app.command()
 def research(
     query: str = typer.Argument(..., help="The research query to run."),
     model: str = typer.Option(None, help="LLM model to use (overrides settings)."),
     max_steps: int = typer.Option(settings.max_steps, help="Max ReAct steps."),
+    stream: bool = typer.Option(False, "--stream", help="Stream the answer as it is generated."),
+    profile: bool = typer.Option(False, "--profile", help="Print per-phase step latency histograms to stderr."),
+    profile_out: Path = typer.Option(None, help="Write folded stacks (flamegraph.pl / speedscope) here; implies --profile."),
+    costs: bool = typer.Option(False, "--costs", help="Print token and cost totals by model and agent to stderr."),
 ):
     """Run the AI research agent on a query."""
-    # TODO:
-    # 1. resolved_model = model or settings.model_name
-    # 2. agent = OrchestratorAgent(model=resolved_model, max_steps=max_steps)
-    # 3. result = asyncio.run(agent.run(query))
-    # 4. print(result["answer"])
-    print("Not implemented yet. Complete the TODO above.")
+    resolved_model = model or settings.model_name
+    profile = profile or profile_out is not None or settings.profile
+    agent = OrchestratorAgent(model=resolved_model, max_steps=max_steps, profile=profile)
+    if stream:
+        configure_logging(stream=sys.stderr)
+        _run_async(_print_stream(agent, query))
+    else:
+        result = _run_async(agent.run(query))
+        print(result["answer"])
+    if costs:
+        print(file=sys.stderr)
+        agent.cost_tracker.print_cost_breakdown(file=sys.stderr)
+    if profile:
+        print("\n" + process_profile.format_table(), file=sys.stderr)
+        if profile_out:
+            process_profile.write_folded(profile_out)
+
+
+async def _print_stream(agent: OrchestratorAgent, query: str) -> None:
+    """Answer tokens go to stdout; progress lines go to stderr."""
+    async for event in agent.run_stream(query):
+        if isinstance(event, AnswerDelta):
+            if event.agent_name == agent.writer.agent_name:
+                sys.stdout.write(event.text)
+                sys.stdout.flush()
+        elif isinstance(event, StepStart):
+            print(f"[{event.agent_name}] step {event.step}", file=sys.stderr)
+        elif isinstance(event, ToolCallEvent):
+            print(f"[{event.agent_name}] → {event.tool_name}({event.arguments})", file=sys.stderr)
+        elif isinstance(event, ToolResultEvent):
+            print(f"[{event.agent_name}] ← {event.tool_name} ({event.duration_ms:.0f} ms)", file=sys.stderr)
+    sys.stdout.write("\n")
+
+
+@app.command("research-batch")
+def research_batch(
+    input_path: str = typer.Argument("-", help="JSONL file of queries, or '-' for stdin."),
+    output: Path = typer.Option(None, "--output", "-o", help="Append JSONL results here (default: stdout)."),
+    checkpoint: Path = typer.Option(None, help="File of completed ids; ids listed here are skipped."),
+    concurrency: int = typer.Option(4, min=1, help="Max queries in flight at once."),
+    model: str = typer.Option(None, help="LLM model to use (overrides settings)."),
+    max_steps: int = typer.Option(settings.max_steps, help="Max ReAct steps."),
+):
+    """Run many queries on one event loop, streaming JSONL results as they complete."""
+    if output is None:
+        # Keep stdout for results only
+        configure_logging(stream=sys.stderr)
+
+    if input_path == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(input_path, encoding="utf-8") as f:
+            queries = read_queries(f)
+
+    done = load_checkpoint(checkpoint) if checkpoint else set()
+    pending = [q for q in queries if q["id"] not in done]
+    logger.info("batch_started", total=len(queries), skipped=len(queries) - len(pending), concurrency=concurrency)
+
+    async def _run() -> int:
+        failures = 0
+        out = output.open("a", encoding="utf-8") if output else sys.stdout
+        ckpt = checkpoint.open("a", encoding="utf-8") if checkpoint else None
+        try:
+            async for record in run_batch(
+                pending,
+                model=model or settings.model_name,
+                max_steps=max_steps,
+                concurrency=concurrency,
+            ):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if "error" in record:
+                    failures += 1
+                elif ckpt:
+                    ckpt.write(record["id"] + "\n")
+                    ckpt.flush()
+        finally:
+            if output:
+                out.close()
+            if ckpt:
+                ckpt.close()
+        return failures
+
+    failures = _run_async(_run())
+    logger.info("batch_finished", completed=len(pending) - failures, failed=failures)
+    if failures:
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
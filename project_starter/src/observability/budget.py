@@ -0,0 +1,283 @@
+"""
+Token and dollar budgets, checked before every LLM call.
+
+A Budget holds limits (0 = unlimited), actual usage and the tokens/dollars
+reserved by calls in flight. Budgets chain: a query's budget has the
+batch's as its parent, and a call must fit every budget up the chain.
+
+Before each acompletion, BudgetManager.preflight() estimates the prompt
+with tiktoken (the encoder is loaded once per model and token counts are
+memoized per message text, by digest, so a growing history is not
+re-encoded every step), adds BUDGET_OUTPUT_RESERVE_TOKENS for the reply, and prices that
+with the PriceTable. If the call would not fit, the oldest tool results
+are replaced by a short placeholder until it does (BUDGET_TRIM_TOOL_OUTPUTS)
+in the request only — the agent's history keeps the full outputs; if it
+still does not fit, TokenBudgetExceeded is raised and no request is sent.
+settle() then swaps the reservation for the response's actual usage. With
+every budget unlimited (the default) preflight() counts nothing.
+
+Without tiktoken, or when its encoding files cannot be fetched, prompts are
+estimated at ~4 characters per token.
+"""
+
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import structlog
+
+from src.config import settings
+from src.exceptions import TokenBudgetExceeded
+from src.observability.pricing import PriceTable, get_price_table
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = structlog.get_logger()
+
+TRIMMED_PLACEHOLDER = "[tool output removed to fit the token budget]"
+# Framing tokens per chat message, and for priming the reply (OpenAI's counting)
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_REPLY = 3
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for a model (cl100k_base if unknown); None if unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model.rsplit("/", 1)[-1])
+    except KeyError:
+        pass
+    except Exception as e:  # encoding files not cached and no network
+        logger.warning("tiktoken_unavailable", model=model, error=str(e))
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("tiktoken_unavailable", model=model, error=str(e))
+        return None
+
+
+# (encoding name, blake2b digest, length) -> tokens. Keyed by digest, not by
+# the text itself, so the cache does not keep whole pages alive.
+_counts: OrderedDict[tuple, int] = OrderedDict()
+_counts_lock = threading.Lock()
+_COUNTS_MAX = 8192
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens in `text` for `model`; memoized per (encoding, text digest)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    key = (encoding.name, hashlib.blake2b(text.encode(), digest_size=16).digest(), len(text))
+    with _counts_lock:
+        tokens = _counts.get(key)
+        if tokens is not None:
+            _counts.move_to_end(key)
+            return tokens
+    tokens = len(encoding.encode(text, disallowed_special=()))
+    with _counts_lock:
+        _counts[key] = tokens
+        if len(_counts) > _COUNTS_MAX:
+            _counts.popitem(last=False)
+    return tokens
+
+
+def _field(message, name: str):
+    """Read a field from a dict message or a LiteLLM Message object."""
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+def message_tokens(message, model: str) -> int:
+    tokens = _TOKENS_PER_MESSAGE + count_tokens(_field(message, "content") or "", model)
+    name = _field(message, "name")
+    if name:
+        tokens += count_tokens(name, model)
+    for tool_call in _field(message, "tool_calls") or ():
+        function = _field(tool_call, "function")
+        tokens += count_tokens(_field(function, "name") or "", model)
+        tokens += count_tokens(_field(function, "arguments") or "", model)
+    return tokens
+
+
+def estimate_prompt_tokens(messages: list, model: str, tools_schema: list | None = None) -> int:
+    """Approximate prompt tokens for a chat request, tool schemas included."""
+    tokens = _TOKENS_PER_REPLY + sum(message_tokens(m, model) for m in messages)
+    if tools_schema:
+        tokens += count_tokens(json.dumps(tools_schema, sort_keys=True), model)
+    return tokens
+
+
+@dataclass(slots=True)
+class _Usage:
+    tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class Budget:
+    """Token/dollar limits with actual usage and in-flight reservations."""
+
+    def __init__(
+        self,
+        name: str,
+        max_tokens: int = 0,
+        max_cost_usd: float = 0.0,
+        parent: Optional["Budget"] = None,
+    ):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.parent = parent
+        self.used = _Usage()
+        self.reserved = _Usage()
+
+    @classmethod
+    def for_query(cls, parent: Optional["Budget"] = None) -> "Budget":
+        return cls("query", settings.budget_query_tokens, settings.budget_query_cost_usd, parent)
+
+    @classmethod
+    def for_batch(cls) -> "Budget":
+        return cls("batch", settings.budget_batch_tokens, settings.budget_batch_cost_usd)
+
+    def _chain(self):
+        budget = self
+        while budget is not None:
+            yield budget
+            budget = budget.parent
+
+    @property
+    def unlimited(self) -> bool:
+        """True when neither this budget nor any parent sets a limit."""
+        return not any(budget.max_tokens or budget.max_cost_usd for budget in self._chain())
+
+    def overrun(self, tokens: int, cost_usd: float) -> Optional[str]:
+        """Why a call of this size would not fit, or None if it fits every budget."""
+        for budget in self._chain():
+            committed_tokens = budget.used.tokens + budget.reserved.tokens
+            if budget.max_tokens and committed_tokens + tokens > budget.max_tokens:
+                return (f"{budget.name} token budget: {committed_tokens:,} used + "
+                        f"{tokens:,} estimated > {budget.max_tokens:,}")
+            committed_cost = budget.used.cost_usd + budget.reserved.cost_usd
+            if budget.max_cost_usd and committed_cost + cost_usd > budget.max_cost_usd:
+                return (f"{budget.name} cost budget: ${committed_cost:.4f} used + "
+                        f"${cost_usd:.4f} estimated > ${budget.max_cost_usd:.4f}")
+        return None
+
+    def reserve(self, tokens: int, cost_usd: float) -> None:
+        for budget in self._chain():
+            budget.reserved.tokens += tokens
+            budget.reserved.cost_usd += cost_usd
+
+    def release(self, tokens: int, cost_usd: float) -> None:
+        for budget in self._chain():
+            budget.reserved.tokens -= tokens
+            budget.reserved.cost_usd -= cost_usd
+
+    def record(self, tokens: int, cost_usd: float) -> None:
+        for budget in self._chain():
+            budget.used.tokens += tokens
+            budget.used.cost_usd += cost_usd
+
+    def summary(self) -> dict:
+        return {
+            "used_tokens": self.used.tokens,
+            "used_cost_usd": self.used.cost_usd,
+            "max_tokens": self.max_tokens,
+            "max_cost_usd": self.max_cost_usd,
+        }
+
+
+class BudgetManager:
+    """Pre-flight checks and post-call accounting for one agent's LLM calls."""
+
+    def __init__(
+        self,
+        model: str,
+        budget: Budget,
+        tools_schema: list | None = None,
+        prices: PriceTable | None = None,
+        output_reserve_tokens: int | None = None,
+        trim_tool_outputs: bool | None = None,
+    ):
+        self.model = model
+        self.budget = budget
+        self.prices = prices or get_price_table()
+        self.output_reserve_tokens = (
+            settings.budget_output_reserve_tokens
+            if output_reserve_tokens is None else output_reserve_tokens
+        )
+        self.trim_tool_outputs = (
+            settings.budget_trim_tool_outputs if trim_tool_outputs is None else trim_tool_outputs
+        )
+        # Tool schemas are fixed per agent: count them once
+        self._tools_tokens = (
+            count_tokens(json.dumps(tools_schema, sort_keys=True), model) if tools_schema else 0
+        )
+        self._pending: Optional[_Usage] = None
+        self.trimmed = 0
+
+    def _projection(self, prompt_tokens: int) -> tuple[int, float]:
+        tokens = prompt_tokens + self.output_reserve_tokens
+        return tokens, self.prices.cost(self.model, prompt_tokens, self.output_reserve_tokens)
+
+    def preflight(self, messages: list) -> list:
+        """
+        Check the next call against the budgets and reserve its estimate.
+
+        Returns the messages to send: `messages` itself, or a copy with the
+        oldest tool results replaced by a placeholder when trimming made the
+        call fit. Raises TokenBudgetExceeded if it cannot be made to fit.
+        """
+        if self.budget.unlimited:
+            # Nothing to check or reserve: skip counting the prompt
+            return messages
+        prompt_tokens = (
+            _TOKENS_PER_REPLY + self._tools_tokens
+            + sum(message_tokens(m, self.model) for m in messages)
+        )
+        reason = self.budget.overrun(*self._projection(prompt_tokens))
+        if reason and self.trim_tool_outputs:
+            messages = list(messages)
+            for i, message in enumerate(messages):
+                if not reason:
+                    break
+                if not isinstance(message, dict) or message.get("role") != "tool":
+                    continue
+                if message["content"] == TRIMMED_PLACEHOLDER:
+                    continue
+                prompt_tokens -= (count_tokens(message["content"], self.model)
+                                  - count_tokens(TRIMMED_PLACEHOLDER, self.model))
+                messages[i] = {**message, "content": TRIMMED_PLACEHOLDER}
+                self.trimmed += 1
+                reason = self.budget.overrun(*self._projection(prompt_tokens))
+        if reason:
+            raise TokenBudgetExceeded(reason)
+        tokens, cost_usd = self._projection(prompt_tokens)
+        self.budget.reserve(tokens, cost_usd)
+        self._pending = _Usage(tokens, cost_usd)
+        return messages
+
+    def cancel(self) -> None:
+        """Drop the reservation of a call that failed without usage."""
+        if self._pending is not None:
+            self.budget.release(self._pending.tokens, self._pending.cost_usd)
+            self._pending = None
+
+    def settle(self, input_tokens: int, output_tokens: int, cost_usd: float) -> None:
+        """Replace the pending reservation with the call's actual usage."""
+        self.cancel()
+        self.budget.record(input_tokens + output_tokens, cost_usd)
@@ -1,6 +1,11 @@
 import logging
+import sys
+from collections import deque
 from dataclasses import dataclass, field
-# from litellm import completion_cost
+from typing import Optional, TextIO
+
+from src.config import settings
+from src.observability.pricing import PriceTable, get_price_table
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +17,21 @@ class StepCost:
     output_tokens: int
     cost_usd: float
     is_tool_call: bool = False
+    agent_name: str = ""
+
+@dataclass(slots=True)
+class CostTotals:
+    """Running sums, updated once per logged completion."""
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, step: StepCost):
+        self.calls += 1
+        self.input_tokens += step.input_tokens
+        self.output_tokens += step.output_tokens
+        self.cost_usd += step.cost_usd
 
 @dataclass
 class QueryCost:
@@ -20,41 +40,132 @@ class QueryCost:
     total_cost_usd: float = 0.0
     total_input_tokens: int = 0
     total_output_tokens: int = 0
+    by_agent: dict[str, CostTotals] = field(default_factory=dict)
 
     def add_step(self, step: StepCost):
         self.steps.append(step)
         self.total_cost_usd += step.cost_usd
         self.total_input_tokens += step.input_tokens
         self.total_output_tokens += step.output_tokens
+        _totals_for(self.by_agent, step.agent_name).add(step)
+
+def _totals_for(groups: dict[str, CostTotals], key: str) -> CostTotals:
+    totals = groups.get(key)
+    if totals is None:
+        totals = groups[key] = CostTotals()
+    return totals
+
+def _usage_counts(response) -> tuple[int, int, int]:
+    """(input, output, cached input) tokens from a LiteLLM response; zeros if absent."""
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, cached
 
 class CostTracker:
     """
     Tracks costs across agent executions.
+
+    Steps are priced from their usage numbers with a PriceTable (no
+    completion_cost call per step). Every logged step also updates running
+    totals overall, per model and per agent, so reading them is O(1); only
+    the last COST_TRACKER_MAX_QUERIES finished queries are kept.
     """
-    def __init__(self):
-        self.queries: list[QueryCost] = []
+    def __init__(self, prices: PriceTable | None = None, max_queries: int | None = None):
+        self.prices = prices or get_price_table()
+        self.queries: deque[QueryCost] = deque(
+            maxlen=max_queries or settings.cost_tracker_max_queries
+        )
         self._current_query: QueryCost | None = None
+        self.total = CostTotals()
+        self.by_model: dict[str, CostTotals] = {}
+        self.by_agent: dict[str, CostTotals] = {}
+        self.query_count = 0
+
+    @property
+    def current_query(self) -> Optional[QueryCost]:
+        return self._current_query
 
     def start_query(self, query: str):
         self._current_query = QueryCost(query=query)
 
-    def log_completion(self, step_number: int, response, is_tool_call: bool = False):
+    def log_completion(
+        self,
+        step_number: int,
+        response,
+        is_tool_call: bool = False,
+        agent_name: str = "",
+        model: str | None = None,
+    ) -> StepCost:
         """
         Log a completion response's cost.
+
+        model defaults to response.model; pass the requested model name when
+        the provider reports a dated variant you have no price for.
         """
-        # TODO: Implement this method
-        # 1. Check if _current_query exists
-        # 2. Extract usage stats from response
-        # 3. Calculate cost (use litellm.completion_cost or fallback)
-        # 4. create StepCost and add to query
-        pass
+        model = model or getattr(response, "model", None) or "unknown"
+        input_tokens, output_tokens, cached_tokens = _usage_counts(response)
+        step = StepCost(
+            step_number=step_number,
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost_usd=self.prices.cost(model, input_tokens, output_tokens, cached_tokens),
+            is_tool_call=is_tool_call,
+            agent_name=agent_name,
+        )
+        self.total.add(step)
+        _totals_for(self.by_model, model).add(step)
+        _totals_for(self.by_agent, agent_name).add(step)
+        if self._current_query is not None:
+            self._current_query.add_step(step)
+        else:
+            logger.debug("Completion logged outside a query (step %d)", step_number)
+        return step
 
     def end_query(self):
         if self._current_query:
             self.queries.append(self._current_query)
+            self.query_count += 1
             self._current_query = None
 
-    def print_cost_breakdown(self):
-        # TODO: Print detailed cost breakdown
-        pass
+    def summary(self) -> dict:
+        def as_dict(totals: CostTotals) -> dict:
+            return {
+                "calls": totals.calls,
+                "input_tokens": totals.input_tokens,
+                "output_tokens": totals.output_tokens,
+                "cost_usd": totals.cost_usd,
+            }
+        return {
+            "queries": self.query_count,
+            "total": as_dict(self.total),
+            "by_model": {k: as_dict(v) for k, v in self.by_model.items()},
+            "by_agent": {k: as_dict(v) for k, v in self.by_agent.items()},
+        }
+
+    def print_cost_breakdown(self, file: TextIO | None = None):
+        file = file or sys.stdout
+        header = f"{'':<28} {'calls':>6} {'input tok':>11} {'output tok':>11} {'cost $':>10}"
+
+        def row(label: str, totals: CostTotals) -> str:
+            return (f"{label[:28]:<28} {totals.calls:>6} {totals.input_tokens:>11,} "
+                    f"{totals.output_tokens:>11,} {totals.cost_usd:>10.4f}")
 
+        lines = [header, row("TOTAL", self.total)]
+        if self.query_count:
+            lines.append(f"{'per query (mean)':<28} {'':>6} {'':>11} {'':>11} "
+                         f"{self.total.cost_usd / self.query_count:>10.4f}")
+        for title, groups in (("By model", self.by_model), ("By agent", self.by_agent)):
+            lines.append(f"\n{title}")
+            for name, totals in sorted(groups.items(), key=lambda kv: -kv[1].cost_usd):
+                lines.append(row(name or "(unnamed)", totals))
+        if self.queries:
+            lines.append(f"\nLast {len(self.queries)} queries")
+            for q in self.queries:
+                agents = ", ".join(f"{a or '(unnamed)'} ${t.cost_usd:.4f}" for a, t in q.by_agent.items())
+                lines.append(f"  ${q.total_cost_usd:.4f}  {len(q.steps)} steps  "
+                             f"{q.query[:40]!r}  [{agents}]")
+        print("\n".join(lines), file=file)
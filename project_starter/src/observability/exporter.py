@@ -0,0 +1,348 @@
+"""
+Background, batched export of finished trace spans.
+
+AgentTracer hands each finished step and trace to TraceExporter.export(),
+which only puts a small dict on a bounded queue. A worker thread drains the
+queue in batches of up to TRACE_EXPORT_BATCH_SIZE (or whatever arrived
+within TRACE_EXPORT_FLUSH_INTERVAL_S) and writes them to every sink, so
+agent step latency never waits on log or network I/O.
+
+When the queue is full, export() drops the span and counts it instead of
+blocking the agent. stats() counts deliveries per sink: a batch a sink
+accepted adds to "exported", one it raised on adds to "failed" (and is
+logged). Drops are logged by the worker as they grow.
+
+Besides finished steps and traces, the tracer queues a "trace_start" event
+when a trace begins. Only sinks with `accepts_start_events` (the log sink)
+receive it; the others see finished spans only.
+
+Sinks (TRACE_EXPORT_SINKS, comma-separated):
+- "log": the step_completed / trace_ended structlog events (default)
+- "jsonl": one span per line in TRACE_EXPORT_JSONL_PATH
+- "sqlite": rows in TRACE_EXPORT_SQLITE_PATH
+- "otlp": OTLP/HTTP JSON POSTed to TRACE_EXPORT_OTLP_ENDPOINT (any
+  OpenTelemetry collector, or a local stand-in that accepts the same body)
+"""
+
+import atexit
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Protocol
+
+import requests
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+_STOP = object()
+
+
+class SpanSink(Protocol):
+    name: str
+    accepts_start_events: bool
+
+    def export(self, spans: list[dict]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class LogSink:
+    """Emits each span as the tracer's structlog event."""
+
+    name = "log"
+    accepts_start_events = True
+
+    def export(self, spans: list[dict]) -> None:
+        for span in spans:
+            if span["kind"] == "trace_start":
+                logger.info("trace_started",
+                            trace_id=span["trace_id"],
+                            agent_name=span["agent_name"],
+                            model=span["model"],
+                            query=span["input_query"])
+            elif span["kind"] == "step":
+                logger.info("step_completed",
+                            trace_id=span["trace_id"],
+                            step_number=span["step_number"],
+                            duration_ms=round(span["duration_ms"], 0),
+                            cost_usd=round(span["cost_usd"], 4))
+            else:
+                logger.info("trace_ended",
+                            trace_id=span["trace_id"],
+                            status=span["status"],
+                            duration_ms=round(span["duration_ms"], 0),
+                            cost_usd=round(span["cost_usd"], 4),
+                            cache_stats=span["cache_stats"])
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink:
+    name = "jsonl"
+    accepts_start_events = False
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: list[dict]) -> None:
+        self._file.write("".join(json.dumps(span) + "\n" for span in spans))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SqliteSink:
+    name = "sqlite"
+    accepts_start_events = False
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Only the worker thread uses the connection after construction
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spans ("
+            " trace_id TEXT NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL,"
+            " start_time REAL NOT NULL, end_time REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spans_trace ON spans (trace_id)")
+        self._conn.commit()
+
+    def export(self, spans: list[dict]) -> None:
+        with self._conn:  # one transaction per batch
+            self._conn.executemany(
+                "INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (s["trace_id"], s["kind"], s["name"], s["start_time"], s["end_time"],
+                     json.dumps(s))
+                    for s in spans
+                ],
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _span_id(*parts) -> str:
+    """Deterministic 8-byte OTLP span id."""
+    return hashlib.blake2b(":".join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value)}
+
+
+def to_otlp(spans: list[dict], service_name: str = "research-agent") -> dict:
+    """Convert exporter spans to an OTLP/JSON ExportTraceServiceRequest body."""
+    otlp_spans = []
+    for span in spans:
+        attributes = {
+            key: value for key, value in span.items()
+            if key not in ("kind", "name", "trace_id", "start_time", "end_time", "status", "error")
+            and value is not None
+        }
+        otlp_span = {
+            "traceId": span["trace_id"].zfill(32),
+            "spanId": _span_id(span["trace_id"], span.get("step_number", "root")),
+            "name": span["name"],
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(span["start_time"] * 1e9)),
+            "endTimeUnixNano": str(int(span["end_time"] * 1e9)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+        }
+        if span["kind"] == "step":
+            otlp_span["parentSpanId"] = _span_id(span["trace_id"], "root")
+        else:
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+            failed = span["status"] not in ("completed", "success")
+            otlp_span["status"] = {"code": 2 if failed else 1, "message": span.get("error") or ""}
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": service_name}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "src.observability"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+class OtlpHttpSink:
+    name = "otlp"
+    accepts_start_events = False
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def export(self, spans: list[dict]) -> None:
+        response = self._session.post(
+            self.endpoint,
+            json=to_otlp(spans),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def build_sinks(names: str) -> list[SpanSink]:
+    sinks: list[SpanSink] = []
+    for name in filter(None, (n.strip() for n in names.split(","))):
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "jsonl":
+            sinks.append(JsonlSink(settings.trace_export_jsonl_path))
+        elif name == "sqlite":
+            sinks.append(SqliteSink(settings.trace_export_sqlite_path))
+        elif name == "otlp":
+            sinks.append(OtlpHttpSink(settings.trace_export_otlp_endpoint))
+        elif name != "none":
+            raise ValueError(f"Unknown trace export sink: {name!r}")
+    return sinks
+
+
+class TraceExporter:
+    """Bounded queue + worker thread that writes span batches to the sinks."""
+
+    def __init__(
+        self,
+        sinks: list[SpanSink],
+        batch_size: int | None = None,
+        flush_interval_s: float | None = None,
+        queue_size: int | None = None,
+    ):
+        self.sinks = sinks
+        self.batch_size = batch_size or settings.trace_export_batch_size
+        self.flush_interval_s = (
+            settings.trace_export_flush_interval_s if flush_interval_s is None else flush_interval_s
+        )
+        self._queue: queue.Queue = queue.Queue(queue_size or settings.trace_export_queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._reported_drops = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True
+                    )
+                    self._thread.start()
+
+    def export(self, span: dict) -> None:
+        """Queue a finished span; never blocks. Drops (and counts) it if the queue is full."""
+        if not self.sinks:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _next_batch(self) -> tuple[list[dict], bool]:
+        """Block for the first span, then take whatever arrives within the flush interval."""
+        batch: list[dict] = []
+        item = self._queue.get()
+        if item is _STOP:
+            return batch, True
+        batch.append(item)
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if self.dropped != self._reported_drops:
+                logger.warning("trace_export_dropped", dropped=self.dropped)
+                self._reported_drops = self.dropped
+
+    def _write(self, batch: list[dict]) -> None:
+        finished = [span for span in batch if span["kind"] != "trace_start"]
+        for sink in self.sinks:
+            spans = batch if getattr(sink, "accepts_start_events", False) else finished
+            if not spans:
+                continue
+            try:
+                sink.export(spans)
+            except Exception as e:
+                self.failed += len(spans)
+                logger.warning("trace_export_failed", sink=sink.name, spans=len(spans), error=str(e))
+            else:
+                self.exported += len(spans)
+
+    def flush(self) -> None:
+        """Block until every span queued so far has been handed to the sinks."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        """Flush, stop the worker and close the sinks."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        for sink in self.sinks:
+            sink.close()
+        self.sinks = []
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> TraceExporter:
+    """Return the process-wide exporter built from settings; flushed at exit."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = TraceExporter(build_sinks(settings.trace_export_sinks))
+                atexit.register(_exporter.shutdown)
+    return _exporter
@@ -1,4 +1,17 @@
+import hashlib
+import operator
+import struct
+from collections import Counter, deque
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency (cosine / shingle stagnation backends)
+    np = None
+
+from src.utils import ArgsFingerprint
 
 @dataclass
 class LoopDetectionResult:
@@ -7,54 +20,224 @@ class LoopDetectionResult:
     message: str
     confidence: float
 
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str, num_perm: int) -> tuple[int, ...]:
+    """num_perm independent 32-bit hashes of a token (blake2b with per-block salts)."""
+    data = token.encode()
+    hashes: list[int] = []
+    for block in range(num_perm // 16):
+        digest = hashlib.blake2b(data, digest_size=64, salt=block.to_bytes(16, "big")).digest()
+        hashes.extend(struct.unpack("<16I", digest))
+    return tuple(hashes)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word tokens; the fraction of equal signature
+    slots estimates the Jaccard similarity of two token sets.
+    """
+
+    def __init__(self, num_perm: int = 64):
+        if num_perm % 16:
+            raise ValueError("num_perm must be a multiple of 16")
+        self.num_perm = num_perm
+
+    def signature(self, tokens: frozenset[str]) -> tuple[int, ...]:
+        if not tokens:
+            return ()
+        return tuple(map(min, zip(*(_token_hashes(t, self.num_perm) for t in tokens))))
+
+    @staticmethod
+    def similarity(sig1: tuple[int, ...], sig2: tuple[int, ...]) -> float:
+        if not sig1 and not sig2:
+            return 1.0
+        if not sig1 or not sig2:
+            return 0.0
+        return sum(map(operator.eq, sig1, sig2)) / len(sig1)
+
+
+class JaccardOutputs:
+    """Word token sets compared with exact Jaccard similarity (pure Python)."""
+
+    name = "jaccard"
+
+    def signature(self, text: str) -> frozenset[str]:
+        return frozenset(text.lower().split())
+
+    def similarities(self, sig: frozenset[str], previous: Sequence) -> list[float]:
+        return [AdvancedLoopDetector._set_similarity(sig, p) for p in previous]
+
+
+class CosineOutputs:
+    """
+    Hashed bag-of-words vectors (`dim` buckets, L2-normalized); one matrix
+    product scores a new output against the whole window.
+    """
+
+    name = "cosine"
+
+    def __init__(self, dim: int = 1024):
+        if np is None:
+            raise ImportError("numpy is required for the 'cosine' stagnation backend")
+        self.dim = dim
+
+    @staticmethod
+    def _token_hashes(text: str):
+        tokens = text.lower().split()
+        return np.fromiter(map(hash, tokens), dtype=np.int64, count=len(tokens)).view(np.uint64)
+
+    def signature(self, text: str):
+        buckets = self._token_hashes(text) % self.dim
+        vector = np.bincount(buckets, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def similarities(self, sig, previous: Sequence) -> list[float]:
+        if not previous:
+            return []
+        return (np.stack(previous) @ sig).tolist()
+
+
+class ShingleOutputs(CosineOutputs):
+    """
+    Jaccard similarity over hashed k-word shingles, stored as bitsets, so
+    reordered phrases count as changes where a bag of words would not.
+    """
+
+    name = "shingle"
+
+    # Odd multiplier for combining token hashes into a shingle hash
+    _MIX = np.uint64(0x9E3779B97F4A7C15) if np is not None else None
+
+    def __init__(self, dim: int = 4096, k: int = 3):
+        super().__init__(dim)
+        self.k = k
+
+    def signature(self, text: str):
+        hashes = self._token_hashes(text)
+        bits = np.zeros(self.dim, dtype=bool)
+        if not len(hashes):
+            return bits
+        # Rolling combination of k consecutive token hashes (uint64 wraps)
+        n = max(len(hashes) - self.k + 1, 1)
+        shingles = hashes[:n].copy()
+        for offset in range(1, min(self.k, len(hashes))):
+            shingles = shingles * self._MIX + hashes[offset:offset + n]
+        bits[shingles % np.uint64(self.dim)] = True
+        return bits
+
+    def similarities(self, sig, previous: Sequence) -> list[float]:
+        if not previous:
+            return []
+        window = np.stack(previous)
+        intersection = (window & sig).sum(axis=1)
+        union = (window | sig).sum(axis=1)
+        return np.where(union > 0, intersection / np.maximum(union, 1), 1.0).tolist()
+
+
+STAGNATION_BACKENDS = {
+    "jaccard": JaccardOutputs,
+    "cosine": CosineOutputs,
+    "shingle": ShingleOutputs,
+}
+
+
 class AdvancedLoopDetector:
     """
     Detects agent loops using three strategies.
+
+    Each check costs O(fuzzy_window) regardless of history length: exact
+    repeats are counted in a dict keyed by (tool, hash of args), and only the
+    last `fuzzy_window` calls keep their token sets (or MinHash signatures,
+    with fuzzy_mode="minhash") for fuzzy matching.
+
+    Pass an ArgsFingerprint as tool_input to match on canonical arguments
+    (key order, whitespace and 2.0 vs 2 do not matter); a plain string is
+    compared after strip().
+
+    Output stagnation keeps only the last `stagnation_window` outputs. Each
+    output's signature is computed once by the stagnation backend ("jaccard",
+    or the NumPy "cosine" / "shingle" backends) and scored against the
+    window once; pairwise scores are reused until they slide out.
     """
     def __init__(
         self,
         exact_threshold: int = 2,
         fuzzy_threshold: float = 0.8,
         stagnation_window: int = 3,
+        fuzzy_window: int = 5,
+        fuzzy_mode: str = "jaccard",
+        stagnation_backend: str = "jaccard",
     ):
+        if fuzzy_mode not in ("jaccard", "minhash"):
+            raise ValueError(f"fuzzy_mode must be 'jaccard' or 'minhash', got {fuzzy_mode!r}")
+        if stagnation_backend not in STAGNATION_BACKENDS:
+            raise ValueError(
+                f"stagnation_backend must be one of {sorted(STAGNATION_BACKENDS)}, "
+                f"got {stagnation_backend!r}"
+            )
         self.exact_threshold = exact_threshold
         self.fuzzy_threshold = fuzzy_threshold
         self.stagnation_window = stagnation_window
-        self.tool_history: list[tuple[str, str]] = []  # (tool_name, args_str)
-        self.output_history: list[str] = []
+        self.fuzzy_window = fuzzy_window
+        self.fuzzy_mode = fuzzy_mode
+        self._minhasher = MinHasher() if fuzzy_mode == "minhash" else None
+        # (tool_name, args digest) -> number of calls seen
+        self._call_counts: Counter[tuple[str, bytes]] = Counter()
+        # (tool_name, token set or MinHash signature) of the most recent calls
+        self._recent: deque[tuple[str, object]] = deque(maxlen=fuzzy_window)
+        self._stagnation = STAGNATION_BACKENDS[stagnation_backend]()
+        self.output_history: deque[str] = deque(maxlen=stagnation_window)
+        # Only the newest window - 1 signatures are ever compared against
+        self._output_signatures: deque = deque(maxlen=max(stagnation_window - 1, 0))
+        # For each output in the window: its similarity to each output before it
+        self._output_similarities: deque[list[float]] = deque(maxlen=stagnation_window)
 
-    def _jaccard_similarity(self, s1: str, s2: str) -> float:
-        """
-        Compute Jaccard similarity between two strings.
-        Uses word-level tokens for meaningful comparison.
-        """
-        tokens1 = set(s1.lower().split())
-        tokens2 = set(s2.lower().split())
+    @staticmethod
+    def _tokens(s: str) -> frozenset[str]:
+        return frozenset(s.lower().split())
 
+    @staticmethod
+    def _set_similarity(tokens1: frozenset[str], tokens2: frozenset[str]) -> float:
         if not tokens1 and not tokens2:
             return 1.0
         if not tokens1 or not tokens2:
             return 0.0
+        intersection = len(tokens1 & tokens2)
+        return intersection / (len(tokens1) + len(tokens2) - intersection)
+
+    def _jaccard_similarity(self, s1: str, s2: str) -> float:
+        """
+        Compute Jaccard similarity between two strings.
+        Uses word-level tokens for meaningful comparison.
+        """
+        return self._set_similarity(self._tokens(s1), self._tokens(s2))
 
-        intersection = tokens1 & tokens2
-        union = tokens1 | tokens2
-        return len(intersection) / len(union)
+    def _record(self, key: tuple[str, bytes], tool_name: str, fingerprint) -> None:
+        self._call_counts[key] += 1
+        self._recent.append((tool_name, fingerprint))
 
-    def check_tool_call(self, tool_name: str, tool_input: str) -> LoopDetectionResult:
+    def check_tool_call(
+        self, tool_name: str, tool_input: str | ArgsFingerprint
+    ) -> LoopDetectionResult:
         """
         Check if a tool call indicates a loop.
         Call this BEFORE executing the tool.
         """
-        current = (tool_name, tool_input.strip())
+        if isinstance(tool_input, ArgsFingerprint):
+            text, digest = tool_input.canonical, tool_input.digest
+        else:
+            text = tool_input.strip()
+            digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        key = (tool_name, digest)
+        tokens = self._tokens(text)
+        fingerprint = self._minhasher.signature(tokens) if self._minhasher else tokens
 
         # Strategy 1: Exact Match
-        exact_count = sum(
-            1 for past_tool, past_input in self.tool_history
-            if (past_tool, past_input.strip()) == current
-        )
+        exact_count = self._call_counts[key]
 
         if exact_count >= self.exact_threshold:
-            self.tool_history.append(current)
+            self._record(key, tool_name, fingerprint)
             return LoopDetectionResult(
                 is_looping=True,
                 strategy="exact",
@@ -67,16 +250,15 @@ class AdvancedLoopDetector:
 
         # Strategy 2: Fuzzy Match
         # Check against recent history for similar (but not identical) calls
-        recent_history = self.tool_history[-5:]  # Last 5 calls
-        fuzzy_matches = 0
-        for past_tool, past_input in recent_history:
-            if past_tool == tool_name:
-                similarity = self._jaccard_similarity(tool_input, past_input)
-                if similarity >= self.fuzzy_threshold:
-                    fuzzy_matches += 1
+        similarity = MinHasher.similarity if self._minhasher else self._set_similarity
+        fuzzy_matches = sum(
+            1 for past_tool, past_fingerprint in self._recent
+            if past_tool == tool_name
+            and similarity(fingerprint, past_fingerprint) >= self.fuzzy_threshold
+        )
 
         if fuzzy_matches >= self.exact_threshold:
-            self.tool_history.append(current)
+            self._record(key, tool_name, fingerprint)
             return LoopDetectionResult(
                 is_looping=True,
                 strategy="fuzzy",
@@ -88,7 +270,7 @@ class AdvancedLoopDetector:
                 confidence=0.85,
             )
 
-        self.tool_history.append(current)
+        self._record(key, tool_name, fingerprint)
         return LoopDetectionResult(
             is_looping=False,
             strategy="none",
@@ -101,6 +283,11 @@ class AdvancedLoopDetector:
         Check if the agent's outputs are stagnating
         (producing very similar responses repeatedly).
         """
+        signature = self._stagnation.signature(output)
+        self._output_similarities.append(
+            self._stagnation.similarities(signature, self._output_signatures)
+        )
+        self._output_signatures.append(signature)
         self.output_history.append(output)
 
         if len(self.output_history) < self.stagnation_window:
@@ -109,15 +296,14 @@ class AdvancedLoopDetector:
                 message="", confidence=0.0,
             )
 
-        # Check similarity among the last N outputs
-        recent = self.output_history[-self.stagnation_window:]
-        similarities = []
-        for i in range(len(recent)):
-            for j in range(i + 1, len(recent)):
-                sim = self._jaccard_similarity(recent[i], recent[j])
-                similarities.append(sim)
-
-        avg_similarity = sum(similarities) / len(similarities) if similarities else 0
+        # Average pairwise similarity among the last N outputs. The output at
+        # window position k scored the k outputs before it on arrival.
+        total = sum(
+            sum(similarities[len(similarities) - k:])
+            for k, similarities in enumerate(self._output_similarities) if k
+        )
+        pairs = self.stagnation_window * (self.stagnation_window - 1) // 2
+        avg_similarity = total / pairs if pairs else 0
 
         if avg_similarity >= self.fuzzy_threshold:
             return LoopDetectionResult(
@@ -137,5 +323,8 @@ class AdvancedLoopDetector:
         )
 
     def reset(self):
-        self.tool_history.clear()
+        self._call_counts.clear()
+        self._recent.clear()
         self.output_history.clear()
+        self._output_signatures.clear()
+        self._output_similarities.clear()
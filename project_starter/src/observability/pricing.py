@@ -0,0 +1,149 @@
+"""
+Per-token model prices, resolved once per model.
+
+PriceTable looks a model up the first time it is priced and keeps the
+result, so pricing a step afterwards is a dict lookup and three multiplies
+over the response's usage numbers.
+
+Prices come from, in order:
+- PRICE_FILE, if set: a JSON file in the same format as the bundled one
+- prices.json next to this module: USD per 1M tokens, like PRICING in the
+  tokenization lab, so costs work offline
+- litellm.model_cost, for models the files do not list
+
+A model name matches a file entry exactly, after dropping a provider prefix
+("openai/gpt-4o"), or by the longest entry it extends with a dash
+("gpt-4o-2024-08-06" -> "gpt-4o"). Unknown models are priced at zero and
+logged once.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger()
+
+BUNDLED_PRICES = Path(__file__).with_name("prices.json")
+
+
+@dataclass(frozen=True, slots=True)
+class ModelPrice:
+    """USD per token."""
+
+    input: float
+    output: float
+    cached_input: float
+
+    @classmethod
+    def per_million(cls, entry: dict) -> "ModelPrice":
+        return cls(
+            input=entry["input"] / 1e6,
+            output=entry["output"] / 1e6,
+            cached_input=entry.get("cached_input", entry["input"]) / 1e6,
+        )
+
+    def cost(self, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+        return (
+            (input_tokens - cached_tokens) * self.input
+            + cached_tokens * self.cached_input
+            + output_tokens * self.output
+        )
+
+
+FREE = ModelPrice(0.0, 0.0, 0.0)
+
+
+def load_price_file(path: str | Path) -> dict[str, ModelPrice]:
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return {
+        name: ModelPrice.per_million(entry)
+        for name, entry in entries.items()
+        if not name.startswith("_")
+    }
+
+
+def _litellm_price(model: str) -> Optional[ModelPrice]:
+    try:
+        from litellm import model_cost
+    except ImportError:
+        return None
+    entry = model_cost.get(model)
+    if not entry or entry.get("input_cost_per_token") is None:
+        return None
+    return ModelPrice(
+        input=entry["input_cost_per_token"],
+        output=entry.get("output_cost_per_token") or 0.0,
+        cached_input=entry.get("cache_read_input_token_cost") or entry["input_cost_per_token"],
+    )
+
+
+class PriceTable:
+    """Model name -> ModelPrice, filled lazily from price files and litellm."""
+
+    def __init__(self, prices: dict[str, ModelPrice] | None = None, use_litellm: bool = True):
+        self.prices = dict(prices or {})
+        self.use_litellm = use_litellm
+        # Every name asked for so far, including the ones resolved to FREE
+        self._resolved: dict[str, ModelPrice] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "PriceTable":
+        prices = load_price_file(BUNDLED_PRICES)
+        if settings.price_file:
+            prices.update(load_price_file(settings.price_file))
+        return cls(prices)
+
+    def _lookup(self, model: str) -> Optional[ModelPrice]:
+        bare = model.rsplit("/", 1)[-1]
+        for name in (model, bare):
+            if name in self.prices:
+                return self.prices[name]
+        # Dated or suffixed variants: "gpt-4o-2024-08-06" -> "gpt-4o"
+        best = max(
+            (name for name in self.prices if bare.startswith(name + "-")),
+            key=len,
+            default=None,
+        )
+        if best is not None:
+            return self.prices[best]
+        if self.use_litellm:
+            return _litellm_price(model) or _litellm_price(bare)
+        return None
+
+    def price(self, model: str) -> ModelPrice:
+        price = self._resolved.get(model)
+        if price is None:
+            with self._lock:
+                price = self._resolved.get(model)
+                if price is None:
+                    price = self._lookup(model)
+                    if price is None:
+                        logger.warning("model_price_unknown", model=model)
+                        price = FREE
+                    self._resolved[model] = price
+        return price
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+        return self.price(model).cost(input_tokens, output_tokens, cached_tokens)
+
+
+_price_table: Optional[PriceTable] = None
+_price_table_lock = threading.Lock()
+
+
+def get_price_table() -> PriceTable:
+    """Return the process-wide price table built from settings."""
+    global _price_table
+    if _price_table is None:
+        with _price_table_lock:
+            if _price_table is None:
+                _price_table = PriceTable.from_settings()
+    return _price_table
@@ -0,0 +1,184 @@
+"""
+Per-phase latency profiling for BaseAgent.
+
+With profiling on (BaseAgent(profile=True) or PROFILE=true), every ReAct
+step records high-resolution (perf_counter_ns) spans for its phases:
+
+    step                                  whole step, hooks included
+    step;compaction                       HistoryCompactor.compact (old tool outputs)
+    step;budget_check                     BudgetManager.preflight (token estimate)
+    step;llm_wait                         acompletion / streamed completion
+    step;on_step_start                    hook
+    step;tools                            wall time of the step's tool fan-out
+    step;tools;tool:<name>                one tool call (calls overlap)
+    step;tools;tool:<name>;loop_detection check_tool_call
+    step;tools;on_tool_result             hook
+    step;on_step_end                      hook
+    step;on_step_end;cost_calculation     CostTracker.log_completion()
+    step;on_step_end;tracing              tracer.log_step()
+    step;loop_detection                   output-stagnation check
+    step;on_loop_end                      hook (tracer.end_trace)
+
+Each run gets its own Profile, which also feeds the process-wide
+`process_profile`. Both keep a log-bucketed histogram per phase (bounded
+memory, ~2% relative error) for p50/p95/p99, and can write folded stacks
+("step;llm_wait 1234" with self time in µs) for flamegraph.pl or speedscope.
+"""
+
+import math
+import threading
+import time
+from typing import Iterable, Optional
+
+# Geometric bucket width: each bucket spans 2% of its lower bound
+_BUCKET_BASE = 1.02
+_LOG_BASE = math.log(_BUCKET_BASE)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram over nanosecond samples."""
+
+    __slots__ = ("buckets", "count", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns: int) -> None:
+        bucket = int(math.log(ns) / _LOG_BASE) if ns > 0 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        if not self.count or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.count += 1
+        self.total_ns += ns
+
+    def percentile(self, q: float) -> float:
+        """Approximate q-th percentile (0-100) in nanoseconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Bucket midpoint, clamped to the exact observed range
+                value = _BUCKET_BASE ** (bucket + 0.5)
+                return min(max(value, self.min_ns), self.max_ns)
+        return float(self.max_ns)
+
+    def summary(self) -> dict:
+        """count, total and percentiles, in milliseconds."""
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p95_ms": self.percentile(95) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class _Span:
+    __slots__ = ("profile", "path", "start")
+
+    def __init__(self, profile: "Profile", path: tuple[str, ...]):
+        self.profile = profile
+        self.path = path
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.record(self.path, time.perf_counter_ns() - self.start)
+        return False
+
+
+class Profile:
+    """Histograms of phase latencies, keyed by phase path."""
+
+    def __init__(self, parent: Optional["Profile"] = None):
+        self.parent = parent
+        self.histograms: dict[tuple[str, ...], LatencyHistogram] = {}
+        self._lock = threading.Lock()  # tools record from worker threads
+
+    def span(self, *path: str) -> _Span:
+        """Context manager timing one occurrence of the phase at `path`."""
+        return _Span(self, path)
+
+    def record(self, path: tuple[str, ...], duration_ns: int) -> None:
+        with self._lock:
+            histogram = self.histograms.get(path)
+            if histogram is None:
+                histogram = self.histograms[path] = LatencyHistogram()
+            histogram.add(duration_ns)
+        if self.parent is not None:
+            self.parent.record(path, duration_ns)
+
+    def summary(self) -> dict[str, dict]:
+        """{"step;llm_wait": {"count", "total_ms", "p50_ms", ...}, ...}"""
+        return {";".join(path): h.summary() for path, h in sorted(self.histograms.items())}
+
+    def folded_stacks(self) -> Iterable[str]:
+        """
+        Folded-stack lines ("a;b;c <self µs>"): each phase's total minus its
+        children's totals, clamped at 0 where children overlap (parallel tools).
+        """
+        totals = {path: h.total_ns for path, h in self.histograms.items()}
+        child_totals: dict[tuple[str, ...], int] = {}
+        for path, total in totals.items():
+            if len(path) > 1:
+                child_totals[path[:-1]] = child_totals.get(path[:-1], 0) + total
+        for path in sorted(totals):
+            self_us = max(totals[path] - child_totals.get(path, 0), 0) // 1000
+            if self_us:
+                yield f"{';'.join(path)} {self_us}"
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.folded_stacks():
+                f.write(line + "\n")
+
+    def format_table(self) -> str:
+        rows = [f"{'phase':<48} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total ms':>10}"]
+        for name, s in self.summary().items():
+            rows.append(
+                f"{name:<48} {s['count']:>6} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+                f"{s['p99_ms']:>9.2f} {s['total_ms']:>10.1f}"
+            )
+        return "\n".join(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfile(Profile):
+    """Profiling disabled: spans cost one method call and record nothing."""
+
+    _span = _NullSpan()
+
+    def span(self, *path: str) -> _NullSpan:
+        return self._span
+
+    def record(self, path: tuple[str, ...], duration_ns: int) -> None:
+        pass
+
+
+# Aggregates every profiled run in this process
+process_profile = Profile()
@@ -0,0 +1,267 @@
+"""
+Bounded storage for AgentTracer traces.
+
+Running traces are always held in memory. Once a trace ends it moves to an
+LRU bounded by TRACE_STORE_MAX_TRACES and TRACE_STORE_MAX_MB; traces pushed
+out of the LRU are appended to an on-disk spill and read back lazily, one
+trace at a time, when get() asks for them.
+
+Spill backends (TRACE_SPILL_BACKEND):
+- "sqlite": one row per trace, looked up by primary key (default).
+- "jsonl": append-only file of one JSON trace per line; keeps a
+  trace_id -> file offset index in memory (~100 bytes per spilled trace).
+- "none": evicted traces are dropped.
+
+The spill file is only created when the first trace is evicted.
+
+With TRACE_STORE_COMPRESS, finished traces are held in the LRU as zlib-
+compressed JSON (tool outputs are most of a trace and compress well) and
+decoded on get(); the byte budget then counts compressed bytes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.config import settings
+
+
+class TraceSpill:
+    """Append-only on-disk log of evicted traces."""
+
+    def write(self, trace_id: str, record: dict) -> None:
+        raise NotImplementedError
+
+    def read(self, trace_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteTraceSpill(TraceSpill):
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # writes run outside the store lock
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS traces (trace_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+        return self._conn
+
+    def write(self, trace_id: str, record: dict) -> None:
+        data = json.dumps(record)
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO traces VALUES (?, ?)", (trace_id, data))
+
+    def read(self, trace_id: str) -> Optional[dict]:
+        with self._lock:
+            if self._conn is None and not Path(self.path).exists():
+                return None
+            row = self._connect().execute(
+                "SELECT data FROM traces WHERE trace_id = ?", (trace_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JsonlTraceSpill(TraceSpill):
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = None
+        self._lock = threading.Lock()
+        # trace_id -> byte offset of its latest line; rebuilt from an existing file
+        self._offsets: dict[str, int] = {}
+        if self.path.exists():
+            with self.path.open("rb") as f:
+                offset = 0
+                for line in f:
+                    try:
+                        self._offsets[json.loads(line)["trace_id"]] = offset
+                    except (ValueError, KeyError):
+                        pass  # torn final line from an interrupted write
+                    offset += len(line)
+
+    def write(self, trace_id: str, record: dict) -> None:
+        line = json.dumps(record).encode() + b"\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("ab")
+            # Another handle on the same file may have appended since our last
+            # write, so tell() is only the line's offset once we are at the end
+            self._file.seek(0, os.SEEK_END)
+            self._offsets[trace_id] = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+
+    def read(self, trace_id: str) -> Optional[dict]:
+        offset = self._offsets.get(trace_id)
+        if offset is None:
+            return None
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_spill(backend: str, path: str) -> Optional[TraceSpill]:
+    if backend == "sqlite":
+        return SqliteTraceSpill(path)
+    if backend == "jsonl":
+        return JsonlTraceSpill(path)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown trace spill backend: {backend!r}")
+
+
+class TraceStore:
+    """
+    Running traces plus an LRU of finished ones, spilling evictions to disk.
+
+    Stores any trace object: `encode` turns it into a JSON-serializable dict
+    for the spill and `decode` rebuilds it from that dict.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[Any], dict],
+        decode: Callable[[dict], Any],
+        max_traces: int | None = None,
+        max_bytes: int | None = None,
+        spill: Optional[TraceSpill] = None,
+        compress: bool | None = None,
+    ):
+        self.encode = encode
+        self.decode = decode
+        self.max_traces = settings.trace_store_max_traces if max_traces is None else max_traces
+        self.max_bytes = (
+            int(settings.trace_store_max_mb * 1024 * 1024) if max_bytes is None else max_bytes
+        )
+        self.spill = spill
+        self.compress = settings.trace_store_compress if compress is None else compress
+        self._running: dict[str, Any] = {}
+        # trace_id -> (trace or compressed record, approximate size in bytes),
+        # least recently used first
+        self._finished: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        # Evicted traces whose spill write is in progress
+        self._spilling: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    @classmethod
+    def from_settings(
+        cls, encode: Callable[[Any], dict], decode: Callable[[dict], Any]
+    ) -> "TraceStore":
+        spill = build_spill(settings.trace_spill_backend, settings.trace_spill_path)
+        return cls(encode, decode, spill=spill)
+
+    def add(self, trace_id: str, trace: Any) -> None:
+        """Track a running trace; it is never evicted until finish()."""
+        with self._lock:
+            self._running[trace_id] = trace
+
+    def running(self, trace_id: str) -> Optional[Any]:
+        return self._running.get(trace_id)
+
+    def _pack(self, trace: Any) -> bytes:
+        return zlib.compress(json.dumps(self.encode(trace)).encode(), 6)
+
+    def _unpack(self, blob: bytes) -> dict:
+        return json.loads(zlib.decompress(blob))
+
+    def finish(self, trace_id: str, size_bytes: int) -> None:
+        """
+        Move a trace into the LRU and evict past the count/byte budget.
+
+        Compression and spill writes happen outside the store lock, so the
+        agent loop ending one trace never waits behind disk I/O for others.
+        """
+        with self._lock:
+            trace = self._running.get(trace_id)
+        if trace is None:
+            return
+        if self.compress:
+            trace = self._pack(trace)
+            size_bytes = len(trace)
+        with self._lock:
+            if self._running.pop(trace_id, None) is None:
+                return  # finished concurrently
+            self._finished[trace_id] = (trace, size_bytes)
+            self._bytes += size_bytes
+            evicted = []
+            while self._finished and (
+                len(self._finished) > self.max_traces or self._bytes > self.max_bytes
+            ):
+                evicted_id, (evicted_trace, evicted_size) = self._finished.popitem(last=False)
+                self._bytes -= evicted_size
+                evicted.append((evicted_id, evicted_trace))
+            self.evicted += len(evicted)
+            if self.spill is None:
+                return
+            # Still readable by get() until they are on disk
+            self._spilling.update(evicted)
+        for evicted_id, evicted_trace in evicted:
+            try:
+                record = (
+                    self._unpack(evicted_trace) if self.compress
+                    else self.encode(evicted_trace)
+                )
+                self.spill.write(evicted_id, record)
+            finally:
+                with self._lock:
+                    self._spilling.pop(evicted_id, None)
+
+    def get(self, trace_id: str) -> Optional[Any]:
+        """Return a trace from memory, or decode it from the spill if it was evicted."""
+        with self._lock:
+            trace = self._running.get(trace_id)
+            if trace is not None:
+                return trace
+            entry = self._finished.get(trace_id)
+            if entry is not None:
+                self._finished.move_to_end(trace_id)
+                stored = entry[0]
+            else:
+                stored = self._spilling.get(trace_id)
+        if stored is not None:
+            return self.decode(self._unpack(stored)) if self.compress else stored
+        record = self.spill.read(trace_id) if self.spill is not None else None
+        return self.decode(record) if record is not None else None
+
+    def __len__(self) -> int:
+        return len(self._running) + len(self._finished)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._running),
+            "in_memory": len(self._finished),
+            "bytes": self._bytes,
+            "evicted": self.evicted,
+        }
+
+    def close(self) -> None:
+        if self.spill is not None:
+            self.spill.close()
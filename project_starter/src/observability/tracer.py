@@ -1,21 +1,42 @@
+import atexit
 import json
+import sys
+import threading
 import time
 import uuid
-from dataclasses import asdict, dataclass, field
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from typing import Optional
 
-import structlog
+from src.config import settings
+from src.observability.exporter import TraceExporter, get_exporter
+from src.observability.trace_store import TraceStore
 
-logger = structlog.get_logger()
+def _shallow_dict(obj) -> dict:
+    return {name: getattr(obj, name) for name in obj.__dataclass_fields__}
 
-@dataclass
+def truncate_output(text: str, max_chars: int) -> str:
+    """Cut text to max_chars, noting how much was dropped (max_chars <= 0 keeps it all)."""
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}… [{len(text) - max_chars} chars truncated]"
+
+# The trace dataclasses are slotted (no per-instance __dict__) and intern the
+# short strings that repeat across every record, such as tool and agent names.
+
+@dataclass(slots=True)
 class ToolCallRecord:
     tool_name: str
     tool_input: dict
     tool_output: str
     duration_ms: float
+    # Hex digest of the canonical arguments; equal for equivalent calls
+    args_fingerprint: str = ""
+
+    def __post_init__(self):
+        self.tool_name = sys.intern(self.tool_name)
 
-@dataclass
+@dataclass(slots=True)
 class AgentStep:
     step_number: int
     reasoning: Optional[str]
@@ -26,7 +47,7 @@ class AgentStep:
     duration_ms: float = 0.0
     timestamp: float = field(default_factory=time.time)
 
-@dataclass
+@dataclass(slots=True)
 class Trace:
     trace_id: str
     agent_name: str
@@ -40,36 +61,178 @@ class Trace:
     total_duration_ms: float = 0.0
     status: str = "running"
     error: Optional[str] = None
+    # {"page_cache": {"hits": 3, "misses": 1}, ...}
+    cache_stats: dict[str, dict[str, int]] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self.agent_name = sys.intern(self.agent_name)
+        self.model = sys.intern(self.model)
+
+    def to_dict(self) -> dict:
+        """Same shape as asdict(self), but shares values instead of deep-copying them."""
+        data = _shallow_dict(self)
+        data["steps"] = [
+            {**_shallow_dict(step), "tool_calls": [_shallow_dict(tc) for tc in step.tool_calls]}
+            for step in self.steps
+        ]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Trace":
+        """Rebuild a Trace from asdict() output (e.g. read back from the spill)."""
+        steps = [
+            AgentStep(**{
+                **step,
+                "tool_calls": [ToolCallRecord(**tc) for tc in step.get("tool_calls", [])],
+            })
+            for step in data.get("steps", [])
+        ]
+        return cls(**{**data, "steps": steps})
+
+    def approx_size(self) -> int:
+        """Rough in-memory footprint in bytes, dominated by the text it holds."""
+        size = 500 + len(self.input_query) + len(self.final_output or "")
+        for step in self.steps:
+            size += 300 + len(step.reasoning or "")
+            for tc in step.tool_calls:
+                size += 300 + len(tc.tool_output) + len(str(tc.tool_input))
+        return size
+
+# (tracer, trace_id) of the trace running in the current context. Tasks and
+# asyncio.to_thread workers inherit it, so tools can report into the trace.
+_active_trace: ContextVar[Optional[tuple["AgentTracer", str]]] = ContextVar(
+    "active_trace", default=None
+)
+
+def record_cache_event(cache_name: str, hit: bool):
+    """Count a cache hit/miss against the active trace, if there is one."""
+    active = _active_trace.get()
+    if active is not None:
+        tracer_, trace_id = active
+        tracer_.record_cache(trace_id, cache_name, hit)
+
+def _step_span(trace: Trace, step: AgentStep) -> dict:
+    """Exporter span for a finished step (tool calls summarized, outputs left out)."""
+    return {
+        "kind": "step",
+        "name": f"{trace.agent_name}.step",
+        "trace_id": trace.trace_id,
+        "agent_name": trace.agent_name,
+        "step_number": step.step_number,
+        "start_time": step.timestamp - step.duration_ms / 1000,
+        "end_time": step.timestamp,
+        "duration_ms": step.duration_ms,
+        "input_tokens": step.input_tokens,
+        "output_tokens": step.output_tokens,
+        "cost_usd": step.cost_usd,
+        "tool_calls": [
+            {"tool_name": tc.tool_name, "duration_ms": tc.duration_ms,
+             "args_fingerprint": tc.args_fingerprint}
+            for tc in step.tool_calls
+        ],
+    }
+
+def _trace_start_event(trace: Trace) -> dict:
+    """Exporter event for a trace that has just started (logged, not a span)."""
+    return {
+        "kind": "trace_start",
+        "trace_id": trace.trace_id,
+        "agent_name": trace.agent_name,
+        "model": trace.model,
+        "input_query": trace.input_query,
+        "start_time": trace.started_at,
+    }
+
+def _trace_span(trace: Trace) -> dict:
+    """Exporter span for a finished trace (the root of its step spans)."""
+    return {
+        "kind": "trace",
+        "name": trace.agent_name,
+        "trace_id": trace.trace_id,
+        "agent_name": trace.agent_name,
+        "model": trace.model,
+        "input_query": trace.input_query,
+        "status": trace.status,
+        "error": trace.error,
+        "start_time": trace.started_at,
+        "end_time": time.time(),
+        "duration_ms": trace.total_duration_ms,
+        "total_steps": len(trace.steps),
+        "input_tokens": trace.total_input_tokens,
+        "output_tokens": trace.total_output_tokens,
+        "cost_usd": trace.total_cost_usd,
+        "cache_stats": trace.cache_stats,
+    }
+
+_store: Optional[TraceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_trace_store() -> TraceStore:
+    """Return the process-wide TraceStore built from settings; closed at exit."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TraceStore.from_settings(Trace.to_dict, Trace.from_dict)
+                atexit.register(_store.close)
+    return _store
+
 
 class AgentTracer:
     """
     Captures agent execution flow for debugging and analysis.
+
+    Traces are kept in a bounded TraceStore, by default the process-wide one
+    from get_trace_store(), so every agent shares one LRU budget and one spill
+    handle: finished traces beyond the budget are spilled to disk and reloaded
+    on get_trace().
+    Finished steps and traces are handed to a background TraceExporter, so
+    log and export I/O stay off the agent's hot path. Tool outputs longer
+    than TRACE_MAX_OUTPUT_CHARS (if set) are truncated as steps are logged.
     """
-    def __init__(self, verbose: bool = False):
-        self._traces: dict[str, Trace] = {}
+    def __init__(
+        self,
+        verbose: bool = False,
+        store: Optional[TraceStore] = None,
+        exporter: Optional[TraceExporter] = None,
+        max_output_chars: Optional[int] = None,
+    ):
+        self._traces = store or get_trace_store()
+        self.exporter = exporter or get_exporter()
+        self.max_output_chars = (
+            settings.trace_max_output_chars if max_output_chars is None else max_output_chars
+        )
         self._active_trace_id: Optional[str] = None
         self.verbose = verbose
 
     def start_trace(self, agent_name: str, query: str, model: str = "") -> str:
         """Start a new trace for an agent execution."""
         trace_id = str(uuid.uuid4())[:8]  # Short ID for readability
-        self._traces[trace_id] = Trace(
+        trace = Trace(
             trace_id=trace_id,
             agent_name=agent_name,
             input_query=query,
             model=model,
         )
+        self._traces.add(trace_id, trace)
         self._active_trace_id = trace_id
+        _active_trace.set((self, trace_id))
 
-        logger.info("trace_started", trace_id=trace_id, agent_name=agent_name, model=model, query=query)
+        # Logged by the exporter's worker, like the step and trace spans
+        self.exporter.export(_trace_start_event(trace))
         return trace_id
 
     def log_step(self, trace_id: str, step: AgentStep):
         """Log a completed step to the trace."""
-        if trace_id not in self._traces:
+        trace = self._traces.running(trace_id)
+        if trace is None:
             return
 
-        trace = self._traces[trace_id]
+        if self.max_output_chars > 0:
+            for tc in step.tool_calls:
+                tc.tool_output = truncate_output(tc.tool_output, self.max_output_chars)
         trace.steps.append(step)
 
         # Accumulate totals
@@ -78,35 +241,42 @@ class AgentTracer:
         trace.total_cost_usd += step.cost_usd
         trace.total_duration_ms += step.duration_ms
 
-        logger.info("step_completed",
-                    trace_id=trace_id,
-                    step_number=step.step_number,
-                    duration_ms=round(step.duration_ms, 0),
-                    cost_usd=round(step.cost_usd, 4))
+        self.exporter.export(_step_span(trace, step))
 
     def end_trace(self, trace_id: str, output: str, status: str = "completed", error: str = None):
         """Mark a trace as complete."""
-        if trace_id not in self._traces:
+        trace = self._traces.running(trace_id)
+        if trace is None:
             return
-        trace = self._traces[trace_id]
         trace.final_output = output
         trace.status = status
         trace.error = error
+        if _active_trace.get() == (self, trace_id):
+            _active_trace.set(None)
+
+        self.exporter.export(_trace_span(trace))
+        self._traces.finish(trace_id, trace.approx_size())
 
-        logger.info("trace_ended",
-                    trace_id=trace_id,
-                    status=status,
-                    duration_ms=round(trace.total_duration_ms, 0),
-                    cost_usd=round(trace.total_cost_usd, 4))
+    def record_cache(self, trace_id: str, cache_name: str, hit: bool):
+        """Increment a cache's hit or miss counter on a running trace."""
+        trace = self._traces.running(trace_id)
+        if trace is None:
+            return
+        counters = trace.cache_stats.setdefault(
+            cache_name, {"hits": 0, "misses": 0}
+        )
+        counters["hits" if hit else "misses"] += 1
 
     def get_trace(self, trace_id: str) -> Optional[Trace]:
+        """Return a trace from memory, or lazily from the spill if it was evicted."""
         return self._traces.get(trace_id)
 
     def get_trace_json(self, trace_id: str) -> str:
         """Export a trace as formatted JSON for debugging."""
-        if trace_id not in self._traces:
+        trace = self._traces.get(trace_id)
+        if trace is None:
             return "{}"
-        return json.dumps(asdict(self._traces[trace_id]), indent=2)
+        return json.dumps(trace.to_dict(), indent=2)
 
 # Global tracer instance
 tracer = AgentTracer()
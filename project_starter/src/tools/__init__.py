@@ -1 +1,4 @@
 # Tools module
+#
+# Importing the built-in tool modules registers them with the global registry.
+from src.tools import search_tool  # noqa: F401
@@ -0,0 +1,127 @@
+"""
+Memoized DNS resolution for URL validation.
+
+validate_url() resolves every search-result link and every page it reads.
+DNSCache keeps each hostname's addresses for DNS_CACHE_TTL_S seconds, and
+remembers failed lookups for DNS_NEGATIVE_TTL_S so a dead host is not
+retried on every link. At most DNS_CACHE_MAX_ENTRIES hosts are kept; the
+least recently used go first, and expired entries are dropped when seen. The async path resolves many hosts concurrently and
+shares a single in-flight lookup between callers asking for the same host.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from src.config import settings
+
+# hostname -> list of IP address strings; raises OSError if it cannot resolve
+Resolver = Callable[[str], list[str]]
+
+
+def system_resolver(hostname: str) -> list[str]:
+    """Resolve a hostname to all of its IPv4 and IPv6 addresses."""
+    infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class DNSCache:
+    def __init__(
+        self,
+        resolver: Resolver = system_resolver,
+        ttl_s: float | None = None,
+        negative_ttl_s: float | None = None,
+        max_entries: int | None = None,
+    ):
+        self.resolver = resolver
+        self.ttl_s = settings.dns_cache_ttl_s if ttl_s is None else ttl_s
+        self.negative_ttl_s = (
+            settings.dns_negative_ttl_s if negative_ttl_s is None else negative_ttl_s
+        )
+        self.max_entries = settings.dns_cache_max_entries if max_entries is None else max_entries
+        # hostname -> (addresses or None for a failed lookup, expires_at),
+        # least recently used first
+        self._entries: OrderedDict[str, tuple[Optional[list[str]], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, hostname: str) -> tuple[bool, Optional[list[str]]]:
+        with self._lock:
+            entry = self._entries.get(hostname)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(hostname)
+                    self.hits += 1
+                    return True, entry[0]
+                del self._entries[hostname]
+            self.misses += 1
+            return False, None
+
+    def _store(self, hostname: str, addresses: Optional[list[str]]) -> None:
+        ttl = self.ttl_s if addresses else self.negative_ttl_s
+        with self._lock:
+            self._entries[hostname] = (addresses, time.monotonic() + ttl)
+            self._entries.move_to_end(hostname)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _resolve_uncached(self, hostname: str) -> Optional[list[str]]:
+        try:
+            addresses = self.resolver(hostname) or None
+        except OSError:
+            addresses = None
+        self._store(hostname, addresses)
+        return addresses
+
+    def resolve(self, hostname: str) -> Optional[list[str]]:
+        """Return the host's addresses, or None if it does not resolve."""
+        hostname = hostname.lower()
+        found, addresses = self._lookup(hostname)
+        if found:
+            return addresses
+        return self._resolve_uncached(hostname)
+
+    async def aresolve(self, hostname: str) -> Optional[list[str]]:
+        """Async resolve(): the blocking lookup runs in a worker thread, once per host."""
+        hostname = hostname.lower()
+        found, addresses = self._lookup(hostname)
+        if found:
+            return addresses
+
+        key = (asyncio.get_running_loop(), hostname)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(asyncio.to_thread(self._resolve_uncached, hostname))
+        self._inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_dns_cache: Optional[DNSCache] = None
+_dns_cache_lock = threading.Lock()
+
+
+def get_dns_cache() -> DNSCache:
+    """Return the process-wide DNS cache."""
+    global _dns_cache
+    if _dns_cache is None:
+        with _dns_cache_lock:
+            if _dns_cache is None:
+                _dns_cache = DNSCache()
+    return _dns_cache
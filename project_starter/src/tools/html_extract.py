@@ -0,0 +1,157 @@
+"""
+HTML → clean text extractors for read_webpage().
+
+Both extractors produce the same text: every text node outside <script>,
+<style> and <template>, split into lines and double-space-separated phrases, stripped, with
+empty pieces dropped, joined by newlines and truncated to `limit` chars.
+
+- SoupExtractor: the original BeautifulSoup + html.parser path. Builds the
+  whole tree before producing any text.
+- LxmlStreamExtractor: feeds the document to lxml's C parser in chunks and
+  collects text through parser-target callbacks, stopping as soon as
+  `limit` characters have been produced. Used when lxml is installed.
+"""
+
+import re
+from typing import Optional, Protocol
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:  # optional dependency
+    etree = None
+
+# bs4's get_text() leaves out <template> strings, so lxml skips them too
+SKIP_TAGS = frozenset({"script", "style", "template"})
+FEED_CHUNK_CHARS = 16 * 1024
+# libxml2 gives no event for an <html>/<head>/<body> tag it has already
+# implied (e.g. after text at the very start of a document), so text on both
+# sides would run together; the feed loop flushes at these tags instead
+_IMPLIED_TAG = re.compile(r"<(?:html|head|body)\b[^>]*>", re.IGNORECASE)
+
+
+def _clean_pieces(text: str):
+    """Yield the non-empty stripped phrases of a text node, in order."""
+    for line in text.splitlines():
+        for phrase in line.strip().split("  "):
+            phrase = phrase.strip()
+            if phrase:
+                yield phrase
+
+
+class TextExtractor(Protocol):
+    name: str
+
+    def extract(self, html: str, limit: int) -> str: ...
+
+
+class SoupExtractor:
+    name = "soup"
+
+    def extract(self, html: str, limit: int) -> str:
+        soup = BeautifulSoup(html, "html.parser")
+        # Remove script and style elements
+        for script in soup(list(SKIP_TAGS)):
+            script.decompose()
+
+        text = soup.get_text(separator="\n")
+        # Clean up whitespace
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        text = '\n'.join(chunk for chunk in chunks if chunk)
+
+        return text[:limit]
+
+
+class _TextTarget:
+    """lxml parser target that collects cleaned text until `limit` is reached."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.pieces: list[str] = []
+        self.length = 0  # chars of "\n".join(pieces)
+        self.skip_depth = 0
+        self.done = False
+        # lxml splits one text node into several data() calls (e.g. around
+        # entities); buffer them so a node is cleaned as a whole, like bs4 does
+        self._buffer: list[str] = []
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer.clear()
+        if self.skip_depth or self.done:
+            return
+        for piece in _clean_pieces(text):
+            self.length += len(piece) + (1 if self.pieces else 0)
+            self.pieces.append(piece)
+            if self.length >= self.limit:
+                self.done = True
+                return
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not (self.skip_depth or self.done):
+            self._buffer.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        return "\n".join(self.pieces)[: self.limit]
+
+
+class LxmlStreamExtractor:
+    name = "lxml"
+
+    def extract(self, html: str, limit: int) -> str:
+        target = _TextTarget(limit)
+        parser = etree.HTMLParser(target=target)
+        boundaries = [m.end() for m in _IMPLIED_TAG.finditer(html)]
+        offset = 0
+        while offset < len(html):
+            end = min(offset + FEED_CHUNK_CHARS, len(html))
+            while boundaries and boundaries[0] <= offset:
+                boundaries.pop(0)
+            at_boundary = bool(boundaries) and boundaries[0] <= end
+            if at_boundary:
+                end = boundaries.pop(0)
+            parser.feed(html[offset:end])
+            offset = end
+            if at_boundary:
+                # Text before the tag is a node of its own, as in bs4
+                target._flush()
+            if target.done:
+                # Enough text: skip parsing the rest of the document
+                return target.close()
+        if not html:
+            return ""
+        return parser.close()
+
+
+def get_extractor(name: Optional[str] = None) -> TextExtractor:
+    """
+    Return an extractor by name ("lxml" or "soup"). "auto"/None picks lxml
+    when it is installed and falls back to BeautifulSoup otherwise.
+    """
+    if name in (None, "auto"):
+        name = "lxml" if etree is not None else "soup"
+    if name == "lxml":
+        if etree is None:
+            raise ImportError("lxml is not installed; use the 'soup' extractor.")
+        return LxmlStreamExtractor()
+    if name == "soup":
+        return SoupExtractor()
+    raise ValueError(f"Unknown HTML extractor: {name!r}")
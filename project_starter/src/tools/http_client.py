@@ -0,0 +1,181 @@
+"""
+Shared HTTP clients for the research tools.
+
+Every tool request goes through a pooled client so repeated requests to the
+same host reuse keep-alive connections instead of paying a fresh TCP + TLS
+handshake each time. Timeouts, retries and the per-host pool size come from
+settings (HTTP_TIMEOUT, HTTP_RETRIES, HTTP_POOL_PER_HOST).
+
+- Sync tools share one requests.Session. Its urllib3 connection pools are
+  thread-safe, so tools running in asyncio.to_thread workers can share it;
+  with pool_block=True a host never has more than HTTP_POOL_PER_HOST
+  connections open.
+- Async tools share one httpx.AsyncClient per event loop (a client is bound
+  to the loop it was created on). Its PerHostLimitTransport gives the same
+  guarantees as the sync session: at most HTTP_POOL_PER_HOST requests in
+  flight per host, and retries on 429/5xx responses as well as on
+  connection failures.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import AsyncIterator
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config import settings
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+# Hosts whose connection pools the sync session keeps (urllib3 evicts the
+# least recently used pool, and its keep-alive connections, past this)
+MAX_POOLED_HOSTS = 100
+RETRY_BACKOFF_S = 0.3
+# Retry transient upstream errors too, not just connection failures
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def build_session(
+    pool_per_host: int | None = None,
+    retries: int | None = None,
+) -> requests.Session:
+    """Create a requests.Session with keep-alive pooling and retries."""
+    pool_per_host = pool_per_host or settings.http_pool_per_host
+    retries = settings.http_retries if retries is None else retries
+
+    adapter = HTTPAdapter(
+        pool_connections=MAX_POOLED_HOSTS,
+        pool_maxsize=pool_per_host,
+        pool_block=True,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=RETRY_BACKOFF_S,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=None,  # DuckDuckGo search is a POST; retry it too
+            raise_on_status=False,
+        ),
+    )
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees its host slot once it is read or closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, slot: asyncio.Semaphore):
+        self._stream = stream
+        self._slot = slot
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._slot.release()
+
+
+class PerHostLimitTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport with a per-host request limit and status-code retries.
+
+    A request holds its host's slot until the response body is closed, so a
+    host never sees more than `pool_per_host` concurrent requests. Responses
+    with a RETRY_STATUS_CODES status are retried with exponential backoff
+    (honouring a numeric Retry-After), like the sync session's urllib3 Retry.
+    """
+
+    def __init__(self, pool_per_host: int | None = None, retries: int | None = None):
+        self.pool_per_host = pool_per_host or settings.http_pool_per_host
+        self.retries = settings.http_retries if retries is None else retries
+        # httpx transport retries cover connection failures only
+        self._transport = httpx.AsyncHTTPTransport(
+            retries=self.retries,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        self._slots: dict[tuple, asyncio.Semaphore] = {}
+
+    def _slot(self, url: httpx.URL) -> asyncio.Semaphore:
+        key = (url.scheme, url.host, url.port)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = asyncio.Semaphore(self.pool_per_host)
+        return slot
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slot(request.url)
+        for attempt in range(self.retries + 1):
+            await slot.acquire()
+            try:
+                response = await self._transport.handle_async_request(request)
+            except BaseException:
+                slot.release()
+                raise
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                response.stream = _ReleasingStream(response.stream, slot)
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            await response.aclose()
+            slot.release()
+            delay = RETRY_BACKOFF_S * 2 ** attempt
+            if retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), settings.http_timeout))
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=settings.http_timeout,
+            follow_redirects=True,
+            transport=PerHostLimitTransport(),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Close the running loop's client (call before the loop shuts down)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,220 @@
+"""
+Cache of cleaned read_webpage() text, keyed by normalized URL.
+
+Two backends share the PageCache interface:
+- MemoryPageCache: in-process LRU with per-entry TTL and a byte budget.
+- SqlitePageCache: on-disk store with the same eviction rules, shared
+  across processes and surviving restarts.
+
+Select one with PAGE_CACHE_BACKEND ("memory", "sqlite" or "none"). Every
+lookup is counted, and the hit/miss is also recorded on the active trace so
+the savings show up per run. Async tools use aget()/aset(), which move a
+backend that does disk I/O (sqlite) to a worker thread so the event loop
+never waits on it.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.config import settings
+from src.observability.tracer import record_cache_event
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys: lowercase scheme and host, no
+    default port, no fragment, sorted query parameters, "/" for an empty path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class PageCache:
+    """Base class: counts hits and misses around the backend's _get/_set."""
+
+    name = "page_cache"
+    # Whether _get/_set can block on I/O; if so, aget/aset run them in a thread
+    blocking = True
+
+    def __init__(self, ttl_s: float, max_bytes: int):
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()  # sync tools call get() from worker threads
+
+    def get(self, url: str) -> Optional[str]:
+        value = self._get(normalize_url(url), time.time())
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache_event(self.name, hit=value is not None)
+        return value
+
+    def set(self, url: str, text: str) -> None:
+        if len(text.encode("utf-8")) <= self.max_bytes:
+            self._set(normalize_url(url), text, time.time() + self.ttl_s)
+
+    async def aget(self, url: str) -> Optional[str]:
+        if not self.blocking:
+            return self.get(url)
+        return await asyncio.to_thread(self.get, url)
+
+    async def aset(self, url: str, text: str) -> None:
+        if not self.blocking:
+            self.set(url, text)
+        else:
+            await asyncio.to_thread(self.set, url, text)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, text: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryPageCache(PageCache):
+    """In-process LRU bounded by entry count and total UTF-8 bytes."""
+
+    blocking = False  # dict operations under a short lock: fine on the loop
+
+    def __init__(self, ttl_s: float, max_bytes: int, max_entries: int = 1024):
+        super().__init__(ttl_s, max_bytes)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()  # tools run in worker threads
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            text, expires_at, size = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def _set(self, key: str, text: str, expires_at: float) -> None:
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (text, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class SqlitePageCache(PageCache):
+    """On-disk cache; least-recently-read rows are evicted past the byte budget."""
+
+    def __init__(self, path: str, ttl_s: float, max_bytes: int):
+        super().__init__(ttl_s, max_bytes)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_access)")
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, expires_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (key,))
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (now, key))
+            return row[0]
+
+    def _set(self, key: str, text: str, expires_at: float) -> None:
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (key, text, size, expires_at, now),
+            )
+            self._conn.execute("DELETE FROM pages WHERE expires_at <= ?", (now,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk rows oldest-first and drop until back under budget
+                excess = total - self.max_bytes
+                victims = []
+                for url, row_size in self._conn.execute(
+                    "SELECT url, size FROM pages ORDER BY last_access"
+                ):
+                    if excess <= 0:
+                        break
+                    victims.append((url,))
+                    excess -= row_size
+                self._conn.executemany("DELETE FROM pages WHERE url = ?", victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+
+
+def build_page_cache(backend: str) -> Optional[PageCache]:
+    max_bytes = int(settings.page_cache_max_mb * 1024 * 1024)
+    if backend == "memory":
+        return MemoryPageCache(settings.page_cache_ttl_s, max_bytes)
+    if backend == "sqlite":
+        return SqlitePageCache(settings.page_cache_path, settings.page_cache_ttl_s, max_bytes)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown page cache backend: {backend!r}")
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Return the configured process-wide page cache, or None if disabled."""
+    global _page_cache
+    if _page_cache is None and settings.page_cache_backend != "none":
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = build_page_cache(settings.page_cache_backend)
+    return _page_cache
@@ -1,15 +1,33 @@
 import inspect
+from dataclasses import dataclass
 from typing import Any, Callable, Dict
 
 from pydantic import BaseModel, create_model
 
+from src.exceptions import ToolError
+
+# Annotations whose values pydantic returns unchanged when the type already matches
+_FAST_TYPES = (str, int, float, bool)
+
 class Tool:
     """A callable tool with schema."""
-    def __init__(self, name: str, func: Callable, description: str):
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        description: str,
+        max_concurrency: int | None = None,
+    ):
         self.name = name
         self.func = func
         self.description = description
+        # Max in-flight calls of this tool per agent run (None = agent default)
+        self.max_concurrency = max_concurrency
+        # async def tools are awaited on the event loop instead of a worker thread
+        self.is_async = inspect.iscoroutinefunction(func)
         self.model = self._create_pydantic_model(func)
+        # Compiled once; the JSON schema never changes for a registered tool
+        self._openai_schema = self._build_openai_schema()
 
     def _create_pydantic_model(self, func: Callable) -> type[BaseModel]:
         """Create a Pydantic model from function signature."""
@@ -29,9 +47,51 @@ class Tool:
             else:
                 fields[name] = (annotation, default)
 
+        self._fast_validator = self._compile_fast_validator(fields)
         return create_model(f"{self.name}Schema", **fields)
 
+    @staticmethod
+    def _compile_fast_validator(
+        fields: dict[str, tuple[Any, Any]],
+    ) -> Callable[[dict], dict | None] | None:
+        """
+        Build a validator that accepts arguments pydantic would pass through
+        unchanged: every value's type is exactly its primitive annotation.
+
+        Returns None (no fast path) if any parameter is not str/int/float/bool.
+        The validator returns the final kwargs, or None to request the
+        pydantic fallback (type mismatch, unknown or missing argument).
+        """
+        if not all(annotation in _FAST_TYPES for annotation, _ in fields.values()):
+            return None
+
+        types = {name: annotation for name, (annotation, _) in fields.items()}
+        defaults = {
+            name: default for name, (_, default) in fields.items() if default is not ...
+        }
+        required = frozenset(types) - frozenset(defaults)
+
+        def validate(kwargs: dict) -> dict | None:
+            for name, value in kwargs.items():
+                if type(value) is not types.get(name):
+                    return None
+            if len(kwargs) == len(types):
+                return kwargs
+            if not required <= kwargs.keys():
+                return None
+            return {**defaults, **kwargs}
+
+        return validate
+
     def to_openai_schema(self) -> dict:
+        """
+        Return the tool's OpenAI function schema.
+
+        The dict is built once in __init__ and shared — treat it as read-only.
+        """
+        return self._openai_schema
+
+    def _build_openai_schema(self) -> dict:
         """Convert tool to OpenAI function schema format using Pydantic."""
         schema = self.model.model_json_schema()
 
@@ -51,47 +111,96 @@ class Tool:
         }
 
     def execute(self, **kwargs) -> Any:
-        # Validate arguments using the model
-        validated_args = self.model(**kwargs)
-        return self.func(**validated_args.model_dump())
+        """Validate and call the tool. For async tools this returns a coroutine."""
+        # Fast path: already-typed primitives need no pydantic round trip
+        args = self._fast_validator(kwargs) if self._fast_validator else None
+        if args is None:
+            # Validate (and coerce) arguments using the model
+            args = self.model(**kwargs).model_dump()
+        return self.func(**args)
+
+@dataclass(frozen=True)
+class SchemaBundle:
+    """
+    Immutable snapshot of every registered tool's OpenAI schema.
+
+    Agents share the same bundle until the registry changes; `version`
+    increases on every register/unregister.
+    """
+    version: int
+    tools: tuple[Tool, ...]
+    schemas: tuple[dict, ...]
+
 
 class ToolRegistry:
     """Registry for managing available tools."""
     def __init__(self):
         self._tools: Dict[str, Tool] = {}
         self._categories: Dict[str, list[str]] = {}
-
-    def register(self, name: str, description: str, category: str = "general"):
+        self._version = 0
+        self._bundle: SchemaBundle | None = None
+
+    def register(
+        self,
+        name: str,
+        description: str,
+        category: str = "general",
+        max_concurrency: int | None = None,
+    ):
         """
         Decorator to register a function as a tool.
         
         This method uses the Decorator Pattern to dynamically adding functionality 
         (registration) to functions without modifying their structure.
         """
-        # TODO: Implement the decorator
-        # 1. Create a Tool instance from the function
-        # 2. Register it in self._tools dictionary
-        # 3. Add to category in self._categories
-        # 4. Return the original function (so it can still be called normally)
         def decorator(func: Callable):
+            tool = Tool(name, func, description, max_concurrency=max_concurrency)
+            self._tools[name] = tool
+            self._categories.setdefault(category, [])
+            if name not in self._categories[category]:
+                self._categories[category].append(name)
+            self._invalidate()
             return func
         return decorator
 
+    def unregister(self, name: str) -> None:
+        """Remove a tool by name (no-op if it is not registered)."""
+        if self._tools.pop(name, None) is None:
+            return
+        for names in self._categories.values():
+            if name in names:
+                names.remove(name)
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._version += 1
+        self._bundle = None
+
+    def schema_bundle(self) -> SchemaBundle:
+        """Return the shared schema bundle, rebuilding it only after a change."""
+        if self._bundle is None:
+            tools = tuple(self._tools.values())
+            self._bundle = SchemaBundle(
+                version=self._version,
+                tools=tools,
+                schemas=tuple(tool.to_openai_schema() for tool in tools),
+            )
+        return self._bundle
+
     def get_tool(self, name: str) -> Tool | None:
-        # TODO: Return the tool by name
-        return None
+        return self._tools.get(name)
 
     def get_all_tools(self) -> list[Tool]:
-        # TODO: Return all tools
-        return []
+        return list(self._tools.values())
 
     def get_tools_by_category(self, category: str) -> list[Tool]:
-        # TODO: Return tools by category
-        return []
+        return [self._tools[name] for name in self._categories.get(category, [])]
 
     def execute_tool(self, name: str) -> Callable:
-        # TODO: Get tool and return its execute method
-        pass
+        tool = self.get_tool(name)
+        if tool is None:
+            raise ToolError(f"Tool '{name}' not found.")
+        return tool.execute
 
 # Global registry instance
 registry = ToolRegistry()
@@ -1,58 +1,110 @@
+import asyncio
+import ipaddress
 import logging
-import socket
 from urllib.parse import urlparse
 
-import requests
 from bs4 import BeautifulSoup
 
+from src.config import settings
+from src.tools.dns_cache import get_dns_cache
+from src.tools.html_extract import get_extractor
+from src.tools.http_client import get_async_client, get_session
+from src.tools.page_cache import get_page_cache
 from src.tools.registry import registry
 
 logger = logging.getLogger(__name__)
 
+def _is_public_address(address: str) -> bool:
+    """True only for globally routable unicast IPv4/IPv6 addresses."""
+    try:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])  # drop IPv6 zone id
+    except ValueError:
+        return False
+    # is_global excludes private, loopback, link-local, reserved, shared (CGNAT),
+    # unspecified, documentation and IPv4-mapped/translated IPv6 ranges
+    return ip.is_global and not ip.is_multicast
+
+
+def _url_hostname(url: str) -> str | None:
+    """Hostname of an http(s) URL, or None if the URL cannot be fetched."""
+    try:
+        parsed = urlparse(url)
+        if parsed.scheme not in ["http", "https"]:
+            return None
+        parsed.port  # raises ValueError for a malformed or out-of-range port
+        return parsed.hostname or None
+    except ValueError:
+        return None
+
+
+def _addresses_allowed(addresses: list[str] | None) -> bool:
+    # Every address must be public: a host with one private A/AAAA record
+    # could otherwise be used to reach internal services.
+    return bool(addresses) and all(_is_public_address(a) for a in addresses)
+
+
 def validate_url(url: str) -> bool:
     """
     Validate URL to prevent SSRF (Server-Side Request Forgery).
-    Blocks localhost, private IP ranges, and non-http/https schemes.
+    Blocks localhost, private/reserved IPv4 and IPv6 ranges, and non-http/https
+    schemes. Hostname lookups are memoized in the shared DNSCache.
     """
-    try:
-        parsed = urlparse(url)
-        if parsed.scheme not in ["http", "https"]:
-            return False
-
-        hostname = parsed.hostname
-        if not hostname:
-            return False
-
-        # Resolve hostname to IP
-        try:
-            ip_address = socket.gethostbyname(hostname)
-        except socket.gaierror:
-            return False # Could not resolve
-
-        # Simple check for private ranges (10.x.x.x, 192.168.x.x, 172.16.x.x, 127.x.x.x)
-        # In a real prod env, use the `ipaddress` module for strict checking
-        parts = ip_address.split('.')
-        if parts[0] == '10': return False
-        if parts[0] == '192' and parts[1] == '168': return False
-        if parts[0] == '172' and 16 <= int(parts[1]) <= 31: return False
-        if parts[0] == '127': return False
-        if ip_address == "0.0.0.0": return False
-
-        return True
-    except Exception:
+    hostname = _url_hostname(url)
+    if hostname is None:
         return False
+    return _addresses_allowed(get_dns_cache().resolve(hostname))
+
+
+async def validate_url_async(url: str) -> bool:
+    """Async validate_url(): does not block the event loop on DNS."""
+    hostname = _url_hostname(url)
+    if hostname is None:
+        return False
+    return _addresses_allowed(await get_dns_cache().aresolve(hostname))
+
+
+async def validate_urls(urls: list[str]) -> list[bool]:
+    """Validate many URLs, resolving their distinct hosts concurrently."""
+    return await asyncio.gather(*(validate_url_async(url) for url in urls))
+
+SEARCH_URL = "https://html.duckduckgo.com/html/"
+MAX_PAGE_CHARS = 10000
+
+# lxml streaming extractor when installed, BeautifulSoup otherwise
+_extractor = get_extractor(settings.html_extractor)
+
+
+def _parse_search_results(html: str, max_results: int) -> list[dict]:
+    """
+    Extract title/link/snippet dicts from a DuckDuckGo HTML results page.
+    Links are not validated here; callers filter with validate_url(s).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for result in soup.find_all("div", class_="result", limit=max_results):
+        title_tag = result.find("a", class_="result__a")
+        snippet_tag = result.find("a", class_="result__snippet")
+
+        if title_tag and snippet_tag:
+            results.append({
+                "title": title_tag.get_text(strip=True),
+                "link": title_tag["href"],
+                "snippet": snippet_tag.get_text(strip=True)
+            })
+    return results
+
+
+def _extract_text(html: str) -> str:
+    """Strip scripts/styles and whitespace from a page, truncated to MAX_PAGE_CHARS."""
+    return _extractor.extract(html, MAX_PAGE_CHARS)
+
 
-# @registry.register("search_web", "Search the web for a query. Returns a list of results with title, link, and snippet.", category="research")
-# NOTE: The decorator above will work once you implement the registry!
 def search_web(query: str, max_results: int = 5) -> list[dict]:
     """
     Search the web using DuckDuckGo (HTML).
     """
-    url = "https://html.duckduckgo.com/html/"
-    headers = {"User-Agent": "Mozilla/5.0"}
-
     try:
-        response = requests.post(url, data={"q": query}, headers=headers, timeout=10)
+        response = get_session().post(SEARCH_URL, data={"q": query}, timeout=settings.http_timeout)
         response.raise_for_status()
     except Exception as e:
         logger.error(f"Search request failed: {e}")
@@ -60,22 +112,11 @@ def search_web(query: str, max_results: int = 5) -> list[dict]:
         return [{"title": "Error", "link": "", "snippet": f"Search failed: {str(e)}"}]
 
     logger.info(f"Searching web for: '{query}'")
-
-    soup = BeautifulSoup(response.text, "html.parser")
-    results = []
-    for result in soup.find_all("div", class_="result", limit=max_results):
-        title_tag = result.find("a", class_="result__a")
-        snippet_tag = result.find("a", class_="result__snippet")
-
-        if title_tag and snippet_tag:
-            link = title_tag["href"]
-            # Basic validation on the result link too
-            if validate_url(link):
-                results.append({
-                    "title": title_tag.get_text(strip=True),
-                    "link": link,
-                    "snippet": snippet_tag.get_text(strip=True)
-                })
+    # Basic validation on the result links too
+    results = [
+        r for r in _parse_search_results(response.text, max_results)
+        if validate_url(r["link"])
+    ]
 
     logger.info(f"Search returned {len(results)} results for '{query}'")
     if not results:
@@ -83,35 +124,82 @@ def search_web(query: str, max_results: int = 5) -> list[dict]:
 
     return results
 
-# @registry.register("read_webpage", "Read the content of a webpage. Returns the text content.", category="research")
-# NOTE: The decorator above will work once you implement the registry!
+
 def read_webpage(url: str) -> str:
     """Read and extract text from a URL."""
     if not validate_url(url):
         return "Error: Invalid or restricted URL. Access to local/private networks is blocked."
 
     try:
+        cache = get_page_cache()
+        if cache and (cached := cache.get(url)) is not None:
+            return cached
+
         if "example.com" in url:
              return f"Simulated content for {url}."
 
         logger.info(f"Reading webpage: {url}")
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_session().get(url, timeout=settings.http_timeout)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
+        content = _extract_text(response.text)
+        logger.info(f"Read {len(content)} chars from {url}")
+        if cache:
+            cache.set(url, content)
+        return content
+
+    except Exception as e:
+        return f"Error reading {url}: {e}"
+
+
+# ── Async variants (registered as the agent-facing tools) ────────────────────
+# Network I/O and DNS validation run natively on the event loop; HTML
+# parsing is CPU-bound and goes to a thread.
+
+@registry.register("search_web", "Search the web for a query. Returns a list of results with title, link, and snippet.", category="research")
+async def search_web_async(query: str, max_results: int = 5) -> list[dict]:
+    """Async search_web() using the shared pooled HTTP client."""
+    try:
+        response = await get_async_client().post(SEARCH_URL, data={"q": query})
+        response.raise_for_status()
+    except Exception as e:
+        logger.error(f"Search request failed: {e}")
+        return [{"title": "Error", "link": "", "snippet": f"Search failed: {str(e)}"}]
+
+    logger.info(f"Searching web for: '{query}'")
+    results = await asyncio.to_thread(_parse_search_results, response.text, max_results)
+    allowed = await validate_urls([r["link"] for r in results])
+    results = [r for r, ok in zip(results, allowed) if ok]
+
+    logger.info(f"Search returned {len(results)} results for '{query}'")
+    if not results:
+        logger.warning(f"No results found for '{query}' (Raw response length: {len(response.text)})")
+
+    return results
+
 
-        text = soup.get_text(separator="\n")
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
+@registry.register("read_webpage", "Read the content of a webpage. Returns the text content.", category="research")
+async def read_webpage_async(url: str) -> str:
+    """Async read_webpage() using the shared pooled HTTP client."""
+    if not await validate_url_async(url):
+        return "Error: Invalid or restricted URL. Access to local/private networks is blocked."
+
+    try:
+        cache = get_page_cache()
+        if cache and (cached := await cache.aget(url)) is not None:
+            return cached
+
+        if "example.com" in url:
+             return f"Simulated content for {url}."
+
+        logger.info(f"Reading webpage: {url}")
+        response = await get_async_client().get(url)
+        response.raise_for_status()
 
-        content = text[:10000]  # Truncate to avoid context overflow
+        content = await asyncio.to_thread(_extract_text, response.text)
         logger.info(f"Read {len(content)} chars from {url}")
+        if cache:
+            await cache.aset(url, content)
         return content
 
     except Exception as e:
@@ -1,4 +1,8 @@
+import hashlib
 import json
+import math
+import unicodedata
+from dataclasses import dataclass
 from typing import Any
 
 def safe_json_loads(json_str: str) -> Any:
@@ -7,3 +11,58 @@ def safe_json_loads(json_str: str) -> Any:
         return json.loads(json_str)
     except json.JSONDecodeError:
         return {}
+
+def _canonicalize(value: Any) -> Any:
+    """Normalize a JSON value: NFC strings, integral floats as ints, str keys."""
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value)
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        if math.isfinite(value) and value.is_integer():
+            return int(value)
+        return value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, dict):
+        return {
+            unicodedata.normalize("NFC", str(k)): _canonicalize(v) for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(v) for v in value]
+    return value
+
+def canonical_json(value: Any) -> str:
+    """
+    Serialize a JSON value so that equivalent values give identical text:
+    sorted keys, no insignificant whitespace, Unicode NFC, and 2.0 == 2.
+    """
+    return json.dumps(
+        _canonicalize(value),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+@dataclass(frozen=True, slots=True)
+class ArgsFingerprint:
+    """
+    Canonical form of a tool call's arguments, computed once per call and
+    shared by the loop detector, the tracer and any result cache.
+    """
+    canonical: str
+    digest: bytes  # 16-byte blake2b of `canonical`
+
+    @classmethod
+    def of(cls, arguments: dict) -> "ArgsFingerprint":
+        canonical = canonical_json(arguments)
+        return cls(canonical, hashlib.blake2b(canonical.encode(), digest_size=16).digest())
+
+    @property
+    def hexdigest(self) -> str:
+        return self.digest.hex()
+
+    def cache_key(self, tool_name: str) -> str:
+        """Key for caching this call's result: "<tool>:<hexdigest>"."""
+        return f"{tool_name}:{self.hexdigest}"